@@ -0,0 +1,106 @@
+"""
+Renders per second of the infographic, before/after the cached template layer,
+and encode time / size of each ENCODE_PROFILES profile (SVG: render time).
+
+    cold  fonts loaded and the full canvas drawn for every report (old behaviour)
+    warm  cached fonts + static template, only the dynamic layer is drawn
+
+With --batch, also the throughput of BatchRenderer for 1, 2, 4 ... CPU-count
+worker processes (image cache off, so every report is drawn).
+
+Run with `python bench_renderer.py [--n 20] [--batch 100]`.
+"""
+import argparse
+import gzip
+import os
+import time
+
+from src.analysis.engine import AnalysisEngine
+from src.renderer.batch import BatchRenderer
+from src.renderer.generator import RASTER_PROFILES, InfographicGenerator, clear_caches, encode
+
+
+def sample_report():
+    fundamentals = {
+        'Market Cap': 9000, 'Current Price': 100, 'High_52': 130, 'Low_52': 80, 'Stock P/E': 14,
+        'ROCE': 20, 'ROE': 18, 'Operating Cash Flow': 50, 'Intrinsic Value': 95, 'Dividend Yield': 1,
+        'Promoter Holding': 55, 'Debt / Equity': 0.4, 'Net Profit': 30, 'Free Cash Flow': 12,
+        'Book Value': 40, 'Price to Book': 2.5, 'Industry PB': 3, 'Piotroski Score': 6, 'CFO to PAT': 1.2,
+    }
+    technicals = {
+        'Close': 100, 'Live Price': 100, '50DMA': 95, '200DMA': 90, 'RSI': 45, 'MACD': 1, 'MACD_SIGNAL': 0.5,
+        'Pivot': 99, 'VWAP_Trend': 'Bullish', 'Volume_Trend': 'Increasing', 'indicators_available': True,
+    }
+    news = [
+        {'source': 'Google News', 'title': 'Company wins big order worth 500 crore', 'sentiment': 'Positive'},
+        {'source': 'NSE India', 'title': 'Board meeting on quarterly results', 'sentiment': 'Neutral'},
+    ]
+    result = AnalysisEngine().evaluate_stock(fundamentals, technicals, news)
+    result['news_items'] = news
+    return result
+
+
+def bench(data, n, cold):
+    start = time.perf_counter()
+    for _ in range(n):
+        if cold:
+            clear_caches()
+        InfographicGenerator().render("BENCH", data)
+    return n / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark infographic rendering")
+    parser.add_argument("--n", type=int, default=20, help="Reports rendered per mode")
+    parser.add_argument("--batch", type=int, default=0, help="Reports per process-pool run (0 skips)")
+    parser.add_argument("--profile", type=str, default="small", help="Encoding profile for the pool runs")
+    args = parser.parse_args()
+
+    data = sample_report()
+    InfographicGenerator().render("BENCH", data)  # warm-up (imports, first template)
+
+    cold = bench(data, args.n, cold=True)
+    warm = bench(data, args.n, cold=False)
+    print(f"cold (no caches):    {cold:7.1f} renders/s")
+    print(f"warm (template):     {warm:7.1f} renders/s  ({warm / cold:.1f}x)")
+
+    # Encoding now dominates a warm render
+    img = InfographicGenerator().render("BENCH", data)
+    print(f"\n{'profile':<10} {'bytes':>9} {'encode ms':>10}")
+    for profile in RASTER_PROFILES:
+        encoded = encode(img, profile)  # warm-up (palette)
+        start = time.perf_counter()
+        for _ in range(args.n):
+            encode(img, profile)
+        print(f"{profile:<10} {len(encoded):>9,} {(time.perf_counter() - start) / args.n * 1000:>10.1f}")
+
+    # SVG skips rasterizing and encoding altogether: time is the whole render
+    gen = InfographicGenerator()
+    start = time.perf_counter()
+    for _ in range(args.n):
+        svg = gen.render_bytes("BENCH", data, 'svg')
+    print(f"{'svg':<10} {len(svg):>9,} {(time.perf_counter() - start) / args.n * 1000:>10.1f}   (render, {len(gzip.compress(svg)):,} gzipped)")
+
+    if args.batch:
+        bench_pool(data, args.batch, args.profile)
+
+
+def bench_pool(data, n, profile):
+    reports = [(f"S{i}", dict(data, cmp=100 + i)) for i in range(n)]
+    cpus = os.cpu_count() or 1
+    counts = sorted({w for w in (1, 2, 4, 8, 16, 32) if w <= cpus} | {cpus})
+    print(f"\n{'workers':<10} {'reports/s':>10} {'speedup':>8}   ({n} reports, {profile})")
+    base = None
+    for workers in counts:
+        with BatchRenderer(workers, profile, image_cache=None) as renderer:
+            list(renderer.render(reports[:workers]))  # start and warm the workers
+            start = time.perf_counter()
+            for _ in renderer.render(reports, ordered=False):
+                pass
+            rate = n / (time.perf_counter() - start)
+        base = base or rate
+        print(f"{workers:<10} {rate:>10.1f} {rate / base:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
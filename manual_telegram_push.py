@@ -9,9 +9,11 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__))))
 from src.fetchers.fundamentals import FundamentalFetcher
 from src.fetchers.technicals import TechnicalFetcher
 from src.fetchers.news import NewsFetcher
-from src.analysis.engine import AnalysisEngine
-from src.renderer.generator import InfographicGenerator
-from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHANNEL_ID
+from src.analysis.cache import result_cache
+from src.analysis.peers import sector_index
+from src.renderer.generator import mimetype, report_filename
+from src.renderer.cache import image_cache
+from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHANNEL_ID, BROADCAST_IMAGE_PROFILE
 
 def send_manual_report(symbol):
     print(f"Generating report for {symbol}...")
@@ -31,14 +33,12 @@ def send_manual_report(symbol):
         return
 
     # 2. Analyze
-    engine = AnalysisEngine()
-    result = engine.evaluate_stock(fund_data, tech_data, news_data)
-    result['cmp'] = fund_data.get('Current Price') if fund_data else tech_data.get('Close', 0)
+    peers = sector_index.compare(symbol, fund_data) if fund_data else None
+    result = result_cache.evaluate(fund_data, tech_data, news_data, peers)
+    result['chart'] = (tech_data or {}).get('Chart')  # price panel on the image
     
     # 3. Generate Image
-    output_path = f"{symbol}_manual_report.png"
-    gen = InfographicGenerator()
-    gen.generate_report(symbol, result, output_path)
+    image = image_cache.render(symbol, result, BROADCAST_IMAGE_PROFILE)
     
     # 4. Send Image
     print(f"Sending to Channel ID: {TELEGRAM_CHANNEL_ID}")
@@ -52,14 +52,10 @@ def send_manual_report(symbol):
     )
     
     url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
-    with open(output_path, 'rb') as f:
-        resp = requests.post(url, data={'chat_id': TELEGRAM_CHANNEL_ID, 'caption': caption, 'parse_mode': 'Markdown'}, files={'photo': f})
+    resp = requests.post(url, data={'chat_id': TELEGRAM_CHANNEL_ID, 'caption': caption, 'parse_mode': 'Markdown'},
+                         files={'photo': (report_filename(symbol, BROADCAST_IMAGE_PROFILE), image, mimetype(BROADCAST_IMAGE_PROFILE))})
     
     print(f"Response: {resp.status_code} - {resp.text}")
-    
-    # Cleanup
-    if os.path.exists(output_path):
-        os.remove(output_path)
 
 if __name__ == "__main__":
     send_manual_report("ANANTRAJ")
@@ -0,0 +1,227 @@
+import copy
+import hashlib
+import json
+import logging
+import math
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from src.analysis.engine import AnalysisEngine
+from src.analysis.rules import RULES_VERSION
+from src.config import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_DIR = os.path.join(CACHE_DIR, 'results')
+
+# Result keys result_key doesn't hash
+RESULT_KEY_SKIPPED = ('inputs', 'analyzed_at', 'result_hash')
+
+# Technicals fields evaluate_stock never reads (the chart series is drawn from the caller's data)
+UNSCORED_TECHNICALS = ('Chart',)
+
+
+def _normalize(obj):
+    """Canonical JSON-able form: numpy scalars -> Python, NaN/inf -> strings, ints kept apart from floats."""
+    if isinstance(obj, dict):
+        return {str(k): _normalize(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_normalize(v) for v in obj]
+    if obj is None or isinstance(obj, (str, bool)):
+        return obj
+    if hasattr(obj, 'item'):  # numpy scalar
+        obj = obj.item()
+    if isinstance(obj, int):
+        return obj
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else repr(obj)
+    return str(obj)
+
+
+def _scored_technicals(technicals):
+    """`technicals` without UNSCORED_TECHNICALS (shallow copy; None stays None)."""
+    if not technicals:
+        return technicals
+    return {k: v for k, v in technicals.items() if k not in UNSCORED_TECHNICALS}
+
+
+def input_key(fundamentals, technicals, news, peers=None):
+    """
+    Stable content hash of everything evaluate_stock reads, plus RULES_VERSION.
+    News is reduced to (title, sentiment) since links and fetch times don't affect scoring;
+    UNSCORED_TECHNICALS are left out.
+    """
+    payload = {
+        'rules': RULES_VERSION,
+        'fundamentals': _normalize(fundamentals or {}),
+        'technicals': _normalize(_scored_technicals(technicals) or {}),
+        'news': [[n.get('title'), n.get('sentiment')] for n in (news or [])],
+        'peers': _normalize(peers),
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+def result_key(result):
+    """
+    Stable content hash of an evaluated result (HTTP ETags), the same for two
+    identical analyses. RESULT_KEY_SKIPPED is left out: 'inputs' is large and
+    the rest of the result already follows from it, the others change with
+    every analysis or are the hash itself.
+    """
+    payload = _normalize({k: v for k, v in result.items() if k not in RESULT_KEY_SKIPPED})
+    blob = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Memoizes AnalysisEngine.evaluate_stock by input content.
+
+    Two tiers: an in-process LRU and pickled files under `disk_dir` shared by
+    the web app, bot and CLI. Entries are held as pickled bytes, so every hit
+    hands out a fresh copy and callers can't corrupt the cache by editing a
+    result. Inputs are copied before evaluation, so they are never mutated.
+
+    Every live price gives a new key, so the disk tier is bounded like
+    ImageCache's: disk hits refresh the file's mtime, and every
+    `prune_every` writes files older than `max_disk_age` seconds are deleted,
+    then the least recently used ones until the directory fits `max_disk_bytes`.
+    """
+    def __init__(self, maxsize=256, disk_dir=RESULT_CACHE_DIR, engine=None,
+                 max_disk_bytes=128 << 20, max_disk_age=24 * 3600, prune_every=32):
+        self.maxsize = maxsize
+        self.disk_dir = disk_dir
+        self.engine = engine or AnalysisEngine()
+        self.max_disk_bytes = max_disk_bytes
+        self.max_disk_age = max_disk_age
+        self.prune_every = prune_every
+        self._memory = OrderedDict()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.pkl")
+
+    def _remember(self, key, blob):
+        with self._lock:
+            self._memory[key] = blob
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(blob)
+
+        if self.disk_dir:
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    blob = f.read()
+                result = pickle.loads(blob)
+                os.utime(path)  # LRU order for pruning
+            except FileNotFoundError:
+                result = None
+            except Exception as e:
+                logger.warning(f"Dropping unreadable result cache entry {key}: {e}")
+                result = None
+            if result is not None:
+                self._remember(key, blob)
+                with self._lock:
+                    self.disk_hits += 1
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, result):
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember(key, blob)
+        if self.disk_dir:
+            path = self._path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(blob)
+                os.replace(tmp, path)  # atomic, concurrent writers can't leave half files
+            except OSError as e:
+                logger.warning(f"Could not write result cache entry {key}: {e}")
+                return
+            with self._lock:
+                self._writes += 1
+                prune = self._writes % self.prune_every == 0
+            if prune:
+                self.prune_disk()
+
+    def prune_disk(self):
+        """Deletes files older than max_disk_age, then the least recently used until the directory fits max_disk_bytes."""
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                if name.endswith('.pkl'):
+                    try:
+                        st = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, os.path.join(root, name)))
+        total = sum(size for _, size, _ in files)
+        oldest = time.time() - self.max_disk_age
+        removed = 0
+        for mtime, size, path in sorted(files):
+            if total <= self.max_disk_bytes and mtime >= oldest:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"Pruned {removed} cached results ({total / 1e6:.1f} MB kept)")
+        return removed
+
+    def evaluate(self, fundamentals, technicals, news, peers=None):
+        """Drop-in for engine.evaluate_stock that returns the cached result for identical inputs."""
+        technicals = _scored_technicals(technicals)
+        key = input_key(fundamentals, technicals, news, peers)
+        result = self.get(key)
+        if result is not None:
+            logger.debug(f"Result cache hit {key[:12]} ({self.stats()})")
+            return result
+
+        result = self.engine.evaluate_stock(copy.deepcopy(fundamentals), copy.deepcopy(technicals), copy.deepcopy(news), peers)
+        self.put(key, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                'entries': len(self._memory),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+
+# Shared per-process instance used by the web app, bot and CLI
+result_cache = ResultCache()
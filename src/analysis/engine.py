@@ -1,22 +1,49 @@
 import logging
+import math
+import numpy as np
 from src.config import TOTAL_PARAMETERS
+from src.analysis.rules import (
+    FUNDAMENTAL_RULES, TECHNICAL_RULES, STRING_FIELDS, safe_fmt,
+    build_table, rule_fields, price_rules, compile_scalar, compile_vector
+)
+from src.analysis.result import FUNDAMENTAL_DISPLAY_FIELDS, TECHNICAL_DISPLAY_FIELDS, ResultTable, display_columns
 
 logger = logging.getLogger(__name__)
 
+# Rule tables are compiled once per process
+_score_fundamentals = compile_scalar(FUNDAMENTAL_RULES)
+_score_technicals = compile_scalar(TECHNICAL_RULES)
+_score_fundamentals_table = compile_vector(FUNDAMENTAL_RULES)
+_score_technicals_table = compile_vector(TECHNICAL_RULES)
+_score_price_fundamentals = compile_scalar(price_rules(FUNDAMENTAL_RULES))
+_score_price_technicals = compile_scalar(price_rules(TECHNICAL_RULES))
+
+FUNDAMENTAL_FIELDS = rule_fields(FUNDAMENTAL_RULES)
+TECHNICAL_FIELDS = rule_fields(TECHNICAL_RULES) + STRING_FIELDS + ('indicators_available',)
+
+# Extra fields read by the price unification and the verdicts
+BATCH_FUNDAMENTAL_FIELDS = FUNDAMENTAL_FIELDS + ('Debt / Equity', 'CFO to PAT')
+BATCH_TECHNICAL_FIELDS = TECHNICAL_FIELDS + ('Live Price',)
+
+# Extras callers add to an evaluate_stock result that follow from its price or
+# its moment (scenario grid, chart, report store stamps); reprice drops them
+PRICED_EXTRAS = ('scenarios', 'chart', 'analyzed_at', 'result_hash')
+
+def _or(col, default):
+    # Vector form of `float(x or default)`
+    return np.where(col == 0, float(default), col)
+
 class AnalysisEngine:
     def __init__(self):
         pass
 
     def _safe_fmt(self, val, fmt=":.2f"):
-        try:
-            if val is None or val == "": return "N/A"
-            return ("{"+fmt+"}").format(float(val))
-        except:
-            return "N/A"
+        return safe_fmt(val, fmt)
 
-    def evaluate_stock(self, fundamentals, technicals, news):
+    def evaluate_stock(self, fundamentals, technicals, news, peers=None):
         """
         Main entry point to evaluate a stock.
+        `peers` is an optional SectorIndex.compare() result for the peer parameters.
         Returns a dictionary with scores and detailed parameter status.
         """
         score_report = {
@@ -37,31 +64,7 @@ class AnalysisEngine:
         cmp = live_price if live_price > 0 else (fund_price if fund_price > 0 else tech_close)
         
         # Inject CMP into datasets so analysis uses the unified price
-        if fundamentals:
-            old_price = float(fundamentals.get('Current Price', 0) or 0)
-            fundamentals['Current Price'] = cmp
-            
-            # --- REAL-TIME RECALCULATION FOR ACCURACY ---
-            # If we have a live price different from the snapped fundamental price,
-            # we must recalculate P/E, Market Cap, etc. to give accurate valuation insights.
-            if cmp > 0 and old_price > 0 and abs(cmp - old_price) > 0.01:
-                ratio = cmp / old_price
-                
-                # 1. Market Cap (Scales linearly with price)
-                if 'Market Cap' in fundamentals:
-                     fundamentals['Market Cap'] = float(fundamentals['Market Cap']) * ratio
-                
-                # 2. P/E Ratio (Price / EPS)
-                # If we have P/E, we can derive EPS and recalc. Or just scale P/E.
-                if 'Stock P/E' in fundamentals:
-                    fundamentals['Stock P/E'] = float(fundamentals['Stock P/E']) * ratio
-                
-                # 3. Dividend Yield (DPS / Price) -> Inverse scale
-                if 'Dividend Yield' in fundamentals:
-                    fundamentals['Dividend Yield'] = float(fundamentals['Dividend Yield']) / ratio
-
-        if technicals:
-            technicals['Close'] = cmp 
+        self._apply_price(fundamentals, technicals, cmp)
             
         score_report['cmp'] = cmp
 
@@ -76,7 +79,7 @@ class AnalysisEngine:
         score_report['details'].update(t_details)
         
         # 3. News Analysis
-        n_score, n_details = self._analyze_news(news)
+        n_score, n_details = self._analyze_news(news, peers)
         score_report['news_score'] = n_score
         score_report['details'].update(n_details)
         
@@ -86,304 +89,268 @@ class AnalysisEngine:
         # Verdicts
         verdicts = self._generate_verdicts(score_report['total_score'], fundamentals, technicals)
         score_report.update(verdicts)
+
+        # Normalized inputs, kept so the result can be repriced incrementally
+        score_report['inputs'] = {'fundamentals': fundamentals, 'technicals': technicals, 'news': news, 'peers': peers}
         
         return score_report
 
-    def _analyze_fundamentals(self, data):
-        score = 0
-        details = {}
-        
-        if not data:
-            data = {}
-
-        # Rule Helper
-        def evaluate(key, value, threshold, condition='>', positive_if_true=True):
-            try: 
-                v = float(value) if value is not None else 0.0
-                t = float(threshold)
-                if condition == '>': res = v > t
-                elif condition == '<': res = v < t
-                else: res = False
-                
-                is_good = res if positive_if_true else not res
-                return (1, 'Positive') if is_good else (0, 'Negative')
-            except: return (0, 'N/A')
-
-        # 24 Parameters Logic
-        # 1. Market Cap
-        mcap = float(data.get('Market Cap', 0) or 0)
-        s = 0
-        st = 'Unknown'
-        
-        if mcap > 20000:
-            s = 1; st = 'Large Cap'
-        elif mcap > 5000:
-            s = 1; st = 'Mid Cap'
-        elif mcap > 500:
-            s = 0.5; st = 'Small Cap' # Slightly higher risk
-        else:
-            s = 0; st = 'Micro Cap (Risky)'
-            
-        score += s; details['Market Cap'] = {'value': f"{float(data.get('Market Cap', 0)):.2f}", 'score': s, 'status': st}
-        
-        # 2. CMP vs 52W
-        low = data.get('Low_52', 0); cmp = data.get('Current Price', 0)
-        if low > 0 and cmp > low * 1.1: s=1; st='Positive'
-        else: s=0.5; st='Neutral'
-        score += s; details['CMP vs 52W'] = {'value': f"{cmp:.2f}", 'score': s, 'status': st}
-
-        # 3. PE vs Peer (Refined Logic)
-        pe = data.get('Stock P/E', 0)
-        ind_pe = data.get('Industry PE', 0)
-        s = 0; st = 'N/A'
-        
-        if pe > 0:
-            if pe < 12: s=1; st='Extremely Oversold'
-            elif 12 <= pe < 15: s=1; st='Very Attractive'
-            elif 15 <= pe < 20: s=0.5; st='Attractive'
-            elif 20 <= pe < 25: s=0.5; st='Expensive'
-            else: s=0; st='Overbought' # > 25
+    def _apply_price(self, fundamentals, technicals, cmp):
+        if fundamentals:
+            old_price = float(fundamentals.get('Current Price', 0) or 0)
+            fundamentals['Current Price'] = cmp
             
-            # Industry Comparison Bonus/Penalty
-            if ind_pe > 0:
-                if pe < ind_pe: st += ' (Vs Ind: Attractive)'
-                else: st += ' (Vs Ind: Cautious)'
+            # --- REAL-TIME RECALCULATION FOR ACCURACY ---
+            # If we have a live price different from the snapped fundamental price,
+            # we must recalculate P/E, Market Cap, etc. to give accurate valuation insights.
+            if cmp > 0 and old_price > 0 and abs(cmp - old_price) > 0.01:
+                ratio = cmp / old_price
                 
-        score += s; details['P/E Ratio'] = {'value': f"{self._safe_fmt(pe)} (Ind: {self._safe_fmt(ind_pe)})", 'score': s, 'status': st}
-        
-        # 4. PEG (< 1 is good)
-        s, st = evaluate('PEG Ratio', data.get('PEG Ratio', 2), 1, '<')
-        score += s; details['PEG Ratio'] = {'value': self._safe_fmt(data.get('PEG Ratio')), 'score': s, 'status': st}
-        
-        # 5. EPS Trend
-        s, st = evaluate('EPS Trend', data.get('EPS Trend', 0), 0)
-        score += s; details['EPS Trend'] = {'value': f"{self._safe_fmt(data.get('EPS Trend'), ':.1f')}%", 'score': s, 'status': st}
-        
-        # 6. EBITDA Trend
-        s, st = evaluate('EBITDA Trend', data.get('EBITDA Trend', 0), 0)
-        score += s; details['EBITDA Trend'] = {'value': self._safe_fmt(data.get('EBITDA Trend')), 'score': s, 'status': st}
-        
-        # 7. Debt/Equity (< 1 good)
-        s, st = evaluate('Debt / Equity', data.get('Debt / Equity', 0), 1, '<')
-        score += s; details['Debt / Equity'] = {'value': self._safe_fmt(data.get('Debt / Equity')), 'score': s, 'status': st}
-        
-        # 8. Dividend Yield (>0 good)
-        s, st = evaluate('Dividend Yield', data.get('Dividend Yield', 0), 0)
-        score += s; details['Dividend Yield'] = {'value': f"{self._safe_fmt(data.get('Dividend Yield', 0))}%", 'score': s, 'status': st}
-        
-        # 9. Intrinsic Value (CMP < Intrinsic)
-        intr = data.get('Intrinsic Value', 0)
-        if cmp < (float(intr or 0)): s=1; st='Undervalued'
-        else: s=0; st='Overvalued'
-        score += s; details['Intrinsic Value'] = {'value': self._safe_fmt(intr, ':.1f'), 'score': s, 'status': st}
-        
-        # 10. Current Ratio (> 1.5)
-        s, st = evaluate('Current Ratio', data.get('Current Ratio', 0), 1.5)
-        score += s; details['Current Ratio'] = {'value': self._safe_fmt(data.get('Current Ratio')), 'score': s, 'status': st}
-        
-        # 11. Promoter Holding (> 40%?)
-        s, st = evaluate('Promoter Holding', data.get('Promoter Holding', 0), 40)
-        score += s; details['Promoter Holding'] = {'value': f"{self._safe_fmt(data.get('Promoter Holding'))}%", 'score': s, 'status': st}
-        
-        # 12. FII/DII Trend (>0)
-        # Rule: Positive Change (> 0%) -> Institutional money is entering.
-        fii_change = data.get('FII/DII Change', 0)
-        s, st = evaluate('FII/DII Change', fii_change, 0)
-        score += s; details['FII/DII Trend'] = {'value': f"{self._safe_fmt(fii_change)}%", 'score': s, 'status': st}
-        
-        # 13. Operating Cash Flow (Advanced 4-Phase)
-        ocf = float(data.get('Operating Cash Flow', 0))
-        net_profit = float(data.get('Net Profit', 0)) # Need to ensure this is passed from fetcher
-        sales = float(data.get('Sales', 0))
-        
-        s_ocf = 0
-        st_ocf_list = []
-        
-        # Phase 1: Earnings Quality (OCF > Net Profit)
-        # Ideally check 3 years, here checking TTM
-        if ocf < net_profit:
-            st_ocf_list.append("Low Earnings Quality (OCF < Net Profit)")
-        else:
-             st_ocf_list.append("High Earnings Quality")
-             
-        # Phase 2: Efficiency (OCF Margin = OCF/Sales)
-        # > 15% Cash Cow, 5-15% Standard, < 5% High Risk
-        ocf_margin = (ocf / sales * 100) if sales > 0 else 0
-        if ocf_margin > 15:
-            s_ocf += 1; st_ocf_list.append("Cash Cow (High Eff)")
-        elif ocf_margin > 5:
-            s_ocf += 0.5; st_ocf_list.append("Standard Eff")
-        else:
-            s_ocf += 0; st_ocf_list.append("High Risk (Low Margin)")
-            
-        # Phase 4 (Partial): FCF Conversion check (OCF positive but FCF negative?)
-        fcf_val = float(data.get('Free Cash Flow', 0))
-        if fcf_val < 0 and ocf > 0:
-            st_ocf_list.append("Capital Intensive")
-            
-        # Final Score Logic for OCF
-        # If OCF is negative -> Automatic 0 and Critical Fail
-        if ocf < 0:
-            s = 0; st = "Negative OCF (CRITICAL)"
-        else:
-            s = 1 if s_ocf >= 1 else 0.5
-            st = " | ".join(st_ocf_list)
+                # 1. Market Cap (Scales linearly with price)
+                if 'Market Cap' in fundamentals:
+                     fundamentals['Market Cap'] = float(fundamentals['Market Cap']) * ratio
+                
+                # 2. P/E Ratio (Price / EPS)
+                # If we have P/E, we can derive EPS and recalc. Or just scale P/E.
+                if 'Stock P/E' in fundamentals:
+                    fundamentals['Stock P/E'] = float(fundamentals['Stock P/E']) * ratio
+                
+                # 3. Dividend Yield (DPS / Price) -> Inverse scale
+                if 'Dividend Yield' in fundamentals:
+                    fundamentals['Dividend Yield'] = float(fundamentals['Dividend Yield']) / ratio
 
-        score += s; details['Operating Cash Flow'] = {'value': self._safe_fmt(ocf), 'score': s, 'status': st}
-        
-        # 14. ROCE (>15)
-        s, st = evaluate('ROCE', data.get('ROCE', 0), 15)
-        score += s; details['ROCE'] = {'value': f"{self._safe_fmt(data.get('ROCE'))}%", 'score': s, 'status': st}
-        
-        # 14b. ROE (>15 good, <10 avoid)
-        roe = data.get('ROE', 0)
-        s = 0; st = 'Neutral'
-        if roe > 15: s=1; st='Good'
-        elif roe < 10: s=0; st='Avoid (Low)'
-        else: s=0.5; st='Average'
-        score += s; details['ROE'] = {'value': f"{self._safe_fmt(roe)}%", 'score': s, 'status': st}
-
-        # 15. Rev CAGR (>10)
-        s, st = evaluate('Revenue CAGR', data.get('Revenue CAGR', 0), 10)
-        score += s; details['Revenue CAGR'] = {'value': f"{self._safe_fmt(data.get('Revenue CAGR'), ':.1f')}%", 'score': s, 'status': st}
-        
-        # 16. Profit CAGR (>10)
-        s, st = evaluate('Profit CAGR', data.get('Profit CAGR', 0), 10)
-        score += s; details['Profit CAGR'] = {'value': f"{self._safe_fmt(data.get('Profit CAGR'), ':.1f')}%", 'score': s, 'status': st}
-        
-        # 17. Interest Coverage (>3)
-        s, st = evaluate('Interest Coverage', data.get('Interest Coverage', 0), 3)
-        score += s; details['Interest Coverage'] = {'value': self._safe_fmt(data.get('Interest Coverage'), ':.1f'), 'score': s, 'status': st}
-        
-        # 18. FCF (>0)
-        s, st = evaluate('Free Cash Flow', data.get('Free Cash Flow', 0), 0)
-        score += s; details['Free Cash Flow'] = {'value': self._safe_fmt(data.get('Free Cash Flow')), 'score': s, 'status': st}
-        
-        # 19. Equity Dilution (Mock 0)
-        score += 1; details['Equity Dilution'] = {'value': 'No', 'score': 1, 'status': 'Stable'}
-        
-        # 20. Pledged Shares (<5%)
-        s, st = evaluate('Pledged Shares', data.get('Pledged Shares', 0), 5, '<')
-        score += s; details['Pledged Shares'] = {'value': f"{self._safe_fmt(data.get('Pledged Shares'))}%", 'score': s, 'status': st}
-        
-        # 21. Contingent Liab (Risk Check)
-        # Rule: if Contingent_Liabilities > (0.5 * Net_Worth): Status = ❌
-        cont_liab = data.get('Contingent Liabilities', 0)
-        net_worth = data.get('Net Worth', 1) # Avoid div/0
-        cl_ratio = cont_liab / net_worth if net_worth > 0 else 0
-        
-        if cl_ratio > 0.5:
-             s = 0; st = f"High Risk (>50% NW)"
+        if technicals:
+            technicals['Close'] = cmp 
+
+    def reprice(self, previous, new_price):
+        """
+        Incremental re-evaluation of an evaluate_stock result at a new price.
+        Only the price-linked parameters (Market Cap, CMP vs 52W, P/E, Dividend
+        Yield, Intrinsic Value, Trend, Pivot) are re-scored; everything else is
+        carried over. Totals, verdicts and swing levels are updated.
+        Held at the snapshot, exactly as evaluate_stock holds them: the peer
+        percentiles (the `peers` comparison, P/E ranked at the price it was
+        made with) and the 'IV Probability' field (P(CMP < IV) at the fetch
+        price; the Intrinsic Value rule scores the price-free IV quantiles).
+        Recompute `peers` and call evaluate_stock to refresh them.
+        The technicals' 'Live Price' becomes `new_price`, and PRICED_EXTRAS are
+        dropped: run run_scenarios / ReportStore.put on the new result again.
+        Returns a new result; `previous` is left untouched.
+        """
+        inputs = previous.get('inputs')
+        if not inputs:
+            raise ValueError("Result has no inputs to reprice; it must come from evaluate_stock.")
+        if not new_price or new_price <= 0:
+            raise ValueError(f"Invalid price: {new_price}")
+
+        fundamentals = dict(inputs['fundamentals']) if inputs['fundamentals'] else inputs['fundamentals']
+        technicals = dict(inputs['technicals']) if inputs['technicals'] else inputs['technicals']
+        self._apply_price(fundamentals, technicals, new_price)
+        if technicals:
+            technicals['Live Price'] = new_price
+
+        result = {k: v for k, v in previous.items() if k not in PRICED_EXTRAS}
+        details = result['details'] = dict(previous['details'])
+        result['cmp'] = new_price
+
+        if fundamentals:
+            s, changed = _score_price_fundamentals(fundamentals)
+            result['fundamental_score'] = previous['fundamental_score'] - sum(details[k]['score'] for k in changed) + s
+            details.update(changed)
+
+        if technicals and technicals.get('indicators_available', True):
+            s, changed = _score_price_technicals(technicals)
+            result['technical_score'] = previous['technical_score'] - sum(details[k]['score'] for k in changed) + s
+            details.update(changed)
+
+        result['total_score'] = float(result['fundamental_score'] + result['technical_score'] + result['news_score'])
+        result.update(self._generate_verdicts(result['total_score'], fundamentals, technicals))
+        result['inputs'] = {'fundamentals': fundamentals, 'technicals': technicals, 'news': inputs['news'], 'peers': inputs.get('peers')}
+        return result
+
+    def evaluate_batch(self, fundamentals_list, technicals_list, news_list=None):
+        """
+        Scores many stocks at once through the vectorized rule tables.
+        Takes parallel lists (one entry per stock, None when missing) and returns
+        a dict of arrays: cmp, the four scores, verdict labels, risk flags and
+        'details' mapping each parameter to (scores, statuses).
+        Inputs are not modified.
+        """
+        n = len(fundamentals_list)
+        fund = build_table(fundamentals_list, BATCH_FUNDAMENTAL_FIELDS)
+        tech = build_table(technicals_list, BATCH_TECHNICAL_FIELDS)
+        has_fund = np.fromiter((bool(f) for f in fundamentals_list), dtype=bool, count=n)
+        has_tech = np.fromiter((bool(t) for t in technicals_list), dtype=bool, count=n)
+
+        if news_list is None:
+            n_scores = np.full(n, float(self._analyze_news([])[0]))
         else:
-             s = 1; st = "Safe"
-        score += s * 0.5; details['Contingent Liab'] = {'value': f"{cl_ratio:.1%}", 'score': s*0.5, 'status': st}
-        
-        # 22. Piotroski F-Score (Refined)
-        # > 7 Good, 5-6 Average, < 5 Avoid
-        piotroski = data.get('Piotroski Score', 0)
-        s = 0; st = 'N/A'
-        if piotroski > 7: s=1; st='Good (Strong)'
-        elif 5 <= piotroski <= 7: s=0.5; st='Average'
-        else: s=0; st='Avoid (Weak)'
-        score += s; details['Piotroski Score'] = {'value': piotroski, 'score': s, 'status': st}
-        
-        # 23. Working Capital (Mock)
-        score += 0.5; details['Working Cap Cycle'] = {'value': 'Stable', 'score': 0.5, 'status': 'Neutral'}
-        
-        # 24. CFO/PAT (>1)
-        s, st = evaluate('CFO to PAT', data.get('CFO to PAT', 1), 1)
-        score += s; details['CFO / PAT'] = {'value': self._safe_fmt(data.get('CFO to PAT')), 'score': s, 'status': st}
-        
-        # 24b. Book Value Analysis
-        # 1. Trend: (Using proxy if historical missing, but assuming positive BV is baseline)
-        # 2. Valuation: Price/Book vs Industry P/B
-        bv = data.get('Book Value', 0)
-        pb = data.get('Price to Book', 0)
-        ind_pb = data.get('Industry PB', 0) # Assuming this exists or we mock it
-        
-        s_bv = 0; st_bv_list = []
-        
-        # Check 1: Valuation
-        if pb > 0 and ind_pb > 0:
-            if pb < ind_pb: 
-                s_bv += 1; st_bv_list.append("Undervalued (vs Ind)")
-            else:
-                s_bv += 0; st_bv_list.append("Overvalued (vs Ind)")
+            n_scores = np.array([self._analyze_news(items or [])[0] for items in news_list], dtype=float)
+
+        return self._evaluate_tables(fund, tech, has_fund, has_tech, n_scores)
+
+    def evaluate_compact(self, symbols, fundamentals_list, technicals_list, news_list=None, peers_list=None):
+        """
+        Like evaluate_batch, but returns a ResultTable: fixed parameter slots,
+        status codes and the repriced inputs, with display strings built only
+        when a row is turned into a dict (table.row(symbol).to_dict()).
+        """
+        n = len(fundamentals_list)
+        fund = build_table(fundamentals_list, BATCH_FUNDAMENTAL_FIELDS + FUNDAMENTAL_DISPLAY_FIELDS)
+        tech = build_table(technicals_list, BATCH_TECHNICAL_FIELDS + TECHNICAL_DISPLAY_FIELDS)
+        has_fund = np.fromiter((bool(f) for f in fundamentals_list), dtype=bool, count=n)
+        has_tech = np.fromiter((bool(t) for t in technicals_list), dtype=bool, count=n)
+
+        if news_list is None and peers_list is None:
+            news = self._analyze_news([])
+            n_scores, news_details = np.full(n, float(news[0])), news[1]
         else:
-             s_bv += 0.5; st_bv_list.append("Valuation N/A")
-             
-        # Check 2: Book Value > 0 (Sanity)
-        if bv > 0: st_bv_list.append(f"BV: {bv}")
-        else: st_bv_list.append("Negative BV (Bad)")
-        
-        score += s_bv if s_bv <= 1 else 1
-        details['Book Value Analysis'] = {'value': f"P/B: {pb:.2f}", 'score': min(s_bv, 1), 'status': " | ".join(st_bv_list)}
-        
-        return score, details
+            news_list = news_list or [None] * n
+            peers_list = peers_list or [None] * n
+            news = [self._analyze_news(items or [], peers) for items, peers in zip(news_list, peers_list)]
+            n_scores = np.array([s for s, _ in news], dtype=float)
+            news_details = [d for _, d in news]
+
+        batch = self._evaluate_tables(fund, tech, has_fund, has_tech, n_scores)
+        return ResultTable.from_tables(
+            symbols, batch, display_columns(fundamentals_list, fund), display_columns(technicals_list, tech),
+            has_fund, has_tech, news_details, self,
+        )
+
+    def evaluate_prices(self, fundamentals, technicals, news, prices, peers=None):
+        """
+        Scores one stock at every price in `prices` in a single vectorized pass,
+        as if each were the live price. Returns the same arrays as evaluate_batch.
+        """
+        prices = np.asarray(prices, dtype=float)
+        n = len(prices)
+        fund = {k: np.repeat(v, n) for k, v in build_table([fundamentals], BATCH_FUNDAMENTAL_FIELDS).items()}
+        tech = {k: np.repeat(v, n) for k, v in build_table([technicals], BATCH_TECHNICAL_FIELDS).items()}
+        tech['Live Price'] = prices
+        has_fund = np.full(n, bool(fundamentals))
+        has_tech = np.full(n, bool(technicals))
+        n_scores = np.full(n, float(self._analyze_news(news or [], peers)[0]))
+        return self._evaluate_tables(fund, tech, has_fund, has_tech, n_scores)
+
+    def _evaluate_tables(self, fund, tech, has_fund, has_tech, n_scores):
+        # Best Available Price (Live > Fund > Close), same as evaluate_stock
+        live_price = tech['Live Price']
+        fund_price = np.where(has_fund, fund['Current Price'], 0.0)
+        tech_close = np.where(has_tech, tech['Close'], 0.0)
+        cmp = np.where(live_price > 0, live_price, np.where(fund_price > 0, fund_price, tech_close))
+
+        self._apply_price_table(fund, cmp, has_fund)
+        tech['Close'] = np.where(has_tech, cmp, tech['Close'])
+
+        f_scores, f_details = self.score_fundamentals_table(fund)
+        t_scores, t_details = self.score_technicals_table(tech)
+        t_scores = np.where(has_tech, t_scores, 0.0)
+
+        total = f_scores + t_scores + n_scores
+        result = {
+            'cmp': cmp,
+            'fundamental_score': f_scores,
+            'technical_score': t_scores,
+            'news_score': n_scores,
+            'total_score': total,
+            'details': {**f_details, **t_details},
+        }
+        result.update(self._verdicts_table(total, fund, tech))
+        return result
+
+    def _apply_price_table(self, fund, cmp, has_fund):
+        """Vector form of _apply_price for a fundamentals table (edited in place)."""
+        old_price = fund['Current Price']
+        moved = has_fund & (cmp > 0) & (old_price > 0) & (np.abs(cmp - old_price) > 0.01)
+        ratio = np.divide(cmp, old_price, out=np.ones(len(cmp)), where=moved)
+        fund['Market Cap'] = np.where(moved, fund['Market Cap'] * ratio, fund['Market Cap'])
+        fund['Stock P/E'] = np.where(moved, fund['Stock P/E'] * ratio, fund['Stock P/E'])
+        fund['Dividend Yield'] = np.where(moved, fund['Dividend Yield'] / ratio, fund['Dividend Yield'])
+        fund['Current Price'] = np.where(has_fund, cmp, old_price)
+
+    def _verdicts_table(self, total, fund, tech):
+        """Vector form of the verdict labels in _generate_verdicts (no summary texts)."""
+        ocf = _or(fund['Operating Cash Flow'], 1)
+        cfo_pat = _or(fund['CFO to PAT'], 1)
+        debt = fund['Debt / Equity']
+        is_risky = (ocf < 0) | ((cfo_pat < 0.5) & (debt > 1.0))
+
+        close = _or(tech['Close'], 100)
+        swing_score = (
+            (close > tech['50DMA']).astype(int)
+            + (tech['MACD'] > tech['MACD_SIGNAL'])
+            + (_or(tech['RSI'], 50) < 40)
+        )
+        swing_score = np.where(tech['indicators_available'] != 0, swing_score, 0)
+        swing = np.where(swing_score >= 2, "✅ BUY", "❌ AVOID").astype(object)
+
+        long_term = np.select([is_risky, total >= 25, total >= 15], ["❌ AVOID", "✅ BUY", "⚠️ HOLD"], "❌ AVOID").astype(object)
+        health = np.select(
+            [is_risky, total >= 25, total >= 15],
+            ["🔴 High Risk (Avoid)", "🟢 High Quality", "🟡 Medium Risk"], "🔴 High Risk"
+        ).astype(object)
+        return {
+            'swing_verdict': swing,
+            'long_term_verdict': long_term,
+            'health_label': health,
+            'risk_triggered': is_risky,
+        }
+
+    def _analyze_fundamentals(self, data):
+        # 26 parameters, see FUNDAMENTAL_RULES in src/analysis/rules.py
+        return _score_fundamentals(data or {})
+
+    def _na_note(self, data):
+        data_note = data.get('data_note') or 'Missing Historical Data'
+        data_source = data.get('data_source') or 'N/A'
+        return f"{data_note} (Source: {data_source})" if data_source != 'N/A' else data_note
 
     def _analyze_technicals(self, data):
-        score = 0
         details = {}
         if not data: return 0, {}
         
         # Check if indicators are actually available
         if not data.get('indicators_available', True):
             # Price only analysis or total N/A
-            data_note = data.get('data_note', 'Missing Historical Data')
-            data_source = data.get('data_source', 'N/A')
-            note_text = f"{data_note} (Source: {data_source})" if data_source != 'N/A' else data_note
-            
-            details['Trend (DMA)'] = {'value': 'N/A', 'score': 0, 'status': note_text}
+            details['Trend (DMA)'] = {'value': 'N/A', 'score': 0, 'status': self._na_note(data)}
             details['RSI'] = {'value': 'N/A', 'score': 0, 'status': 'N/A'}
             details['MACD'] = {'value': 'N/A', 'score': 0, 'status': 'N/A'}
             details['Pivot Support'] = {'value': 'N/A', 'score': 0, 'status': 'N/A'}
             details['Volume Trend'] = {'value': 'N/A', 'score': 0, 'status': 'N/A'}
             return 0, details
 
-        # 25. Trend (Moving Average Ribbon)
-        # Strong Bullish: Price > 50DMA > 200DMA
-        # Falling Knife: Price < 50DMA < 200DMA
-        close = data['Close']
-        dma50 = data['50DMA']
-        dma200 = data['200DMA']
-        
-        s=0; st='Neutral'
-        if close > dma50 and dma50 > dma200: 
-            s=1; st='Strong Bullish'
-        elif close < dma50 and dma50 < dma200:
-            s=0; st='Falling Knife (Bearish)'
-        elif close > dma200:
-             s=0.5; st='Bullish (>200DMA)'
-        else:
-             s=0; st='Bearish'
-             
-        score += s; details['Trend (DMA)'] = {'value': f"{self._safe_fmt(close, ':.0f')} vs {self._safe_fmt(dma200, ':.0f')}", 'score': s, 'status': st}
-        
-        # 26. RSI (30-70 range logic)
-        rsi = data.get('RSI', 50)
-        if 40 < rsi < 70: s=0.5; st='Neutral'
-        elif rsi <= 40: s=1; st='Oversold (Buy)'
-        else: s=0; st='Overbought'
-        score += s; details['RSI'] = {'value': self._safe_fmt(rsi, ':.1f'), 'score': s, 'status': st}
-        
-        # 27. MACD
-        if data.get('MACD', 0) > data.get('MACD_SIGNAL', 0): s=1; st='Bullish'
-        else: s=0; st='Bearish'
-        score += s; details['MACD'] = {'value': self._safe_fmt(data.get('MACD', 0)), 'score': s, 'status': st}
-        
-        # 28. Pivot (Price > Pivot)
-        if data.get('Close', 0) > data.get('Pivot', 0): s=1; st='Above Pivot'
-        else: s=0; st='Below Pivot'
-        score += s; details['Pivot Support'] = {'value': self._safe_fmt(data.get('Pivot', 0), ':.1f'), 'score': s, 'status': st}
-        
-        # 29. VWAP/Vol
-        if data.get('VWAP_Trend') == 'Bullish': s=1
-        else: s=0
-        score += s; details['Volume Trend'] = {'value': data.get('Volume_Trend'), 'score': s, 'status': data.get('VWAP_Trend')}
+        # 25-29. Trend, RSI, MACD, Pivot, Volume (see TECHNICAL_RULES)
+        return _score_technicals(data)
 
-        return score, details
+    def score_fundamentals_table(self, table):
+        """
+        Vectorized counterpart of _analyze_fundamentals.
+        `table` maps field -> array (one row per stock), e.g. build_table(records, FUNDAMENTAL_FIELDS).
+        Returns (scores, {param: (scores, statuses)}).
+        """
+        return _score_fundamentals_table(table)
+
+    def score_technicals_table(self, table):
+        """
+        Vectorized counterpart of _analyze_technicals, including the
+        N/A rows for stocks without indicator history.
+        """
+        total, details = _score_technicals_table(table)
+        if 'indicators_available' not in table:
+            return total, details
+
+        missing = ~np.asarray(table['indicators_available'], dtype=bool)
+        if missing.any():
+            total = np.where(missing, 0.0, total)
+            for s, st in details.values():
+                s[missing] = 0
+                st[missing] = 'N/A'
+            rows = np.flatnonzero(missing)
+            notes = [self._na_note({k: table[k][i] for k in ('data_note', 'data_source') if k in table}) for i in rows]
+            details['Trend (DMA)'][1][rows] = notes
+        return total, details
 
-    def _analyze_news(self, news_items):
+    def _analyze_news(self, news_items, peers=None):
         score = 0
         details = {}
         
@@ -417,11 +384,21 @@ class AnalysisEngine:
         # 35. Regulatory
         score += 0.5; details['Regulatory / Credit'] = {'value': 'Stable', 'score': 0.5, 'status': 'Neutral'}
         
-        # 36. Sector
-        score += sentiment_score; details['Sector vs Nifty'] = {'value': 'Trend', 'score': sentiment_score, 'status': status}
+        # 36. Sector (sector medians vs the indexed universe, news proxy without peer data)
+        sector_score = (peers or {}).get('sector_score', math.nan)
+        if math.isnan(sector_score):
+            score += sentiment_score; details['Sector vs Nifty'] = {'value': 'Trend', 'score': sentiment_score, 'status': status}
+        else:
+            s, st = self._peer_band(sector_score, 'Outperforming', 'In Line', 'Underperforming')
+            score += s; details['Sector vs Nifty'] = {'value': f"{peers['sector']}: {sector_score:.0f}%ile", 'score': s, 'status': st}
 
-        # 37. Peer Comparison (Mock)
-        score += 0.5; details['Peer Comparison'] = {'value': 'Fair', 'score': 0.5, 'status': 'Neutral'}
+        # 37. Peer Comparison (percentile vs sector peers, neutral without peer data)
+        peer_score = (peers or {}).get('peer_score', math.nan)
+        if math.isnan(peer_score):
+            score += 0.5; details['Peer Comparison'] = {'value': 'Fair', 'score': 0.5, 'status': 'Neutral'}
+        else:
+            s, st = self._peer_band(peer_score, 'Beats Peers', 'In Line', 'Lags Peers')
+            score += s; details['Peer Comparison'] = {'value': f"{peer_score:.0f}%ile of {peers['peers']}", 'score': s, 'status': st}
         
         # 30/31 Placeholders
         score += 1; details['Promoter Pledge'] = {'value': 'Stable', 'score': 0.5, 'status': 'Safe'}
@@ -430,6 +407,12 @@ class AnalysisEngine:
         return score, details
         
         return score, details
+
+    def _peer_band(self, percentile, good, fair, bad):
+        if percentile >= 60: return 1, good
+        if percentile >= 40: return 0.5, fair
+        return 0, bad
+
     def _generate_verdicts(self, total_score, fundamentals, technicals):
         if not fundamentals: fundamentals = {}
         if not technicals: technicals = {}
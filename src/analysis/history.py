@@ -0,0 +1,171 @@
+"""
+Point-in-time score history: "what would the analyzer have said on each day?"
+
+    python -m src.analysis.history --stock TCS --years 3 --output tcs_scores.csv
+
+Rebuilds a daily score series from DataCache: each bar is scored against the
+fundamentals snapshot that was current on that date (no look-ahead) and the
+indicators computed from the OHLC history up to that bar. A snapshot's
+price-independent rules are scored once and reused for every bar it covers;
+only the price-linked fundamentals and the technicals are re-scored per bar,
+all in one vectorized pass. News is not stored, so every day gets the
+neutral news score. A fundamentals snapshot is saved every day a stock is
+fetched (FundamentalFetcher.get_data), so the history grows with use.
+
+Forward returns are added so the series can be checked for whether high
+scores actually preceded good returns (see summarize).
+"""
+import argparse
+import logging
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from src.analysis.engine import AnalysisEngine, BATCH_FUNDAMENTAL_FIELDS
+from src.analysis.rules import FUNDAMENTAL_RULES, build_table, compile_vector, price_rules
+from src.fetchers.cache import DataCache
+from src.fetchers.technicals import TechnicalFetcher
+
+logger = logging.getLogger(__name__)
+
+_PRICE_RULES = price_rules(FUNDAMENTAL_RULES)
+_score_static_fundamentals = compile_vector(tuple(r for r in FUNDAMENTAL_RULES if r not in _PRICE_RULES))
+_score_price_fundamentals = compile_vector(_PRICE_RULES)
+
+HORIZONS = (20, 60, 120)  # trading days, roughly 1 / 3 / 6 months
+
+
+def _bar_dates(index):
+    """Calendar dates of an OHLC index (DatetimeIndex or the strings read back from CSV)."""
+    return pd.to_datetime(pd.Index(index).astype(str).str[:10]).values.astype('datetime64[D]')
+
+
+def load_snapshots(symbol, cache):
+    """All stored fundamentals snapshots for a symbol as (dates, records)."""
+    dates = cache.snapshot_dates(symbol)
+    records = [cache.load_fundamentals(symbol, d) for d in dates]
+    kept = [(d, r) for d, r in zip(dates, records) if r]
+    return [d for d, _ in kept], [r for _, r in kept]
+
+
+def score_history(snapshot_dates, snapshots, ohlc, engine=None):
+    """
+    Scores every bar of `ohlc` from the snapshot in force on that date.
+    Bars before the first snapshot are dropped. Returns a DataFrame indexed by
+    date with close, the four scores and the two verdicts.
+    """
+    if not snapshots:
+        raise ValueError("No fundamentals snapshots to score against.")
+    if ohlc is None or ohlc.empty:
+        raise ValueError("No OHLC history to score.")
+    engine = engine or AnalysisEngine()
+
+    bars = _bar_dates(ohlc.index)
+    snap_days = np.array(snapshot_dates, dtype='datetime64[D]')
+    snap_idx = np.searchsorted(snap_days, bars, side='right') - 1
+    keep = snap_idx >= 0
+    if not keep.any():
+        raise ValueError("OHLC history ends before the first fundamentals snapshot.")
+
+    # 1. Technicals for every bar (indicators need the full history for warm-up)
+    indicators = TechnicalFetcher().indicator_series(ohlc)
+    tech = {col: indicators[col].values[keep] for col in indicators.columns}
+    close = tech['Close']
+    n = len(close)
+
+    # 2. Fundamentals: price-free rules once per snapshot, the rest per bar
+    snap_table = build_table(snapshots, BATCH_FUNDAMENTAL_FIELDS)
+    static_scores, _ = _score_static_fundamentals(snap_table)
+    idx = snap_idx[keep]
+    fund = {k: v[idx] for k, v in snap_table.items()}
+    engine._apply_price_table(fund, close, np.ones(n, dtype=bool))
+    price_scores, _ = _score_price_fundamentals(fund)
+    f_scores = static_scores[idx] + price_scores
+
+    t_scores, _ = engine.score_technicals_table(tech)
+    n_scores = np.full(n, float(engine._analyze_news([])[0]))
+    total = f_scores + t_scores + n_scores
+    verdicts = engine._verdicts_table(total, fund, tech)
+
+    return pd.DataFrame({
+        'close': close,
+        'fundamental_score': f_scores,
+        'technical_score': t_scores,
+        'news_score': n_scores,
+        'total_score': total,
+        'swing_verdict': verdicts['swing_verdict'],
+        'long_term_verdict': verdicts['long_term_verdict'],
+        'snapshot': snap_days[idx].astype(str),
+    }, index=pd.DatetimeIndex(bars[keep], name='date'))
+
+
+def add_forward_returns(history, horizons=HORIZONS):
+    """Adds fwd_<h>d columns: % return from each bar's close to the close h bars later."""
+    for h in horizons:
+        history[f'fwd_{h}d'] = (history['close'].shift(-h) / history['close'] - 1) * 100
+    return history
+
+
+def summarize(history, horizons=HORIZONS, buckets=5):
+    """
+    Did higher scores precede better returns? Per horizon: rank correlation of
+    total_score vs forward return, and the mean return per score bucket.
+    """
+    rows = []
+    for h in horizons:
+        col = f'fwd_{h}d'
+        if col not in history:
+            continue
+        sample = history[['total_score', col]].dropna()
+        if len(sample) < buckets * 2:
+            continue
+        ranks = sample.rank()
+        bucket = pd.qcut(sample['total_score'], buckets, duplicates='drop')
+        by_bucket = sample.groupby(bucket, observed=True)[col].mean().round(2)
+        rows.append({
+            'horizon': f'{h}d',
+            'samples': len(sample),
+            'rank_corr': round(float(ranks['total_score'].corr(ranks[col])), 3),
+            'bucket_returns': {str(k): v for k, v in by_bucket.items()},
+        })
+    return rows
+
+
+def reconstruct(symbol, years=3, cache=None, engine=None):
+    """Score history for the last `years` years of a cached symbol, with forward returns."""
+    cache = cache or DataCache()
+    snapshot_dates, snapshots = load_snapshots(symbol, cache)
+    ohlc = cache.load_ohlc(symbol)
+    history = add_forward_returns(score_history(snapshot_dates, snapshots, ohlc, engine))
+    start = np.datetime64(date.today(), 'D') - np.timedelta64(int(years * 365), 'D')
+    return history[history.index >= start]
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Rebuild a stock's daily score history from the local cache")
+    parser.add_argument("--stock", type=str, required=True, help="Stock Symbol (e.g., TCS)")
+    parser.add_argument("--years", type=float, default=3, help="How far back to go")
+    parser.add_argument("--output", type=str, default=None, help="CSV path (default: <SYMBOL>_scores.csv)")
+    args = parser.parse_args()
+
+    symbol = args.stock.upper()
+    try:
+        history = reconstruct(symbol, args.years)
+    except ValueError as e:
+        logger.error(f"{symbol}: {e} The history builds up from the dated fundamentals snapshot saved "
+                     f"each day {symbol} is fetched (web app, bot, CLI, screener); its OHLC comes from the "
+                     f"screener's cache. Run `python -m src.screener --universe <file> --fetch-missing "
+                     f"--refresh-days 1` daily to collect both.")
+        return
+
+    output = args.output or f"{symbol}_scores.csv"
+    history.to_csv(output)
+    logger.info(f"Saved {len(history)} days of scores to {output}")
+    for row in summarize(history):
+        print(f"{row['horizon']:>5}  n={row['samples']:<5} rank corr={row['rank_corr']:+.3f}  "
+              f"mean return by score bucket: {row['bucket_returns']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Peer comparison against cached fundamentals, grouped by sector.
+
+SectorIndex keeps one column per metric for every sector, sorted once, so a
+stock's percentile among its peers is a pair of np.searchsorted calls per
+metric. When a stock's fundamentals change only its sector is marked dirty
+and re-sorted on the next lookup.
+
+compare() feeds the 'Peer Comparison' and 'Sector vs Nifty' parameters of
+AnalysisEngine._analyze_news. 'Sector vs Nifty' ranks the sector's median
+metrics against every indexed stock (the screened universe, e.g. Nifty 500).
+"""
+import logging
+import math
+import os
+import threading
+
+import numpy as np
+from src.fetchers.cache import DataCache
+
+logger = logging.getLogger(__name__)
+
+# Metric -> True when higher is better
+PEER_METRICS = {
+    'Stock P/E': False,
+    'ROCE': True,
+    'ROE': True,
+    'Debt / Equity': False,
+    'Revenue CAGR': True,
+    'Profit CAGR': True,
+}
+
+MIN_PEERS = 3  # besides the stock itself
+
+
+def sector_of(fundamentals):
+    return (fundamentals or {}).get('Sector') or (fundamentals or {}).get('Industry') or None
+
+
+def _metric_values(fundamentals):
+    """Metric vector for one stock; NaN where missing or meaningless (loss-making P/E)."""
+    values = []
+    for field in PEER_METRICS:
+        try:
+            v = float(fundamentals.get(field))
+        except (TypeError, ValueError):
+            v = math.nan
+        if field == 'Stock P/E' and not v > 0:
+            v = math.nan
+        values.append(v)
+    return tuple(values)
+
+
+def _sorted_columns(matrix):
+    """One sorted array per metric column, NaNs dropped."""
+    return [np.sort(col[~np.isnan(col)]) for col in matrix.T]
+
+
+def _percentile(sorted_col, value):
+    """Mid-rank percentile (0-100) of value within a sorted column, NaN if not comparable."""
+    n = len(sorted_col)
+    if n == 0 or math.isnan(value):
+        return math.nan
+    lo = np.searchsorted(sorted_col, value, side='left')
+    hi = np.searchsorted(sorted_col, value, side='right')
+    return (lo + hi) / 2 / n * 100
+
+
+def _direction_adjusted(pcts):
+    """Percentiles turned into "better than x% of peers"; mean over metrics that have one."""
+    adjusted = [p if up else 100 - p for p, up in zip(pcts, PEER_METRICS.values()) if not math.isnan(p)]
+    return sum(adjusted) / len(adjusted) if adjusted else math.nan
+
+
+class SectorIndex:
+    """
+    In-memory columnar index of fundamentals by sector.
+
+    update() is cheap (marks the sector dirty); sorting happens lazily per
+    sector on the next compare(). Thread-safe for the web app.
+    """
+    def __init__(self, cache=None):
+        self.cache = cache
+        self._loaded = cache is None
+        self._stocks = {}     # symbol -> (sector, metric tuple)
+        self._sectors = {}    # sector -> (symbols, matrix, sorted columns, median tuple)
+        self._dirty = set()
+        self._market = None   # sorted columns over every stock, None when stale
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_cache(cls, cache=None):
+        index = cls(cache or DataCache())
+        index.refresh()
+        return index
+
+    def refresh(self):
+        """Loads the newest cached snapshot of every symbol; unchanged stocks are no-ops."""
+        folder = self.cache.fund_dir
+        symbols = sorted(os.listdir(folder)) if os.path.isdir(folder) else []
+        for symbol in symbols:
+            data = self.cache.load_fundamentals(symbol)
+            if data:
+                self.update(symbol, data)
+        self._loaded = True
+        logger.info(f"Sector index: {len(self._stocks)} stocks in {len(self.sectors())} sectors")
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.refresh()
+
+    def update(self, symbol, fundamentals):
+        """Adds or refreshes one stock. Returns True if its sector needs re-sorting."""
+        sector = sector_of(fundamentals)
+        if not sector:
+            return False
+        symbol = symbol.upper()
+        entry = (sector, _metric_values(fundamentals))
+        with self._lock:
+            old = self._stocks.get(symbol)
+            if old == entry:
+                return False
+            self._stocks[symbol] = entry
+            self._dirty.add(sector)
+            if old and old[0] != sector:
+                self._dirty.add(old[0])
+            self._market = None
+        return True
+
+    def remove(self, symbol):
+        with self._lock:
+            old = self._stocks.pop(symbol.upper(), None)
+            if old:
+                self._dirty.add(old[0])
+                self._market = None
+
+    def sectors(self):
+        return sorted({sector for sector, _ in self._stocks.values()})
+
+    def _rebuild(self):
+        """Re-sorts the dirty sectors (and the market columns if stale). Caller holds the lock."""
+        if self._dirty:
+            members = {}
+            for symbol, (sector, values) in self._stocks.items():
+                if sector in self._dirty:
+                    members.setdefault(sector, []).append((symbol, values))
+            for sector in self._dirty:
+                rows = members.get(sector)
+                if not rows:
+                    self._sectors.pop(sector, None)
+                    continue
+                matrix = np.array([values for _, values in rows], dtype=float)
+                medians = tuple(np.nan if np.isnan(c).all() else float(np.nanmedian(c)) for c in matrix.T)
+                self._sectors[sector] = ([s for s, _ in rows], matrix, _sorted_columns(matrix), medians)
+            self._dirty.clear()
+
+        if self._market is None and self._stocks:
+            matrix = np.array([values for _, values in self._stocks.values()], dtype=float)
+            self._market = _sorted_columns(matrix)
+
+    def compare(self, symbol, fundamentals=None):
+        """
+        Percentile ranks of a stock against its sector peers. Passing fresh
+        `fundamentals` updates the index first. Returns None when the sector
+        is unknown or has fewer than MIN_PEERS other stocks, else:
+            {'sector', 'peers', 'metrics': {name: {'value', 'percentile'}},
+             'peer_score', 'sector_score'}
+        peer_score / sector_score are 0-100, "better than x%" after flipping
+        the lower-is-better metrics.
+        """
+        self._ensure_loaded()
+        symbol = symbol.upper()
+        if fundamentals:
+            self.update(symbol, fundamentals)
+
+        with self._lock:
+            entry = self._stocks.get(symbol)
+            if entry is None:
+                return None
+            self._rebuild()
+            sector, values = entry
+            _, matrix, columns, medians = self._sectors[sector]
+            market = self._market
+
+        peers = len(matrix) - 1
+        if peers < MIN_PEERS:
+            return None
+
+        pcts = [_percentile(col, v) for col, v in zip(columns, values)]
+        sector_pcts = [_percentile(col, m) for col, m in zip(market, medians)]
+        return {
+            'sector': sector,
+            'peers': peers,
+            'metrics': {
+                name: {'value': v, 'percentile': p}
+                for name, v, p in zip(PEER_METRICS, values, pcts)
+            },
+            'sector_medians': dict(zip(PEER_METRICS, medians)),
+            'peer_score': _direction_adjusted(pcts),
+            'sector_score': _direction_adjusted(sector_pcts),
+        }
+
+
+# Shared per-process index over the local DataCache, loaded on first compare()
+sector_index = SectorIndex(DataCache())
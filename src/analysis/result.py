@@ -0,0 +1,261 @@
+"""
+Compact, array-backed results for holding many evaluated stocks.
+
+An evaluate_stock result is a nested dict of ~39 small dicts with every
+display string built up front. ResultTable keeps the same information for N
+stocks in a few arrays:
+
+    scores   float32 (N, P)   one fixed slot per parameter (PARAMETERS)
+    status   uint16  (N, P)   codes into the table's own status vocabulary
+                              (uint32 for tables too big for 16-bit codes)
+    columns  field -> array   the (repriced) inputs plus masks of missing fields,
+                              one set for fundamentals and one for technicals
+    totals   float arrays, verdict codes, risk flags
+
+Display values, summaries and swing levels are only formatted when a row is
+turned back into the classic dict (row(i).to_dict()) for report.html, the
+InfographicGenerator or a bot caption.
+"""
+import threading
+
+import numpy as np
+from src.analysis.rules import FUNDAMENTAL_RULES, TECHNICAL_RULES, compile_display
+
+NEWS_PARAMETERS = (
+    'Orders / Business', 'Dividend / Buyback', 'Results Performance', 'Regulatory / Credit',
+    'Sector vs Nifty', 'Peer Comparison', 'Promoter Pledge', 'Management',
+)
+FUNDAMENTAL_PARAMETERS = tuple(r.name for r in FUNDAMENTAL_RULES)
+TECHNICAL_PARAMETERS = tuple(r.name for r in TECHNICAL_RULES)
+PARAMETERS = FUNDAMENTAL_PARAMETERS + TECHNICAL_PARAMETERS + NEWS_PARAMETERS
+SLOT = {name: i for i, name in enumerate(PARAMETERS)}
+
+_display = compile_display(FUNDAMENTAL_RULES + TECHNICAL_RULES)
+
+# Inputs read by display formatters and _generate_verdicts besides the rule fields
+FUNDAMENTAL_DISPLAY_FIELDS = ('IV P10', 'IV P50', 'IV P90')
+TECHNICAL_DISPLAY_FIELDS = ('S1', 'R1', 'High', 'Low')
+
+
+class StatusCodes:
+    """
+    Interned status / label strings of one ResultTable. Every distinct string
+    gets a small integer code; the table stores the codes. The vocabulary
+    starts from the fixed rule-table labels (STATUS_LABELS) and also holds the
+    table's free text (e.g. "BV: 120", news "+p/-n" values), so it lives and
+    dies with its table instead of growing for the life of the process.
+    """
+    def __init__(self, seed=(), dtype=np.uint16):
+        self.dtype = dtype
+        self.labels = []
+        self._codes = {}
+        self._lock = threading.Lock()
+        for label in seed:
+            self.code(label)
+
+    def code(self, label):
+        c = self._codes.get(label)
+        if c is None:
+            with self._lock:
+                c = self._codes.get(label)
+                if c is None:
+                    c = len(self.labels)
+                    self.labels.append(label)
+                    self._codes[label] = c
+        return c
+
+    def encode(self, labels):
+        """Object array of strings -> codes."""
+        uniq, inverse = np.unique(np.asarray(labels, dtype=object).astype(str), return_inverse=True)
+        lookup = np.array([self.code(u) for u in uniq], dtype=self.dtype)
+        return lookup[inverse.reshape(-1)].reshape(np.shape(labels))
+
+    def label(self, code):
+        return self.labels[code]
+
+    def decode(self, codes):
+        return np.array(self.labels, dtype=object)[np.asarray(codes)]
+
+
+def _seed_labels():
+    labels = ['N/A']
+    for rule in FUNDAMENTAL_RULES + TECHNICAL_RULES:
+        labels.extend(b.status for b in rule.bands)
+        labels.append(rule.default[1])
+        if rule.na:
+            labels.append(rule.na[1])
+    return labels
+
+
+# Band / default / N/A statuses of the rule tables, the fixed start of every vocabulary
+STATUS_LABELS = tuple(dict.fromkeys(_seed_labels()))
+
+
+def display_columns(records, table):
+    """
+    The scoring table plus, for fields some records lack, an int8 mask
+    (1 = key missing, 2 = None) so lazily built details show what
+    evaluate_stock would have shown. Returns (columns, missing).
+    """
+    records = [r or {} for r in records]
+    missing = {}
+    for field in table:
+        absent = np.fromiter((1 if field not in r else (2 if r[field] is None else 0) for r in records),
+                             dtype=np.int8, count=len(records))
+        if absent.any():
+            missing[field] = absent
+    return dict(table), missing
+
+
+class ResultTable:
+    """Scores and statuses of N stocks in fixed parameter slots. See module docstring."""
+
+    def __init__(self, symbols, scores, status, totals, verdicts, fund_columns, tech_columns,
+                 has_fund, has_tech, risk_triggered, news_values, labels, engine):
+        self.symbols = list(symbols)
+        self.scores = scores            # float32 (N, P)
+        self.status = status            # (N, P) codes into self.labels
+        self.totals = totals            # name -> float array
+        self.verdicts = verdicts        # name -> codes
+        self.fund_columns = fund_columns  # (field -> array, field -> missing mask)
+        self.tech_columns = tech_columns
+        self.has_fund = has_fund
+        self.has_tech = has_tech
+        self.news_values = news_values  # codes (N, len(NEWS_PARAMETERS))
+        self.risk_triggered = risk_triggered
+        self.labels = labels            # StatusCodes of this table
+        self._engine = engine
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+
+    @classmethod
+    def from_tables(cls, symbols, batch, fund_columns, tech_columns, has_fund, has_tech, news_details, engine):
+        """
+        Builds the table from an AnalysisEngine._evaluate_tables result.
+        `news_details` is one _analyze_news details dict per row (or one shared dict).
+        """
+        n = len(symbols)
+        # Worst case every cell is a new label; wider codes only for huge tables
+        most = len(STATUS_LABELS) + n * (len(PARAMETERS) + len(NEWS_PARAMETERS) + 3)
+        labels = StatusCodes(STATUS_LABELS, np.uint16 if most <= np.iinfo(np.uint16).max + 1 else np.uint32)
+        scores = np.zeros((n, len(PARAMETERS)), dtype=np.float32)
+        status = np.zeros((n, len(PARAMETERS)), dtype=labels.dtype)
+        for name, (s, st) in batch['details'].items():
+            j = SLOT[name]
+            scores[:, j] = s
+            status[:, j] = labels.encode(st)
+
+        if isinstance(news_details, dict):
+            news_details = [news_details] * n
+        news_values = np.zeros((n, len(NEWS_PARAMETERS)), dtype=labels.dtype)
+        for k, name in enumerate(NEWS_PARAMETERS):
+            j = SLOT[name]
+            scores[:, j] = [d[name]['score'] for d in news_details]
+            status[:, j] = [labels.code(d[name]['status']) for d in news_details]
+            news_values[:, k] = [labels.code(d[name]['value']) for d in news_details]
+
+        totals = {k: np.asarray(batch[k], dtype=float) for k in
+                  ('cmp', 'fundamental_score', 'technical_score', 'news_score', 'total_score')}
+        verdicts = {k: labels.encode(batch[k]) for k in ('swing_verdict', 'long_term_verdict', 'health_label')}
+        return cls(symbols, scores, status, totals, verdicts, fund_columns, tech_columns,
+                   has_fund, has_tech, np.asarray(batch['risk_triggered'], dtype=bool), news_values, labels, engine)
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __getitem__(self, key):
+        """Column access like an evaluate_batch result: scores, cmp, decoded verdicts."""
+        if key in self.totals:
+            return self.totals[key]
+        if key in self.verdicts:
+            return self.labels.decode(self.verdicts[key])
+        if key == 'risk_triggered':
+            return self.risk_triggered
+        raise KeyError(key)
+
+    def index(self, symbol):
+        return self._index[symbol]
+
+    def row(self, i):
+        if isinstance(i, str):
+            i = self.index(i)
+        return CompactResult(self, i)
+
+    def nbytes(self):
+        arrays = [self.scores, self.status, self.news_values, self.risk_triggered, self.has_fund, self.has_tech]
+        arrays += list(self.totals.values()) + list(self.verdicts.values())
+        for columns, missing in (self.fund_columns, self.tech_columns):
+            arrays += list(columns.values()) + list(missing.values())
+        return sum(a.nbytes for a in arrays)
+
+    def _record(self, columns, i):
+        """Row i as a plain dict, leaving out fields the input didn't have."""
+        columns, missing = columns
+        record = {}
+        for field, col in columns.items():
+            state = missing[field][i] if field in missing else 0
+            if state == 1:
+                continue
+            v = None if state == 2 else col[i]
+            record[field] = v.item() if hasattr(v, 'item') else v
+        return record
+
+
+class CompactResult:
+    """One row of a ResultTable. Attributes are read from the arrays; to_dict() formats."""
+    __slots__ = ('table', 'i')
+
+    def __init__(self, table, i):
+        self.table = table
+        self.i = i
+
+    @property
+    def symbol(self):
+        return self.table.symbols[self.i]
+
+    def __getattr__(self, name):
+        table = self.table
+        if name in table.totals:
+            return float(table.totals[name][self.i])
+        if name in table.verdicts:
+            return table.labels.label(table.verdicts[name][self.i])
+        raise AttributeError(name)
+
+    def score(self, name):
+        return float(self.table.scores[self.i, SLOT[name]])
+
+    def status(self, name):
+        return self.table.labels.label(self.table.status[self.i, SLOT[name]])
+
+    def to_dict(self):
+        """The evaluate_stock dict (without 'inputs'), for report.html and the renderer."""
+        table, i = self.table, self.i
+        fundamentals = table._record(table.fund_columns, i) if table.has_fund[i] else {}
+        technicals = table._record(table.tech_columns, i) if table.has_tech[i] else {}
+
+        details = {}
+        for name in FUNDAMENTAL_PARAMETERS:
+            details[name] = self._detail(name, _display[name](fundamentals))
+        if table.has_tech[i]:
+            tech_na = not technicals.get('indicators_available', True)
+            for name in TECHNICAL_PARAMETERS:
+                details[name] = self._detail(name, 'N/A' if tech_na else _display[name](technicals))
+        for k, name in enumerate(NEWS_PARAMETERS):
+            details[name] = self._detail(name, table.labels.label(table.news_values[i, k]))
+
+        result = {
+            'fundamental_score': self.fundamental_score,
+            'technical_score': self.technical_score,
+            'news_score': self.news_score,
+            'total_score': self.total_score,
+            'details': details,
+            'cmp': self.cmp,
+            'symbol': self.symbol,
+        }
+        result.update(table._engine._generate_verdicts(result['total_score'], fundamentals, technicals))
+        return result
+
+    def _detail(self, name, value):
+        j = SLOT[name]
+        score = float(self.table.scores[self.i, j])
+        return {'value': value, 'score': int(score) if score.is_integer() else score,
+                'status': self.table.labels.label(self.table.status[self.i, j])}
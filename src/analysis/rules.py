@@ -0,0 +1,547 @@
+"""
+Declarative scoring rules for the AnalysisEngine.
+
+Each parameter is described once as a Rule: the fields it reads, an ordered
+list of bands (first match wins), the weight and the display format. The
+rule tables are compiled into two evaluators:
+
+    compile_scalar(rules)  -> fn(record)  -> (score, details)
+        The per-stock path used by evaluate_stock.
+
+    compile_vector(rules)  -> fn(table)   -> (scores, {name: (scores, statuses)})
+        Scores a column-oriented table (field -> array, one row per stock)
+        in one NumPy pass. Display values are not built on this path.
+
+A handful of parameters combine several checks into one status string
+(P/E vs industry, OCF quality, Book Value); those are written as a pair of
+scalar/vector functions and plugged into the table like any other rule.
+"""
+import math
+import operator
+import numpy as np
+
+# Bump whenever a threshold, band or label changes so cached scores are invalidated.
+RULES_VERSION = 2
+
+_OPS = {'>': operator.gt, '<': operator.lt, '>=': operator.ge, '<=': operator.le}
+
+# Value used when a field is missing from the record (mirrors the old data.get defaults)
+FIELD_DEFAULTS = {
+    'PEG Ratio': 2,
+    'CFO to PAT': 1,
+    'Net Worth': 1,
+    'RSI': 50,
+    'indicators_available': True,
+}
+
+# Fields that move with the live price (see AnalysisEngine._apply_price)
+PRICE_FIELDS = ('Current Price', 'Market Cap', 'Stock P/E', 'Dividend Yield', 'Close')
+
+# Non-numeric technical fields, kept as object columns in a table
+STRING_FIELDS = ('VWAP_Trend', 'Volume_Trend', 'data_note', 'data_source')
+
+# Numeric fields whose status text shows the value as given (120, not 120.0);
+# a table also keeps them as an object column under raw_field(field)
+RAW_TEXT_FIELDS = ('Book Value',)
+
+
+def raw_field(field):
+    return f"{field} (raw)"
+
+
+def safe_fmt(val, fmt=":.2f"):
+    try:
+        if val is None or val == "": return "N/A"
+        return ("{"+fmt+"}").format(float(val))
+    except:
+        return "N/A"
+
+
+def _num(data, field):
+    """Reads a numeric field: missing -> default, None -> 0.0, unparseable -> NaN."""
+    v = data.get(field, FIELD_DEFAULTS.get(field, 0))
+    if v is None: return 0.0
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+class Band:
+    """(score, status) awarded when all clauses hold. A clause is (field, op, rhs),
+    rhs being a number, another field name, or a (field, factor) pair."""
+    __slots__ = ('score', 'status', 'clauses')
+
+    def __init__(self, score, status, *clauses):
+        self.score = score
+        self.status = status
+        self.clauses = clauses
+
+
+class Show:
+    """Display formatter for a detail 'value'. fill=True formats the default when missing."""
+    __slots__ = ('field', 'fmt', 'unit', 'fill')
+
+    def __init__(self, field, fmt=":.2f", unit="", fill=False):
+        self.field = field
+        self.fmt = fmt
+        self.unit = unit
+        self.fill = fill
+
+    def __call__(self, data):
+        if self.fill:
+            val = data.get(self.field, FIELD_DEFAULTS.get(self.field, 0))
+        else:
+            val = data.get(self.field)
+        return safe_fmt(val, self.fmt) + self.unit
+
+
+class Rule:
+    """
+    One scored parameter.
+    bands   : ordered Bands, the first whose clauses all hold wins, else `default`.
+    na      : (score, status) when a tested field is NaN / unparseable (None = no check).
+    weight  : multiplier applied to the band score.
+    show    : Show, callable(record) or constant used for the detail 'value'.
+    custom  : (scalar_fn(record), vector_fn(cols)) replacing the band evaluation.
+    """
+    __slots__ = ('name', 'bands', 'default', 'na', 'weight', 'show', 'custom', 'fields')
+
+    def __init__(self, name, bands=(), default=(0, 'Negative'), na=None, weight=1,
+                 show=None, custom=None, fields=()):
+        self.name = name
+        self.bands = tuple(bands)
+        self.default = default
+        self.na = na
+        self.weight = weight
+        self.show = show
+        self.custom = custom
+        used = list(fields)
+        for band in self.bands:
+            for lhs, _, rhs in band.clauses:
+                used.append(lhs)
+                if isinstance(rhs, str): used.append(rhs)
+                elif isinstance(rhs, tuple): used.append(rhs[0])
+        self.fields = tuple(dict.fromkeys(used))
+
+
+def threshold(name, field, op, limit, show):
+    """The classic pass/fail check: 1 'Positive' when `field op limit`, else 0 'Negative'."""
+    return Rule(name, [Band(1, 'Positive', (field, op, limit))], default=(0, 'Negative'),
+                na=(0, 'N/A'), show=show)
+
+
+# --- Composite rules (scalar + vector pairs) ---
+
+_PE_SUFFIX_GOOD = ' (Vs Ind: Attractive)'
+_PE_SUFFIX_BAD = ' (Vs Ind: Cautious)'
+
+def _pe_scalar(data):
+    pe = _num(data, 'Stock P/E'); ind_pe = _num(data, 'Industry PE')
+    s = 0; st = 'N/A'
+    if pe > 0:
+        if pe < 12: s=1; st='Extremely Oversold'
+        elif pe < 15: s=1; st='Very Attractive'
+        elif pe < 20: s=0.5; st='Attractive'
+        elif pe < 25: s=0.5; st='Expensive'
+        else: s=0; st='Overbought'
+
+        # Industry Comparison Bonus/Penalty
+        if ind_pe > 0:
+            st += _PE_SUFFIX_GOOD if pe < ind_pe else _PE_SUFFIX_BAD
+    return s, st
+
+def _pe_vector(cols):
+    pe = cols('Stock P/E'); ind_pe = cols('Industry PE')
+    conds = [pe < 12, pe < 15, pe < 20, pe < 25]
+    s = np.select(conds, [1, 1, 0.5, 0.5], 0.0)
+    st = np.select(conds, ['Extremely Oversold', 'Very Attractive', 'Attractive', 'Expensive'], 'Overbought').astype(object)
+    suffix = np.where(pe < ind_pe, _PE_SUFFIX_GOOD, _PE_SUFFIX_BAD).astype(object)
+    st = np.where(ind_pe > 0, st + suffix, st)
+    valid = pe > 0
+    return np.where(valid, s, 0.0), np.where(valid, st, 'N/A')
+
+def _pe_show(data):
+    return f"{safe_fmt(data.get('Stock P/E', 0))} (Ind: {safe_fmt(data.get('Industry PE', 0))})"
+
+
+def _ocf_scalar(data):
+    # Advanced 4-Phase check
+    ocf = _num(data, 'Operating Cash Flow')
+    net_profit = _num(data, 'Net Profit')
+    sales = _num(data, 'Sales')
+    fcf_val = _num(data, 'Free Cash Flow')
+
+    # Phase 1: Earnings Quality (OCF > Net Profit)
+    st_list = ["Low Earnings Quality (OCF < Net Profit)" if ocf < net_profit else "High Earnings Quality"]
+
+    # Phase 2: Efficiency (OCF Margin = OCF/Sales)
+    # > 15% Cash Cow, 5-15% Standard, < 5% High Risk
+    ocf_margin = (ocf / sales * 100) if sales > 0 else 0
+    if ocf_margin > 15: s_ocf = 1; st_list.append("Cash Cow (High Eff)")
+    elif ocf_margin > 5: s_ocf = 0.5; st_list.append("Standard Eff")
+    else: s_ocf = 0; st_list.append("High Risk (Low Margin)")
+
+    # Phase 4 (Partial): FCF Conversion check (OCF positive but FCF negative?)
+    if fcf_val < 0 and ocf > 0:
+        st_list.append("Capital Intensive")
+
+    # Negative OCF -> Automatic 0 and Critical Fail
+    if ocf < 0:
+        return 0, "Negative OCF (CRITICAL)"
+    return (1 if s_ocf >= 1 else 0.5), " | ".join(st_list)
+
+def _ocf_vector(cols):
+    ocf = cols('Operating Cash Flow')
+    net_profit = cols('Net Profit')
+    sales = cols('Sales')
+    fcf_val = cols('Free Cash Flow')
+
+    quality = np.where(ocf < net_profit, "Low Earnings Quality (OCF < Net Profit)", "High Earnings Quality").astype(object)
+    ocf_margin = np.divide(ocf, sales, out=np.zeros_like(ocf), where=sales > 0) * 100
+    conds = [ocf_margin > 15, ocf_margin > 5]
+    eff = np.select(conds, ["Cash Cow (High Eff)", "Standard Eff"], "High Risk (Low Margin)").astype(object)
+    capex = np.where((fcf_val < 0) & (ocf > 0), " | Capital Intensive", "").astype(object)
+
+    critical = ocf < 0
+    s = np.where(critical, 0.0, np.where(conds[0], 1.0, 0.5))
+    st = np.where(critical, "Negative OCF (CRITICAL)", quality + " | " + eff + capex)
+    return s, st
+
+
+def _contingent_scalar(data):
+    # Rule: if Contingent_Liabilities > (0.5 * Net_Worth): Status = ❌
+    cont_liab = _num(data, 'Contingent Liabilities')
+    net_worth = _num(data, 'Net Worth')
+    cl_ratio = cont_liab / net_worth if net_worth > 0 else 0
+    if cl_ratio > 0.5: return 0, "High Risk (>50% NW)"
+    return 1, "Safe"
+
+def _contingent_ratio(cols):
+    net_worth = cols('Net Worth')
+    return np.divide(cols('Contingent Liabilities'), net_worth, out=np.zeros(cols.n), where=net_worth > 0)
+
+def _contingent_vector(cols):
+    risky = _contingent_ratio(cols) > 0.5
+    return np.where(risky, 0.0, 1.0), np.where(risky, "High Risk (>50% NW)", "Safe").astype(object)
+
+def _contingent_show(data):
+    net_worth = _num(data, 'Net Worth')
+    cl_ratio = _num(data, 'Contingent Liabilities') / net_worth if net_worth > 0 else 0
+    return f"{cl_ratio:.1%}"
+
+
+def _book_value_scalar(data):
+    # Valuation: Price/Book vs Industry P/B, plus a Book Value > 0 sanity check
+    bv = _num(data, 'Book Value'); pb = _num(data, 'Price to Book'); ind_pb = _num(data, 'Industry PB')
+    if pb > 0 and ind_pb > 0:
+        if pb < ind_pb: s = 1; st = "Undervalued (vs Ind)"
+        else: s = 0; st = "Overvalued (vs Ind)"
+    else:
+        s = 0.5; st = "Valuation N/A"
+    st += f" | BV: {data.get('Book Value')}" if bv > 0 else " | Negative BV (Bad)"
+    return s, st
+
+def _book_value_vector(cols):
+    bv = cols('Book Value'); pb = cols('Price to Book'); ind_pb = cols('Industry PB')
+    has_ind = (pb > 0) & (ind_pb > 0)
+    cheap = pb < ind_pb
+    s = np.where(has_ind, np.where(cheap, 1.0, 0.0), 0.5)
+    st = np.where(has_ind, np.where(cheap, "Undervalued (vs Ind)", "Overvalued (vs Ind)"), "Valuation N/A").astype(object)
+    shown = np.array([f" | BV: {v}" for v in cols.raw(raw_field('Book Value'))], dtype=object)
+    bv_text = np.where(bv > 0, shown, " | Negative BV (Bad)")
+    return s, st + bv_text
+
+
+def _volume_scalar(data):
+    return (1 if data.get('VWAP_Trend') == 'Bullish' else 0), data.get('VWAP_Trend')
+
+def _volume_vector(cols):
+    vwap = cols.raw('VWAP_Trend')
+    return np.where(vwap == 'Bullish', 1.0, 0.0), vwap
+
+
+def _iv_show(data):
+    if _num(data, 'IV P50') > 0:
+        return f"{safe_fmt(data.get('IV P50'), ':.1f')} ({safe_fmt(data.get('IV P10'), ':.0f')}-{safe_fmt(data.get('IV P90'), ':.0f')})"
+    return safe_fmt(data.get('Intrinsic Value', 0), ':.1f')
+
+
+def _trend_show(data):
+    return f"{safe_fmt(data.get('Close', 0), ':.0f')} vs {safe_fmt(data.get('200DMA', 0), ':.0f')}"
+
+
+# --- Rule Tables ---
+
+FUNDAMENTAL_RULES = (
+    # 1. Market Cap
+    Rule('Market Cap', [
+        Band(1, 'Large Cap', ('Market Cap', '>', 20000)),
+        Band(1, 'Mid Cap', ('Market Cap', '>', 5000)),
+        Band(0.5, 'Small Cap', ('Market Cap', '>', 500)),  # Slightly higher risk
+    ], default=(0, 'Micro Cap (Risky)'), show=Show('Market Cap', fill=True)),
+    # 2. CMP vs 52W (10% above the yearly low)
+    Rule('CMP vs 52W', [
+        Band(1, 'Positive', ('Low_52', '>', 0), ('Current Price', '>', ('Low_52', 1.1))),
+    ], default=(0.5, 'Neutral'), show=Show('Current Price', fill=True)),
+    # 3. PE vs Peer
+    Rule('P/E Ratio', custom=(_pe_scalar, _pe_vector), fields=('Stock P/E', 'Industry PE'), show=_pe_show),
+    # 4. PEG (< 1 is good)
+    threshold('PEG Ratio', 'PEG Ratio', '<', 1, Show('PEG Ratio')),
+    # 5. EPS Trend
+    threshold('EPS Trend', 'EPS Trend', '>', 0, Show('EPS Trend', ':.1f', '%')),
+    # 6. EBITDA Trend
+    threshold('EBITDA Trend', 'EBITDA Trend', '>', 0, Show('EBITDA Trend')),
+    # 7. Debt/Equity (< 1 good)
+    threshold('Debt / Equity', 'Debt / Equity', '<', 1, Show('Debt / Equity')),
+    # 8. Dividend Yield (>0 good)
+    threshold('Dividend Yield', 'Dividend Yield', '>', 0, Show('Dividend Yield', unit='%', fill=True)),
+    # 9. Intrinsic Value: P(CMP < IV) from the Monte Carlo quantiles (>= 70% / >= 40%),
+    #    falling back to CMP < point estimate when there is no simulation
+    Rule('Intrinsic Value', [
+        Band(1, 'Undervalued', ('IV P30', '>', 0), ('Current Price', '<', 'IV P30')),
+        Band(0.5, 'Fairly Valued', ('IV P30', '>', 0), ('Current Price', '<', 'IV P60')),
+        Band(0, 'Overvalued', ('IV P30', '>', 0)),
+        Band(1, 'Undervalued', ('Current Price', '<', 'Intrinsic Value')),
+    ], default=(0, 'Overvalued'), show=_iv_show),
+    # 10. Current Ratio (> 1.5)
+    threshold('Current Ratio', 'Current Ratio', '>', 1.5, Show('Current Ratio')),
+    # 11. Promoter Holding (> 40%)
+    threshold('Promoter Holding', 'Promoter Holding', '>', 40, Show('Promoter Holding', unit='%')),
+    # 12. FII/DII Trend: Positive Change (> 0%) -> Institutional money is entering.
+    threshold('FII/DII Trend', 'FII/DII Change', '>', 0, Show('FII/DII Change', unit='%', fill=True)),
+    # 13. Operating Cash Flow (Advanced 4-Phase)
+    Rule('Operating Cash Flow', custom=(_ocf_scalar, _ocf_vector),
+         fields=('Operating Cash Flow', 'Net Profit', 'Sales', 'Free Cash Flow'),
+         show=Show('Operating Cash Flow', fill=True)),
+    # 14. ROCE (>15)
+    threshold('ROCE', 'ROCE', '>', 15, Show('ROCE', unit='%')),
+    # 14b. ROE (>15 good, <10 avoid)
+    Rule('ROE', [
+        Band(1, 'Good', ('ROE', '>', 15)),
+        Band(0, 'Avoid (Low)', ('ROE', '<', 10)),
+    ], default=(0.5, 'Average'), show=Show('ROE', unit='%', fill=True)),
+    # 15. Rev CAGR (>10)
+    threshold('Revenue CAGR', 'Revenue CAGR', '>', 10, Show('Revenue CAGR', ':.1f', '%')),
+    # 16. Profit CAGR (>10)
+    threshold('Profit CAGR', 'Profit CAGR', '>', 10, Show('Profit CAGR', ':.1f', '%')),
+    # 17. Interest Coverage (>3)
+    threshold('Interest Coverage', 'Interest Coverage', '>', 3, Show('Interest Coverage', ':.1f')),
+    # 18. FCF (>0)
+    threshold('Free Cash Flow', 'Free Cash Flow', '>', 0, Show('Free Cash Flow')),
+    # 19. Equity Dilution (Mock)
+    Rule('Equity Dilution', default=(1, 'Stable'), show='No'),
+    # 20. Pledged Shares (<5%)
+    threshold('Pledged Shares', 'Pledged Shares', '<', 5, Show('Pledged Shares', unit='%')),
+    # 21. Contingent Liab (Risk Check, half weight)
+    Rule('Contingent Liab', custom=(_contingent_scalar, _contingent_vector),
+         fields=('Contingent Liabilities', 'Net Worth'), weight=0.5, show=_contingent_show),
+    # 22. Piotroski F-Score: > 7 Good, 5-7 Average, < 5 Avoid
+    Rule('Piotroski Score', [
+        Band(1, 'Good (Strong)', ('Piotroski Score', '>', 7)),
+        Band(0.5, 'Average', ('Piotroski Score', '>=', 5)),
+    ], default=(0, 'Avoid (Weak)'), show=lambda data: data.get('Piotroski Score', 0)),
+    # 23. Working Capital (Mock)
+    Rule('Working Cap Cycle', default=(0.5, 'Neutral'), show='Stable'),
+    # 24. CFO/PAT (>1)
+    threshold('CFO / PAT', 'CFO to PAT', '>', 1, Show('CFO to PAT')),
+    # 24b. Book Value Analysis
+    Rule('Book Value Analysis', custom=(_book_value_scalar, _book_value_vector),
+         fields=('Book Value', 'Price to Book', 'Industry PB'),
+         show=lambda data: f"P/B: {_num(data, 'Price to Book'):.2f}"),
+)
+
+TECHNICAL_RULES = (
+    # 25. Trend (Moving Average Ribbon)
+    # Strong Bullish: Price > 50DMA > 200DMA, Falling Knife: Price < 50DMA < 200DMA
+    Rule('Trend (DMA)', [
+        Band(1, 'Strong Bullish', ('Close', '>', '50DMA'), ('50DMA', '>', '200DMA')),
+        Band(0, 'Falling Knife (Bearish)', ('Close', '<', '50DMA'), ('50DMA', '<', '200DMA')),
+        Band(0.5, 'Bullish (>200DMA)', ('Close', '>', '200DMA')),
+    ], default=(0, 'Bearish'), show=_trend_show),
+    # 26. RSI (30-70 range logic)
+    Rule('RSI', [
+        Band(0.5, 'Neutral', ('RSI', '>', 40), ('RSI', '<', 70)),
+        Band(1, 'Oversold (Buy)', ('RSI', '<=', 40)),
+    ], default=(0, 'Overbought'), show=Show('RSI', ':.1f', fill=True)),
+    # 27. MACD
+    Rule('MACD', [Band(1, 'Bullish', ('MACD', '>', 'MACD_SIGNAL'))],
+         default=(0, 'Bearish'), show=Show('MACD', fill=True)),
+    # 28. Pivot (Price > Pivot)
+    Rule('Pivot Support', [Band(1, 'Above Pivot', ('Close', '>', 'Pivot'))],
+         default=(0, 'Below Pivot'), show=Show('Pivot', ':.1f', fill=True)),
+    # 29. VWAP/Vol
+    Rule('Volume Trend', custom=(_volume_scalar, _volume_vector), fields=('VWAP_Trend',),
+         show=lambda data: data.get('Volume_Trend')),
+)
+
+
+def rule_fields(rules):
+    """Every field read by a rule table, in first-use order."""
+    return tuple(dict.fromkeys(f for r in rules for f in r.fields))
+
+
+def price_rules(rules):
+    """The rules that must be re-scored when only the price changes."""
+    return tuple(r for r in rules if any(f in PRICE_FIELDS for f in r.fields))
+
+
+# --- Scalar Compilation ---
+
+def _scalar_clause(lhs, op, rhs):
+    fn = _OPS[op]
+    if isinstance(rhs, str):
+        return lambda data: fn(_num(data, lhs), _num(data, rhs))
+    if isinstance(rhs, tuple):
+        field, factor = rhs
+        return lambda data: fn(_num(data, lhs), _num(data, field) * factor)
+    return lambda data: fn(_num(data, lhs), rhs)
+
+def _scalar_rule(rule):
+    if rule.custom:
+        test = rule.custom[0]
+    else:
+        bands = [(b.score, b.status, [_scalar_clause(*c) for c in b.clauses]) for b in rule.bands]
+        default, na, fields = rule.default, rule.na, rule.fields
+
+        def test(data):
+            if na is not None and any(math.isnan(_num(data, f)) for f in fields):
+                return na
+            for s, st, clauses in bands:
+                if all(c(data) for c in clauses):
+                    return s, st
+            return default
+
+    weight = rule.weight
+    if weight == 1:
+        return test
+
+    def weighted(data):
+        s, st = test(data)
+        return s * weight, st
+    return weighted
+
+def _scalar_show(show):
+    if callable(show): return show
+    return lambda data: show
+
+def compile_display(rules):
+    """{name: fn(record) -> detail 'value'} for formatting results lazily."""
+    return {r.name: _scalar_show(r.show) for r in rules}
+
+def compile_scalar(rules):
+    """Compiles a rule table into fn(record) -> (score, details) for one stock."""
+    steps = [(r.name, _scalar_rule(r), _scalar_show(r.show)) for r in rules]
+
+    def evaluate(data):
+        score = 0
+        details = {}
+        for name, test, show in steps:
+            s, st = test(data)
+            score += s
+            details[name] = {'value': show(data), 'score': s, 'status': st}
+        return score, details
+    return evaluate
+
+
+# --- Vector Compilation ---
+
+class Columns:
+    """Column accessor over a table (mapping of field -> array-like, one row per stock)."""
+
+    def __init__(self, table):
+        self.table = table
+        self.n = len(next(iter(table.values()))) if table else 0
+        self._cache = {}
+
+    def __call__(self, field):
+        col = self._cache.get(field)
+        if col is None:
+            if field in self.table:
+                col = np.asarray(self.table[field], dtype=float)
+            else:
+                col = np.full(self.n, float(FIELD_DEFAULTS.get(field, 0)))
+            self._cache[field] = col
+        return col
+
+    def raw(self, field):
+        if field in self.table:
+            return np.array(self.table[field], dtype=object)
+        return np.full(self.n, None, dtype=object)
+
+
+def build_table(records, fields):
+    """
+    Turns a list of record dicts into a column table.
+    Numeric fields follow the scalar path's reading rules (missing -> default,
+    None -> 0.0, unparseable -> NaN); STRING_FIELDS are kept as object columns.
+    """
+    records = [r or {} for r in records]
+    table = {}
+    for field in fields:
+        if field in STRING_FIELDS:
+            table[field] = np.array([r.get(field) for r in records], dtype=object)
+        else:
+            table[field] = np.fromiter((_num(r, field) for r in records), dtype=float, count=len(records))
+        if field in RAW_TEXT_FIELDS:
+            table[raw_field(field)] = np.array([r.get(field) for r in records], dtype=object)
+    return table
+
+def _vector_clause(cols, lhs, op, rhs):
+    fn = _OPS[op]
+    if isinstance(rhs, str):
+        return fn(cols(lhs), cols(rhs))
+    if isinstance(rhs, tuple):
+        return fn(cols(lhs), cols(rhs[0]) * rhs[1])
+    return fn(cols(lhs), rhs)
+
+def _vector_rule(rule):
+    if rule.custom:
+        test = rule.custom[1]
+    else:
+        default_s, default_st = rule.default
+
+        def test(cols):
+            s = np.full(cols.n, float(default_s))
+            st = np.full(cols.n, default_st, dtype=object)
+            # Apply bands last-to-first so the first matching band wins
+            for band in reversed(rule.bands):
+                mask = np.ones(cols.n, dtype=bool)
+                for clause in band.clauses:
+                    mask &= _vector_clause(cols, *clause)
+                s[mask] = band.score
+                st[mask] = band.status
+            if rule.na is not None:
+                bad = np.zeros(cols.n, dtype=bool)
+                for f in rule.fields:
+                    bad |= np.isnan(cols(f))
+                s[bad] = rule.na[0]
+                st[bad] = rule.na[1]
+            return s, st
+
+    weight = rule.weight
+    if weight == 1:
+        return test
+
+    def weighted(cols):
+        s, st = test(cols)
+        return s * weight, st
+    return weighted
+
+def compile_vector(rules):
+    """
+    Compiles a rule table into fn(table) -> (scores, {name: (scores, statuses)})
+    scoring every row of a column table at once.
+    """
+    steps = [(r.name, _vector_rule(r)) for r in rules]
+
+    def evaluate(table):
+        cols = table if isinstance(table, Columns) else Columns(table)
+        total = np.zeros(cols.n)
+        details = {}
+        for name, test in steps:
+            s, st = test(cols)
+            total = total + s
+            details[name] = (s, st)
+        return total, details
+    return evaluate
@@ -0,0 +1,72 @@
+"""
+Price-scenario sensitivity: "at what price does this become a BUY?"
+
+Re-scores an evaluated stock across a grid of hypothetical prices in one
+vectorized pass (AnalysisEngine.evaluate_prices) and reports the prices
+where the swing / long-term verdicts flip.
+"""
+import numpy as np
+from src.analysis.engine import AnalysisEngine
+
+VERDICT_SERIES = (
+    ('long_term_verdict', 'Long-Term'),
+    ('swing_verdict', 'Swing'),
+)
+
+
+def price_grid(cmp, span=0.30, step=0.005):
+    """Prices from cmp*(1-span) to cmp*(1+span) in `step` increments (0.005 = 0.5%)."""
+    steps = int(round(span / step))
+    return cmp * (1 + np.arange(-steps, steps + 1) * step)
+
+
+def find_breakpoints(prices, verdicts, label):
+    """Grid points where a verdict series changes, scanning upwards in price."""
+    verdicts = np.asarray(verdicts, dtype=object)
+    flips = np.flatnonzero(verdicts[1:] != verdicts[:-1]) + 1
+    return [
+        {'horizon': label, 'price': float(prices[i]), 'below': verdicts[i - 1], 'above': verdicts[i]}
+        for i in flips
+    ]
+
+
+def run_scenarios(result, span=0.30, step=0.005, engine=None):
+    """
+    Sensitivity grid for an evaluate_stock result (needs result['inputs']).
+    Returns plain lists so the dict can go straight into templates, JSON or the renderer:
+        prices, change_pct, total_score, fundamental_score, swing_verdict,
+        long_term_verdict and breakpoints (sorted by price, with change_pct).
+    Returns None when the result has no usable price.
+    """
+    inputs = result.get('inputs')
+    if not inputs:
+        raise ValueError("Result has no inputs; scenarios need an evaluate_stock result.")
+    cmp = float(result.get('cmp') or 0)
+    if cmp <= 0:
+        return None
+
+    engine = engine or AnalysisEngine()
+    prices = price_grid(cmp, span, step)
+    grid = engine.evaluate_prices(inputs['fundamentals'], inputs['technicals'], inputs['news'], prices,
+                                 inputs.get('peers'))
+    change_pct = (prices / cmp - 1) * 100
+
+    breakpoints = []
+    for key, label in VERDICT_SERIES:
+        breakpoints.extend(find_breakpoints(prices, grid[key], label))
+    for bp in breakpoints:
+        bp['change_pct'] = round((bp['price'] / cmp - 1) * 100, 2)
+    breakpoints.sort(key=lambda bp: bp['price'])
+
+    return {
+        'cmp': cmp,
+        'span': span,
+        'step': step,
+        'prices': prices.tolist(),
+        'change_pct': change_pct.round(2).tolist(),
+        'total_score': grid['total_score'].tolist(),
+        'fundamental_score': grid['fundamental_score'].tolist(),
+        'swing_verdict': grid['swing_verdict'].tolist(),
+        'long_term_verdict': grid['long_term_verdict'].tolist(),
+        'breakpoints': breakpoints,
+    }
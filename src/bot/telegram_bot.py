@@ -1,5 +1,6 @@
 from telegram import Update
 from telegram.ext import ApplicationBuilder, ContextTypes, CommandHandler, MessageHandler, filters
+import asyncio
 import logging
 import os
 import sys
@@ -7,8 +8,14 @@ import sys
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from src.config import TELEGRAM_BOT_TOKEN
-from src.main import AnalysisEngine, FundamentalFetcher, TechnicalFetcher, NewsFetcher, InfographicGenerator
+from src.config import TELEGRAM_BOT_TOKEN, INTERACTIVE_IMAGE_PROFILE, BOT_FETCH_DEADLINE
+from src.main import FundamentalFetcher, TechnicalFetcher, NewsFetcher, InfographicGenerator
+from src.analysis.cache import result_cache
+from src.analysis.peers import sector_index
+from src.analysis.scenarios import run_scenarios
+from src.renderer.generator import report_filename
+from src.renderer.cache import image_cache
+from src.fetchers.stages import fetch_stages, missing_stages
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -18,41 +25,43 @@ logging.basicConfig(
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await context.bot.send_message(chat_id=update.effective_chat.id, text="Welcome! Type any stock name (e.g., TATAMOTORS) to get a full analysis report.")
 
-async def analyze_stock(update: Update, context: ContextTypes.DEFAULT_TYPE, symbol: str):
+def fetch(symbol):
+    """The fetch stages under the bot's own deadline (blocking; run it in a thread)."""
+    return fetch_stages(symbol, BOT_FETCH_DEADLINE)
+
+def build_report(symbol, fetched):
+    """Scores fetched data and renders the infographic (blocking; run it in a thread)."""
+    fund_data, tech_data, news_data = fetched['fundamentals'], fetched['technicals'], fetched['news']
+    logging.info(f"[{symbol}] Evaluating stock...")
+    peers = sector_index.compare(symbol, fund_data) if fund_data else None
+    result = result_cache.evaluate(fund_data, tech_data, news_data, peers)
+    result['news_items'] = news_data  # Pass news to infographic
+    result['scenarios'] = run_scenarios(result)
+    result['chart'] = (tech_data or {}).get('Chart')  # price panel on the image
+
+    logging.info(f"[{symbol}] Generating infographic...")
+    image = image_cache.render(symbol, result, INTERACTIVE_IMAGE_PROFILE)
+    return result, image
+
+async def analyze_stock(update: Update, context: ContextTypes.DEFAULT_TYPE, symbol: str, prefetched=None):
+    """`prefetched` is a fetch() result the caller already has."""
     cid = update.effective_chat.id
     try:
         logging.info(f"Starting analysis for {symbol}")
-        # 1. Fetch
-        ff = FundamentalFetcher()
-        logging.info(f"[{symbol}] Fetching fundamentals...")
-        fund_data = ff.get_data(symbol)
+        # 1. Fetch (concurrently, off the event loop; shares in-flight fetches of the same symbol)
+        if prefetched is None:
+            logging.info(f"[{symbol}] Fetching fundamentals, technicals and news...")
+            prefetched = await asyncio.to_thread(fetch, symbol)
+        fetched, timings = prefetched
         
-        tf = TechnicalFetcher()
-        logging.info(f"[{symbol}] Fetching technicals...")
-        tech_data = tf.get_data(symbol)
-        
-        nf = NewsFetcher()
-        logging.info(f"[{symbol}] Fetching news...")
-        news_data = nf.fetch_latest_news(symbol)
-        
-        if not fund_data and not tech_data:
+        if not fetched['fundamentals'] and not fetched['technicals']:
              await context.bot.send_message(chat_id=cid, text=f"⚠️ Could not fetch data for {symbol}. Please verify the ticker.")
              return
 
-        # 2. Analyze
-        logging.info(f"[{symbol}] Evaluating stock...")
-        engine = AnalysisEngine()
-        result = engine.evaluate_stock(fund_data, tech_data, news_data)
-        result['cmp'] = fund_data.get('Current Price') if fund_data else tech_data.get('Close', 0)
-        result['news_items'] = news_data  # Pass news to infographic
-        
-        # 3. Generate Image
-        logging.info(f"[{symbol}] Generating infographic...")
-        output_path = f"{symbol}_report.png"
-        gen = InfographicGenerator()
-        gen.generate_report(symbol, result, output_path)
+        # 2. Analyze and generate the image, off the event loop too
+        result, image = await asyncio.to_thread(build_report, symbol, fetched)
         
-        # 4. Send Image
+        # 3. Send Image
         logging.info(f"[{symbol}] Sending photo to chat...")
         caption = (
             f"📊 *{symbol} Analysis*\n"
@@ -61,19 +70,18 @@ async def analyze_stock(update: Update, context: ContextTypes.DEFAULT_TYPE, symb
             f"Swing: {result.get('swing_verdict', 'N/A')}\n"
             f"Long Term: {result.get('long_term_verdict', 'N/A')}"
         )
+        missing = missing_stages(timings)
+        if missing:
+            # Same notice as the web report
+            caption += f"\n\n⚠️ Partial report: {', '.join(missing)} did not respond in time and {'was' if len(missing) == 1 else 'were'} left out of the scores."
         
-        with open(output_path, 'rb') as photo:
-            await context.bot.send_photo(chat_id=cid, photo=photo, caption=caption, parse_mode='Markdown')
+        await context.bot.send_photo(chat_id=cid, photo=image, filename=report_filename(symbol, INTERACTIVE_IMAGE_PROFILE), caption=caption, parse_mode='Markdown')
         
         logging.info(f"[{symbol}] Finished analysis successfully.")
         
     except Exception as e:
         logging.error(f"Error analyzing {symbol}: {str(e)}", exc_info=True)
         await context.bot.send_message(chat_id=cid, text=f"❌ Error analyzing {symbol}: {str(e)}")
-    finally:
-        # Cleanup
-        if 'output_path' in locals() and os.path.exists(output_path):
-            os.remove(output_path)
 
 async def analyze_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not context.args:
@@ -93,24 +101,21 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
     ff = FundamentalFetcher()
     if re.match(r'^[A-Za-z0-9&.\-]+$', text):
         symbol = text.upper()
-        # Peek at data to see if it's a real ticker
-        # We'll just try to analyze it. If it fails, we fall through to search.
-        # But wait, analyze_stock is async and does its own messaging.
-        # Let's check data first
+        # Peek at data to see if it's a real ticker; the fetch is reused by analyze_stock.
+        # If it fails, we fall through to search.
         logging.info(f"Checking if {symbol} is a direct ticker...")
-        fund_data = ff.get_data(symbol)
-        tf = TechnicalFetcher()
-        tech_data = tf.get_data(symbol)
+        prefetched = await asyncio.to_thread(fetch, symbol)
+        fund_data, tech_data = prefetched[0]['fundamentals'], prefetched[0]['technicals']
         
         if fund_data or (tech_data and tech_data.get('indicators_available')):
             await context.bot.send_message(chat_id=update.effective_chat.id, text=f"🔍 Analyzing ticker {symbol}... Please wait.")
-            await analyze_stock(update, context, symbol)
+            await analyze_stock(update, context, symbol, prefetched)
             return
         else:
             logging.info(f"{symbol} not found as direct ticker. Trying search...")
 
     # 2. Treat as Name Search (or fallback from failed ticker)
-    results = ff.search_ticker(text)
+    results = await asyncio.to_thread(ff.search_ticker, text)
     
     if not results:
         await context.bot.send_message(chat_id=update.effective_chat.id, text=f"❌ Could not find any stock matching '{text}'. Please try a different name or ticker.")
@@ -4,6 +4,7 @@ import os
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(os.path.dirname(BASE_DIR), 'data')
 DB_PATH = os.path.join(DATA_DIR, 'stocks.db')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
 
 # APIs / URLs (Placeholders for now)
 SCREENER_URL = "https://www.screener.in/company/{}/consolidated/"
@@ -18,5 +19,32 @@ TELEGRAM_CHANNEL_ID = os.getenv("TELEGRAM_CHANNEL_ID", "-5057435695")
 MARKETAUX_API_TOKEN = os.getenv("MARKETAUX_API_TOKEN", "")
 NEWSAPI_KEY = os.getenv("NEWSAPI_KEY", "")
 
+# Report image encoding (see ENCODE_PROFILES in src/renderer/generator.py)
+INTERACTIVE_IMAGE_PROFILE = os.getenv("INTERACTIVE_IMAGE_PROFILE", "fast")   # bot replies
+BROADCAST_IMAGE_PROFILE = os.getenv("BROADCAST_IMAGE_PROFILE", "small")       # channel posts
+
+# Web analysis: the fundamentals, technicals and news fetches run concurrently
+# and must all finish within FETCH_DEADLINE seconds; late stages are left out.
+FETCH_DEADLINE = float(os.getenv("FETCH_DEADLINE", "12"))
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "12"))
+# The Telegram bot's deadline for the same fetches; chat users can wait longer
+BOT_FETCH_DEADLINE = float(os.getenv("BOT_FETCH_DEADLINE", "30"))
+# Finished web reports are kept this long (seconds) for sharing without re-analysis
+REPORT_TTL = int(os.getenv("REPORT_TTL", "900"))
+# Background analyses (POST /analyze with async=1): worker threads, queue bound
+# and the per-job deadline in seconds, queue wait included
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "32"))
+JOB_TIMEOUT = float(os.getenv("JOB_TIMEOUT", "30"))
+# Batch API (/api/analyze): symbols analyzed at once per request, symbols per request
+API_PARALLEL = int(os.getenv("API_PARALLEL", "4"))
+API_MAX_SYMBOLS = int(os.getenv("API_MAX_SYMBOLS", "50"))
+
+# Production web server (python -m src.web.wsgi / gunicorn): bind address,
+# preforked worker processes and request threads per worker
+WEB_BIND = os.getenv("WEB_BIND", "0.0.0.0:5000")
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1)))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
+
 # Scoring Constants
 TOTAL_PARAMETERS = 39
@@ -0,0 +1,83 @@
+import json
+import logging
+import os
+import threading
+from datetime import date
+
+import pandas as pd
+from src.config import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+class DataCache:
+    """
+    Local store of fetched data so batch jobs don't hit Screener/yfinance.
+
+    Layout under CACHE_DIR:
+        fundamentals/<SYMBOL>/<YYYY-MM-DD>.json   one snapshot per fetch day (the last of the day)
+        ohlc/<SYMBOL>.csv                         daily OHLCV history
+    """
+    def __init__(self, root=CACHE_DIR):
+        self.root = root
+        self.fund_dir = os.path.join(root, 'fundamentals')
+        self.ohlc_dir = os.path.join(root, 'ohlc')
+
+    def _symbol_dir(self, symbol):
+        return os.path.join(self.fund_dir, symbol.upper())
+
+    def save_fundamentals(self, symbol, data, as_of=None):
+        """Stores a fundamentals snapshot dated `as_of` (default today)."""
+        as_of = as_of or date.today()
+        folder = self._symbol_dir(symbol)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f"{as_of.isoformat()}.json")
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, path)  # atomic, concurrent fetches of one symbol can't leave half files
+        return path
+
+    def snapshot_dates(self, symbol):
+        """Sorted dates of the stored fundamentals snapshots."""
+        folder = self._symbol_dir(symbol)
+        if not os.path.isdir(folder):
+            return []
+        dates = []
+        for name in os.listdir(folder):
+            if name.endswith('.json'):
+                try:
+                    dates.append(date.fromisoformat(name[:-5]))
+                except ValueError:
+                    continue
+        return sorted(dates)
+
+    def load_fundamentals(self, symbol, as_of=None):
+        """Latest snapshot on or before `as_of` (default: the newest), or None."""
+        dates = self.snapshot_dates(symbol)
+        if as_of is not None:
+            dates = [d for d in dates if d <= as_of]
+        if not dates:
+            return None
+        path = os.path.join(self._symbol_dir(symbol), f"{dates[-1].isoformat()}.json")
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading fundamentals cache {path}: {e}")
+            return None
+
+    def save_ohlc(self, symbol, df):
+        os.makedirs(self.ohlc_dir, exist_ok=True)
+        path = os.path.join(self.ohlc_dir, f"{symbol.upper()}.csv")
+        df.to_csv(path)
+        return path
+
+    def load_ohlc(self, symbol):
+        path = os.path.join(self.ohlc_dir, f"{symbol.upper()}.csv")
+        if not os.path.exists(path):
+            return None
+        try:
+            return pd.read_csv(path, index_col=0)
+        except Exception as e:
+            logger.error(f"Error reading OHLC cache {path}: {e}")
+            return None
@@ -1,12 +1,15 @@
-import requests
 from bs4 import BeautifulSoup
 import logging
 from src.config import SCREENER_URL
+from src.analysis.valuation import intrinsic_value_fields
+from src.fetchers import http
+from src.fetchers.cache import DataCache
 
 logger = logging.getLogger(__name__)
 
 class FundamentalFetcher:
-    def __init__(self):
+    def __init__(self, cache=None):
+        self.cache = cache  # DataCache for the dated snapshots (default: the shared one)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
@@ -17,7 +20,7 @@ class FundamentalFetcher:
         """
         search_url = f"https://www.screener.in/api/company/search/?q={query}"
         try:
-            response = requests.get(search_url, headers=self.headers, timeout=10)
+            response = http.session().get(search_url, headers=self.headers, timeout=10)
             if response.status_code == 200:
                 results = response.json()
                 if results:
@@ -46,7 +49,7 @@ class FundamentalFetcher:
         for url in urls:
             try:
                 logger.info(f"Attempting Scrape: {url}")
-                response = requests.get(url, headers=self.headers, timeout=15)
+                response = http.session().get(url, headers=self.headers, timeout=15)
                 if response.status_code != 200:
                     continue
                 
@@ -74,6 +77,18 @@ class FundamentalFetcher:
                         return 0
                     except: return 0
 
+                def get_table_series(table_id, row_name):
+                    try:
+                        section = soup.find('section', id=table_id)
+                        if not section: return []
+                        for row in section.find_all('tr'):
+                            if row_name.lower() in row.text.lower():
+                                cols = row.find_all('td')
+                                if not cols: continue
+                                return [safe_float(c.text.strip().replace(',', '').replace('%', ''), None) for c in cols[1:]]
+                        return []
+                    except: return []
+
                 # --- 1. Parsing Top Ratios ---
                 ratios = soup.find_all('li', class_='flex flex-space-between')
                 for ratio in ratios:
@@ -94,6 +109,14 @@ class FundamentalFetcher:
                         logger.warning(f"No fundamental data found for {symbol} at all.")
                         return None # Both failed
 
+                # Sector / Industry from the peers section links (used for peer comparison)
+                classification = {}
+                peers_section = soup.find('section', id='peers')
+                if peers_section:
+                    for link in peers_section.find_all('a', href=True):
+                        if '/market/' in link['href']:
+                            classification[link.get('title', '').strip().lower()] = link.text.strip()
+
                 # --- 2. Extracting Parameters ---
                 hl = data.get('high / low', '0 / 0').split('/')
                 high52 = safe_float(hl[0]) if len(hl)>0 else 0
@@ -128,6 +151,7 @@ class FundamentalFetcher:
                 sales_3y = get_table_row('profit-loss', 'Sales', -4)
                 rev_cagr = ((sales_now/sales_3y)**(1/3) - 1)*100 if (sales_3y and sales_now) else 0
                 
+                profit_history = get_table_series('profit-loss', 'Net Profit')
                 net_profit = get_table_row('profit-loss', 'Net Profit', -1)
                 prof_3y = get_table_row('profit-loss', 'Net Profit', -4)
                 prof_cagr = ((net_profit/prof_3y)**(1/3) - 1)*100 if (prof_3y and net_profit) else 0
@@ -149,6 +173,8 @@ class FundamentalFetcher:
                 graham_num = (22.5 * eps_ttm * book_value)**0.5 if (eps_ttm > 0 and book_value > 0) else 0
                 graham_formula = (eps_ttm * (8.5 + 2 * g_rate) * 4.4) / 7.5
                 final_iv = graham_formula if graham_formula > 0 else (graham_num if graham_num > 0 else eps_ttm * 15)
+                # Distribution of the same formula over growth / discount / EPS scenarios
+                iv_fields = intrinsic_value_fields(eps_ttm, profit_history, cmp, fallback_growth=prof_cagr)
 
                 mapped_data = {
                     'Market Cap': mcap,
@@ -179,7 +205,11 @@ class FundamentalFetcher:
                     'Price to Book': price_to_book,
                     'Industry PB': industry_pb,
                     'Contingent Liabilities': cont_liab,
-                    'Net Worth': (get_table_row('balance-sheet', 'Share Capital', -1) + get_table_row('balance-sheet', 'Reserves', -1))
+                    'Net Worth': (get_table_row('balance-sheet', 'Share Capital', -1) + get_table_row('balance-sheet', 'Reserves', -1)),
+                    'Sector': classification.get('sector') or classification.get('broad sector'),
+                    'Industry': classification.get('industry') or classification.get('basic industry'),
+                    'Profit History': profit_history,
+                    **iv_fields,
                 }
                 return mapped_data
 
@@ -190,4 +220,15 @@ class FundamentalFetcher:
         return None
 
     def get_data(self, symbol):
-        return self.fetch_screener_data(symbol)
+        """
+        Screener fundamentals. Every successful fetch (web, bot, CLI, screener)
+        is also saved as today's dated snapshot, which is how the point-in-time
+        score history (src/analysis/history.py) builds up.
+        """
+        data = self.fetch_screener_data(symbol)
+        if data:
+            try:
+                (self.cache or DataCache()).save_fundamentals(symbol, data)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"Could not save fundamentals snapshot of {symbol}: {e}")
+        return data
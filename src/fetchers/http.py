@@ -0,0 +1,37 @@
+"""
+Shared HTTP session of the fetchers.
+
+One requests.Session per process keeps connections to Screener, NSE and the
+news APIs alive between requests, instead of a new TCP and TLS handshake for
+every call. Sockets must not be shared between processes, so a process that
+was forked after the session was used gets a fresh one.
+"""
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+POOL_CONNECTIONS = 8   # hosts kept
+POOL_MAXSIZE = 32      # connections per host (fetch threads run concurrently)
+
+_session = None
+_pid = None
+_lock = threading.Lock()
+
+
+def session():
+    """This process's shared Session."""
+    global _session, _pid
+    if _pid != os.getpid():
+        with _lock:
+            if _pid != os.getpid():
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+                s.mount('https://', adapter)
+                s.mount('http://', adapter)
+                _session, _pid = s, os.getpid()
+    return _session
@@ -1,8 +1,8 @@
-import requests
 import xml.etree.ElementTree as ET
 import logging
 from datetime import datetime
 from src.config import MARKETAUX_API_TOKEN, NEWSAPI_KEY
+from src.fetchers import http
 
 logger = logging.getLogger(__name__)
 
@@ -53,7 +53,7 @@ class NewsFetcher:
                 'Accept': 'application/json',
                 'Accept-Language': 'en-US,en;q=0.9'
             }
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http.session().get(url, headers=headers, timeout=10)
             if response.status_code != 200:
                 return []
             
@@ -90,7 +90,7 @@ class NewsFetcher:
     def fetch_google_rss(self, symbol):
         url = f"https://news.google.com/rss/search?q={symbol}+stock+NSE+India&hl=en-IN&gl=IN&ceid=IN:en"
         try:
-            response = requests.get(url, timeout=10)
+            response = http.session().get(url, timeout=10)
             if response.status_code != 200: return []
             
             root = ET.fromstring(response.content)
@@ -109,7 +109,7 @@ class NewsFetcher:
         # Free Tier: 3 requests/day limit usually, handle with care or check quota
         url = f"https://api.marketaux.com/v1/news/all?symbols={symbol}.NS&filter_entities=true&language=en&api_token={MARKETAUX_API_TOKEN}"
         try:
-            resp = requests.get(url, timeout=10)
+            resp = http.session().get(url, timeout=10)
             if resp.status_code != 200: return []
             
             data = resp.json()
@@ -127,7 +127,7 @@ class NewsFetcher:
     def fetch_newsapi(self, symbol):
         url = f"https://newsapi.org/v2/everything?q={symbol}+India+Stock&sortBy=publishedAt&apiKey={NEWSAPI_KEY}"
         try:
-            resp = requests.get(url, timeout=10)
+            resp = http.session().get(url, timeout=10)
             if resp.status_code != 200: return []
             
             data = resp.json()
@@ -152,7 +152,7 @@ class NewsFetcher:
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
                 'Accept': 'application/json'
             }
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http.session().get(url, headers=headers, timeout=10)
             if response.status_code != 200:
                 return []
             
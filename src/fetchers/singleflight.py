@@ -0,0 +1,84 @@
+import logging
+import threading
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls: while fn is running for a key, further calls
+    with the same key wait for it and get the same result (or exception)
+    instead of starting their own. Nothing is kept once the call returns, so
+    this is not a cache; it only removes duplicate work that overlaps in time,
+    e.g. many users asking for a hot ticker at the same moment.
+
+    Keys are (stage, symbol) tuples; the counters are kept per stage. Callers
+    share the returned object and must not modify it.
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executed = Counter()
+        self.shared = Counter()
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.executed[key[0]] += 1
+            else:
+                call.waiters += 1
+                self.shared[key[0]] += 1
+
+        if not leader:
+            logger.debug(f"Joined in-flight {key}")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = fn(*args)
+            return call.value
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.waiters:
+                logger.info(f"{key} served {call.waiters} concurrent callers with one call")
+            call.done.set()
+
+    def stats(self):
+        """Calls run and calls served from another caller's run, per stage and in total."""
+        with self._lock:
+            stages = sorted(set(self.executed) | set(self.shared))
+            executed, shared = sum(self.executed.values()), sum(self.shared.values())
+            return {
+                'executed': executed,
+                'shared': shared,
+                'saved_rate': round(shared / (executed + shared), 3) if executed + shared else 0.0,
+                'in_flight': len(self._calls),
+                'stages': {s: {'executed': self.executed[s], 'shared': self.shared[s]} for s in stages},
+            }
+
+    def clear(self):
+        with self._lock:
+            self.executed.clear()
+            self.shared.clear()
+
+
+# Shared per-process instance for the upstream fetches (see src/fetchers/stages.py)
+fetch_flight = SingleFlight()
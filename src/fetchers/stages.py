@@ -0,0 +1,88 @@
+"""
+Concurrent fetch stages of one analysis, shared by the web app and the bot.
+
+The fundamentals, technicals and news fetches are independent network calls
+(10-15s upstream timeouts each), so they run concurrently on a shared thread
+pool and the caller waits for all of them up to one deadline. A stage that
+misses the deadline or fails is replaced by its empty value and the report is
+scored on what arrived; its thread finishes in the background. Concurrent
+analyses of the same symbol share each in-flight fetch (singleflight.py), so
+a hot ticker is fetched once at a time.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+from src.config import FETCH_DEADLINE, FETCH_WORKERS
+from src.fetchers.fundamentals import FundamentalFetcher
+from src.fetchers.news import NewsFetcher
+from src.fetchers.singleflight import fetch_flight
+from src.fetchers.technicals import TechnicalFetcher
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('fundamentals', 'technicals', 'news')
+
+FETCHERS = {
+    'fundamentals': lambda symbol: FundamentalFetcher().get_data(symbol),
+    'technicals': lambda symbol: TechnicalFetcher().get_data(symbol),
+    'news': lambda symbol: NewsFetcher().fetch_latest_news(symbol),
+}
+
+# What evaluate_stock gets for a stage that didn't deliver
+EMPTY = {'fundamentals': None, 'technicals': {}, 'news': []}
+
+# Shared by all requests; sized for a few concurrent analyses plus stragglers
+_executor = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix='fetch')
+
+
+def _timed(stage, symbol):
+    start = time.perf_counter()
+    data = fetch_flight.do((stage, symbol.upper()), FETCHERS[stage], symbol)
+    return data, (time.perf_counter() - start) * 1000
+
+
+def fetch_stages(symbol, deadline=FETCH_DEADLINE, progress=None):
+    """
+    Runs the fetch stages for `symbol` concurrently.
+    Returns (data, timings): data maps each stage to its result (or EMPTY
+    value), timings maps it to {'ms': duration, 'status': 'ok' | 'timeout' | 'error'}.
+    `progress(stage, timing)` is called as each stage finishes or times out.
+    """
+    start = time.perf_counter()
+    futures = {_executor.submit(_timed, stage, symbol): stage for stage in STAGES}
+
+    data, timings = {}, {}
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            stage = futures[future]
+            try:
+                result, ms = future.result()
+                data[stage] = result if result is not None else EMPTY[stage]
+                timings[stage] = {'ms': ms, 'status': 'ok'}
+            except Exception as e:
+                logger.error(f"{stage} fetch error for {symbol}: {e}")
+                data[stage] = EMPTY[stage]
+                timings[stage] = {'ms': (time.perf_counter() - start) * 1000, 'status': 'error'}
+            if progress:
+                progress(stage, timings[stage])
+    except FuturesTimeout:
+        for future, stage in futures.items():
+            if stage in timings:
+                continue
+            future.cancel()  # only helps if it never started
+            data[stage] = EMPTY[stage]
+            timings[stage] = {'ms': (time.perf_counter() - start) * 1000, 'status': 'timeout'}
+            logger.warning(f"{stage} for {symbol} missed the {deadline:.0f}s deadline, scoring without it")
+            if progress:
+                progress(stage, timings[stage])
+
+    timings = {stage: timings[stage] for stage in STAGES}
+    logger.info(f"Fetched {symbol} in {(time.perf_counter() - start) * 1000:.0f} ms: "
+                + ", ".join(f"{s} {t['ms']:.0f} ms ({t['status']})" for s, t in timings.items()))
+    return data, timings
+
+
+def missing_stages(timings):
+    return [stage for stage, t in timings.items() if t['status'] != 'ok']
@@ -6,10 +6,14 @@ import logging
 import pandas as pd
 import numpy as np
 import yfinance as yf
-import requests
+from src.fetchers import http
 
 logger = logging.getLogger(__name__)
 
+# Columns of indicator_series that calculate_indicators returns
+INDICATOR_COLUMNS = ('50DMA', '200DMA', 'RSI', 'MACD', 'MACD_SIGNAL', 'Close', 'Pivot', 'R1', 'S1',
+                     'Volume_Trend', 'VWAP_Trend')
+
 class TechnicalFetcher:
     def __init__(self):
         pass
@@ -25,7 +29,7 @@ class TechnicalFetcher:
                 'Accept': 'application/json',
                 'Accept-Language': 'en-US,en;q=0.9'
             }
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http.session().get(url, headers=headers, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 price_info = data.get('priceInfo', {})
@@ -99,6 +103,7 @@ class TechnicalFetcher:
             return None
 
     def calculate_indicators(self, df):
+        """Indicators of the last bar of `df`; the last row of indicator_series, so live and historical scores agree."""
         if df is None:
             logger.warning("calculate_indicators: df is None")
             return {}
@@ -106,78 +111,86 @@ class TechnicalFetcher:
             logger.warning(f"calculate_indicators: df too short ({len(df)})")
             return {}
 
-        close = df['Close'].values
-        # ... Rest of indices logic ...
-        
-        # 50 DMA & 200 DMA
-        # 50 DMA & 200 DMA - Manual calculation if talib missing
+        series = self.indicator_series(df)
+        return {col: series[col].iloc[-1] for col in INDICATOR_COLUMNS}
+
+    def indicator_series(self, df):
+        """
+        Indicators for every bar of `df`, one row per bar, for the live score
+        (calculate_indicators takes the last row), historical scoring and
+        charts. talib when installed, else the pandas formulas. Bars before
+        the first 30 have indicators_available=False, like get_data.
+        """
+        close = df['Close'].astype(float).reset_index(drop=True)
+        high = df['High'].astype(float).reset_index(drop=True)
+        low = df['Low'].astype(float).reset_index(drop=True)
+
         if talib:
-            dma_50 = talib.SMA(close, timeperiod=50)[-1]
-            dma_200 = talib.SMA(close, timeperiod=200)[-1]
-            rsi = talib.RSI(close, timeperiod=14)[-1]
-            macd, macdsignal, macdhist = talib.MACD(close, fastperiod=12, slowperiod=26, signalperiod=9)
-            macd_val = macd[-1]
-            signal_val = macdsignal[-1]
+            values = close.to_numpy()
+            dma_50 = talib.SMA(values, timeperiod=50)
+            dma_200 = talib.SMA(values, timeperiod=200)
+            rsi = talib.RSI(values, timeperiod=14)
+            macd_line, signal_line, _ = talib.MACD(values, fastperiod=12, slowperiod=26, signalperiod=9)
         else:
-            # Pandas fallback
-            dma_50 = pd.Series(close).rolling(window=50).mean().iloc[-1]
-            dma_200 = pd.Series(close).rolling(window=200).mean().iloc[-1]
-            
+            dma_50 = close.rolling(window=50).mean().values
+            dma_200 = close.rolling(window=200).mean().values
+
             # Simple RSI approx
-            delta = pd.Series(close).diff()
+            delta = close.diff()
             gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
             loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs)).iloc[-1]
-            
+            rsi = (100 - (100 / (1 + gain / loss))).values
+
             # Simple MACD approx
-            exp1 = pd.Series(close).ewm(span=12, adjust=False).mean()
-            exp2 = pd.Series(close).ewm(span=26, adjust=False).mean()
-            macd_line = exp1 - exp2
-            signal_line = macd_line.ewm(span=9, adjust=False).mean()
-            macd_val = macd_line.iloc[-1]
-            signal_val = signal_line.iloc[-1]
-
-        # Pivots (Classic)
-        high = df['High'].values[-1]
-        low = df['Low'].values[-1]
-        pivot = (high + low + close[-1]) / 3
-        r1 = 2*pivot - low
-        s1 = 2*pivot - high
-        
-        # Volume Trend
-        # Check if Volume column exists
+            macd = close.ewm(span=12, adjust=False).mean() - close.ewm(span=26, adjust=False).mean()
+            macd_line = macd.values
+            signal_line = macd.ewm(span=9, adjust=False).mean().values
+
+        pivot = (high + low + close) / 3
+        tp = pivot  # typical price, same formula
+        vwap_signal = np.where(tp > tp.rolling(window=20).mean(), "Bullish", "Bearish")
+
         if 'Volume' in df.columns:
-            vol = df['Volume'].values
-            vol_sma_20 = pd.Series(vol).rolling(window=20).mean().iloc[-1]
-            vol_trend = "Increasing" if vol[-1] > vol_sma_20 else "Decreasing"
+            vol = df['Volume'].astype(float).reset_index(drop=True)
+            vol_trend = np.where(vol > vol.rolling(window=20).mean(), "Increasing", "Decreasing")
         else:
-            vol_trend = "N/A"
-            
-        # VWAP Trend (Approx)
-        # Using Typical Price * Volume / Cumulative Volume for the session. 
-        # Since we have daily data, we can't do true intraday VWAP. 
-        # We will compare Close to a short term VWAP-like MA or just Typical Price.
-        # Let's use TP vs SMA(TP, 20) as a proxy for value trend.
-        tp = (df['High'] + df['Low'] + df['Close']) / 3
-        tp_sma = tp.rolling(window=20).mean().iloc[-1]
-        vwap_signal = "Bullish" if tp.iloc[-1] > tp_sma else "Bearish"
+            vol_trend = np.full(len(df), "N/A")
 
-        data = {
+        return pd.DataFrame({
+            'Close': close.values,
             '50DMA': dma_50,
             '200DMA': dma_200,
             'RSI': rsi,
-            'MACD': macd_val,
-            'MACD_SIGNAL': signal_val,
-            'Close': close[-1],
-            'Pivot': pivot,
-            'R1': r1,
-            'S1': s1,
-            'Volume_Trend': vol_trend,
-            'VWAP_Trend': vwap_signal
+            'MACD': macd_line,
+            'MACD_SIGNAL': signal_line,
+            'Pivot': pivot.values,
+            'R1': (2 * pivot - low).values,
+            'S1': (2 * pivot - high).values,
+            'Volume_Trend': vol_trend.astype(object),
+            'VWAP_Trend': vwap_signal.astype(object),
+            'indicators_available': np.arange(len(df)) >= 29,
+        }, index=df.index)
+
+    def chart_series(self, df, bars=120):
+        """
+        Last `bars` bars of close, 50/200 DMA, volume and RSI as plain lists
+        for the infographic price chart (src/renderer/chart.py). None without history.
+        """
+        if df is None or df.empty or len(df) < 2:
+            return None
+        series = self.indicator_series(df).tail(bars)
+        close = series['Close'].to_numpy()
+        full = df['Close'].astype(float).to_numpy()
+        up = (full >= np.r_[full[0], full[:-1]])[-len(close):]
+        volume = df['Volume'].astype(float).to_numpy()[-len(close):] if 'Volume' in df.columns else np.zeros(len(close))
+        return {
+            'close': np.round(close, 2).tolist(),
+            'dma50': np.round(series['50DMA'].to_numpy(), 2).tolist(),
+            'dma200': np.round(series['200DMA'].to_numpy(), 2).tolist(),
+            'rsi': np.round(series['RSI'].to_numpy(), 1).tolist(),
+            'volume': volume.tolist(),
+            'up': up.tolist(),
         }
-        
-        return data
 
     def get_data(self, symbol):
         df = self.fetch_ohlc_history(symbol)
@@ -191,6 +204,14 @@ class TechnicalFetcher:
             if nse_data:
                 live_price = nse_data['price']
         
+        data = self.build_data(df, live_price, nse_data)
+        data['Chart'] = self.chart_series(df)
+        return data
+
+    def build_data(self, df, live_price=0, nse_data=None):
+        """
+        Builds the technicals dict from an OHLC history (fetched or cached).
+        """
         # Base Data Structure (Defaults)
         data = {
             '50DMA': 0, '200DMA': 0, 'RSI': 50, 'MACD': 0, 'MACD_SIGNAL': 0,
@@ -211,4 +232,3 @@ class TechnicalFetcher:
                  data['Close'] = live_price # Prioritize live
         
         return data
-
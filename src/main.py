@@ -3,7 +3,8 @@ import logging
 from src.fetchers.fundamentals import FundamentalFetcher
 from src.fetchers.technicals import TechnicalFetcher
 from src.fetchers.news import NewsFetcher
-from src.analysis.engine import AnalysisEngine
+from src.analysis.cache import result_cache
+from src.analysis.peers import sector_index
 from src.renderer.generator import InfographicGenerator
 import os
 
@@ -39,11 +40,9 @@ def main():
     
     # 2. Analyze
     logger.info("Running Analysis Engine...")
-    engine = AnalysisEngine()
-    analysis_result = engine.evaluate_stock(fund_data, tech_data, news_data)
-    
-    # Add CMP to result for display
-    analysis_result['cmp'] = fund_data.get('Current Price') if fund_data else tech_data.get('Close', 0)
+    peers = sector_index.compare(symbol, fund_data) if fund_data else None
+    analysis_result = result_cache.evaluate(fund_data, tech_data, news_data, peers)
+    analysis_result['chart'] = (tech_data or {}).get('Chart')  # price panel on the image
     
     logger.info(f"Score: {analysis_result['total_score']}/37 - Risk: {analysis_result.get('health_label', 'N/A')}")
     
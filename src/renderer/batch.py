@@ -0,0 +1,151 @@
+"""
+Batch rendering of many reports on a process pool.
+
+PIL drawing holds the GIL, so threads don't help; each worker process gets
+its own fonts, palette and templates (preloaded by the pool initializer) and
+sends back encoded bytes. Reports already in the image cache are served
+without touching the pool.
+
+    python -m src.renderer.batch --universe nifty50.txt --output-dir digest --workers 4
+
+renders a report for every cached stock of the universe (see src/screener.py).
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.analysis.engine import AnalysisEngine
+from src.fetchers.cache import DataCache
+from src.fetchers.technicals import TechnicalFetcher
+from src.renderer.cache import image_cache as shared_image_cache
+from src.renderer.cache import image_key
+from src.renderer.generator import ENCODE_PROFILES, RENDER_FIELDS, InfographicGenerator, preload, report_filename
+from src.screener import load_inputs, load_universe
+
+logger = logging.getLogger(__name__)
+
+_worker_generator = None
+
+
+def _init_worker(layout_samples):
+    global _worker_generator
+    preload(layout_samples)
+    _worker_generator = InfographicGenerator()
+
+
+def _render(stock_name, data, profile, params):
+    return _worker_generator.render_bytes(stock_name, data, profile, **params)
+
+
+def render_payload(data):
+    """The part of a result dict render() reads; keeps 'inputs' etc. out of the IPC."""
+    payload = {f: data[f] for f in RENDER_FIELDS if f in data}
+    for f in ('details', 'news_items', 'scenarios', 'chart'):
+        if data.get(f) is not None:
+            payload[f] = data[f]
+    return payload
+
+
+class BatchRenderer:
+    """
+    Renders (stock_name, result) pairs to encoded bytes on `workers` processes.
+    `layout_samples` are results whose templates workers draw up front.
+    Use as a context manager, or call close(); the pool is reused across batches.
+    """
+    def __init__(self, workers=None, profile='default', image_cache=shared_image_cache, layout_samples=(), **params):
+        self.workers = workers or os.cpu_count() or 1
+        self.profile = profile
+        self.params = params
+        self.image_cache = image_cache
+        self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=([render_payload(d) for d in layout_samples],))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def render(self, reports, ordered=True):
+        """
+        Yields (stock_name, image bytes) for every (stock_name, result) in `reports`,
+        in input order or, with ordered=False, as soon as each one is done.
+        """
+        reports = list(reports)
+        images = [None] * len(reports)
+        keys = [None] * len(reports)
+        futures = {}
+        for i, (name, data) in enumerate(reports):
+            if self.image_cache is not None:
+                keys[i] = image_key(name, data, self.profile, self.params)
+                images[i] = self.image_cache.get(keys[i])
+                if images[i] is not None:
+                    continue
+            futures[self._pool.submit(_render, name, render_payload(data), self.profile, self.params)] = i
+
+        def finish(future):
+            i = futures[future]
+            images[i] = future.result()
+            if self.image_cache is not None:
+                self.image_cache.put(keys[i], images[i])
+            return i
+
+        if ordered:
+            pending = {i: f for f, i in futures.items()}
+            for i, (name, _) in enumerate(reports):
+                if i in pending:
+                    finish(pending[i])
+                yield name, images[i]
+        else:
+            for i, (name, _) in enumerate(reports):
+                if images[i] is not None:
+                    yield name, images[i]
+            for future in as_completed(futures):
+                i = finish(future)
+                yield reports[i][0], images[i]
+
+
+def load_reports(symbols, cache):
+    """Scores the cached stocks of `symbols` in one batch and returns (symbol, result) pairs."""
+    kept, funds, histories = load_inputs(symbols, cache)
+    tf = TechnicalFetcher()
+    techs = [tf.build_data(df) for df in histories]
+    table = AnalysisEngine().evaluate_compact(kept, funds, techs)
+    reports = []
+    for i, symbol in enumerate(kept):
+        result = table.row(i).to_dict()
+        result['chart'] = tf.chart_series(histories[i])
+        reports.append((symbol, result))
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render reports for a universe of cached stocks")
+    parser.add_argument("--universe", type=str, required=True, help="Symbols file (one per line, or CSV with a Symbol column)")
+    parser.add_argument("--output-dir", type=str, default="reports", help="Folder for the images")
+    parser.add_argument("--workers", type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument("--profile", choices=sorted(ENCODE_PROFILES), default="small", help="Image encoding profile")
+    args = parser.parse_args()
+
+    reports = load_reports(load_universe(args.universe), DataCache())
+    if not reports:
+        logger.error("No cached stocks to render.")
+        return
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    start = time.perf_counter()
+    with BatchRenderer(args.workers, args.profile) as renderer:
+        for symbol, image in renderer.render(reports, ordered=False):
+            with open(os.path.join(args.output_dir, report_filename(symbol, args.profile)), 'wb') as f:
+                f.write(image)
+    elapsed = time.perf_counter() - start
+    logger.info(f"Rendered {len(reports)} reports in {elapsed:.1f}s ({len(reports) / elapsed:.1f}/s, "
+                f"{renderer.workers} workers, image cache {shared_image_cache.stats()})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from src.analysis.cache import _normalize
+from src.config import CACHE_DIR
+from src.renderer.generator import (
+    ENCODE_PROFILES, FUND_KEYS_1, FUND_KEYS_2, LAYOUT_VERSION, NEWS_KEYS, NEWS_SHOWN,
+    RENDER_FIELDS, TECH_KEYS, InfographicGenerator,
+)
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, 'images')
+_DRAWN_KEYS = FUND_KEYS_1 + FUND_KEYS_2 + TECH_KEYS + NEWS_KEYS
+
+
+def image_key(stock_name, data, profile='default', params=None):
+    """
+    Stable content hash of everything render() draws plus the encoder settings
+    and LAYOUT_VERSION. Fields the image doesn't show (statuses, inputs,
+    news links) are left out, so they don't cause misses.
+    """
+    details = data.get('details', {})
+    scenarios = data.get('scenarios')
+    payload = {
+        'layout': LAYOUT_VERSION,
+        'name': stock_name,
+        'fields': _normalize({f: data.get(f) for f in RENDER_FIELDS}),
+        'details': _normalize({k: [details[k].get('value'), details[k].get('score')] for k in _DRAWN_KEYS if k in details}),
+        'news': [[n.get('source'), n.get('title')] for n in data.get('news_items', [])[:NEWS_SHOWN]],
+        'scenarios': _normalize({
+            'span': scenarios.get('span'),
+            'total_score': scenarios['total_score'],
+            'breakpoints': scenarios.get('breakpoints', [])[:2],
+        }) if scenarios else None,
+        'chart': _normalize(data.get('chart')),
+        'encoding': _normalize(dict(ENCODE_PROFILES[profile], profile=profile, **(params or {}))),
+    }
+    blob = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(blob.encode('utf-8')).hexdigest()
+
+
+class ImageCache:
+    """
+    Encoded report images by content (see image_key).
+
+    Two bounded tiers like ResultCache: an in-process LRU capped by entry
+    count and bytes, and files under `disk_dir` shared by the web app, bot
+    and CLI. Disk hits refresh the file's mtime; once the directory grows
+    past `max_disk_bytes` the least recently used files are deleted.
+    """
+    def __init__(self, maxsize=128, max_bytes=32 << 20, disk_dir=IMAGE_CACHE_DIR,
+                 max_disk_bytes=256 << 20, prune_every=32):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.prune_every = prune_every
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.img")
+
+    def _remember(self, key, image):
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_bytes -= len(old)
+            self._memory[key] = image
+            self._memory_bytes += len(image)
+            while self._memory and (len(self._memory) > self.maxsize or self._memory_bytes > self.max_bytes):
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def get(self, key):
+        with self._lock:
+            image = self._memory.get(key)
+            if image is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return image
+
+        if self.disk_dir:
+            path = self._path(key)
+            try:
+                with open(path, 'rb') as f:
+                    image = f.read()
+                os.utime(path)  # LRU order for pruning
+            except FileNotFoundError:
+                image = None
+            except OSError as e:
+                logger.warning(f"Could not read image cache entry {key}: {e}")
+                image = None
+            if image:
+                self._remember(key, image)
+                with self._lock:
+                    self.disk_hits += 1
+                return image
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, image):
+        self._remember(key, image)
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'wb') as f:
+                f.write(image)
+            os.replace(tmp, path)  # atomic, concurrent writers can't leave half files
+        except OSError as e:
+            logger.warning(f"Could not write image cache entry {key}: {e}")
+            return
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.prune_every == 0
+        if prune:
+            self.prune_disk()
+
+    def prune_disk(self):
+        """Deletes the least recently used files until the directory fits max_disk_bytes."""
+        files = []
+        for root, _, names in os.walk(self.disk_dir):
+            for name in names:
+                if name.endswith('.img'):
+                    try:
+                        st = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, os.path.join(root, name)))
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"Pruned {removed} cached report images ({total / 1e6:.1f} MB kept)")
+        return removed
+
+    def render(self, stock_name, data, profile='default', generator=None, **params):
+        """Drop-in for InfographicGenerator.render_bytes that skips rendering for identical images."""
+        key = image_key(stock_name, data, profile, params)
+        image = self.get(key)
+        if image is not None:
+            logger.debug(f"Image cache hit {key[:12]} ({self.stats()})")
+            return image
+
+        image = (generator or InfographicGenerator()).render_bytes(stock_name, data, profile, **params)
+        self.put(key, image)
+        logger.info(f"Rendered {stock_name} report image ({len(image):,} bytes, cache {self.stats()})")
+        return image
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                'entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            self.hits = self.disk_hits = self.misses = 0
+
+
+# Shared per-process instance used by the web app, bot and CLI
+image_cache = ImageCache()
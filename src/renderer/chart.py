@@ -0,0 +1,122 @@
+"""
+Price chart panel drawn straight onto the PIL canvas (no matplotlib).
+
+    price   close line with 50 / 200 DMA overlays
+    volume  histogram, green on up days and red on down days
+    RSI     line with the 30 / 70 bands
+
+All coordinates are computed with NumPy in one pass per series; each line is
+a single draw.line call over the whole polyline and the volume bars are
+rasterized as two masks pasted in one go, so a panel takes a few ms.
+
+`chart` is the dict TechnicalFetcher.chart_series() builds from the OHLC history.
+"""
+import numpy as np
+from PIL import Image
+
+PANEL_HEIGHT = 360                          # whole panel, including the title row
+PRICE_SHARE, VOLUME_SHARE = 0.55, 0.15      # RSI gets the rest
+GAP = 10
+
+CLOSE_COLOR = "#E2E8F0"
+DMA50_COLOR = "#FACC15"
+DMA200_COLOR = "#3B82F6"
+UP_COLOR, DOWN_COLOR = "#22C55E", "#EF4444"
+RSI_COLOR = "#F59E0B"
+GRID_COLOR = "#334155"
+LABEL_COLOR = "#94A3B8"
+
+
+def panel_boxes(x0, y0, x1, y1):
+    """(price, volume, rsi) boxes inside the plotting area."""
+    h = y1 - y0 - 2 * GAP
+    price_h, volume_h = int(h * PRICE_SHARE), int(h * VOLUME_SHARE)
+    price = (x0, y0, x1, y0 + price_h)
+    volume = (x0, price[3] + GAP, x1, price[3] + GAP + volume_h)
+    rsi = (x0, volume[3] + GAP, x1, y1)
+    return price, volume, rsi
+
+
+def _scale(values, lo, hi, box):
+    """Value array -> pixel y (top of box is hi)."""
+    _, top, _, bottom = box
+    return bottom - (values - lo) / ((hi - lo) or 1) * (bottom - top)
+
+
+def _polyline(draw, xs, ys, color, width):
+    ok = np.isfinite(ys)
+    if ok.sum() < 2:
+        return
+    draw.line(np.column_stack((xs[ok], ys[ok])).ravel().tolist(), fill=color, width=width)
+
+
+def _vector_bars(draw, origin, w, h, n, heights, up):
+    """Volume bars as rectangles for vector backends (draw.rectangles)."""
+    left = origin[0] + np.arange(n) * w / n
+    right = left + w / n - (1 if w > 2 * n else 0)
+    bottom = origin[1] + h
+    boxes = np.column_stack((left, bottom - heights, right, np.full(n, bottom)))
+    visible = heights > 0
+    for sel, color in ((up & visible, UP_COLOR), (~up & visible, DOWN_COLOR)):
+        draw.rectangles(boxes[sel].tolist(), color)
+
+
+def draw_static(draw, box, font):
+    """Frames, RSI bands and legend (everything that doesn't depend on the data)."""
+    price, volume, rsi = panel_boxes(*box)
+    for b in (price, volume, rsi):
+        draw.rectangle(b, outline=GRID_COLOR)
+    for level in (30, 70):
+        y = float(_scale(np.float64(level), 0, 100, rsi))
+        draw.line([(rsi[0], y), (rsi[2], y)], fill=GRID_COLOR, width=1)
+    x = price[0] + 10
+    for label, color in (("Close", CLOSE_COLOR), ("50 DMA", DMA50_COLOR), ("200 DMA", DMA200_COLOR)):
+        draw.line([(x, price[1] + 18), (x + 20, price[1] + 18)], fill=color, width=3)
+        draw.text((x + 26, price[1] + 8), label, font=font, fill=LABEL_COLOR)
+        x += 140
+    draw.text((rsi[0] + 10, rsi[1] + 4), "RSI (14)", font=font, fill=LABEL_COLOR)
+
+
+def draw_chart(img, draw, box, chart, font):
+    """Series of one stock onto the panel drawn by draw_static (img=None: SvgDraw)."""
+    price, volume, rsi = panel_boxes(*box)
+    close = np.asarray(chart['close'], dtype=float)
+    n = len(close)
+    if n < 2:
+        return
+    x0, x1 = price[0] + 1, price[2] - 1
+    xs = np.linspace(x0, x1, n)
+
+    # 1. Price and moving averages on a shared scale
+    dma50 = np.asarray(chart.get('dma50', [np.nan] * n), dtype=float)
+    dma200 = np.asarray(chart.get('dma200', [np.nan] * n), dtype=float)
+    stacked = np.concatenate((close, dma50, dma200))
+    lo, hi = np.nanmin(stacked), np.nanmax(stacked)
+    pad = (hi - lo) * 0.05 or 1
+    inner = (price[0], price[1] + 34, price[2], price[3] - 4)  # keep clear of the legend
+    for series, color, width in ((dma200, DMA200_COLOR, 2), (dma50, DMA50_COLOR, 2), (close, CLOSE_COLOR, 3)):
+        _polyline(draw, xs, _scale(series, lo - pad, hi + pad, inner), color, width)
+    draw.text((price[2] - 160, price[1] + 8), f"{lo:.1f} - {hi:.1f}", font=font, fill=LABEL_COLOR)
+
+    # 2. Volume histogram: one column per pixel, rasterized as masks
+    vol = np.nan_to_num(np.asarray(chart.get('volume', [0] * n), dtype=float))
+    if vol.max() > 0:
+        w, h = volume[2] - volume[0] - 1, volume[3] - volume[1] - 1
+        up = np.asarray(chart.get('up', close >= np.r_[close[0], close[:-1]]), dtype=bool)
+        origin = (volume[0] + 1, volume[1] + 1)
+        if img is None:  # SvgDraw: one rectangle per bar, up and down bars as two paths
+            _vector_bars(draw, origin, w, h, n, vol / vol.max() * h, up)
+        else:
+            bar = np.minimum((np.arange(w) * n) // w, n - 1)       # bar index of every pixel column
+            gap = np.diff(np.r_[bar, n]) > 0                        # last column of a bar stays empty
+            heights = np.where(gap & (w > 2 * n), 0, vol[bar] / vol.max() * h)
+            filled = np.arange(h)[::-1, None] < heights[None, :]    # (h, w) bar pixels
+            for mask, color in ((filled & up[bar], UP_COLOR), (filled & ~up[bar], DOWN_COLOR)):
+                img.paste(color, origin, Image.fromarray(mask.astype(np.uint8) * 255, 'L'))
+
+    # 3. RSI on its fixed 0-100 scale
+    rsi_values = np.asarray(chart.get('rsi', [np.nan] * n), dtype=float)
+    _polyline(draw, xs, _scale(rsi_values, 0, 100, rsi), RSI_COLOR, 2)
+    last = rsi_values[np.isfinite(rsi_values)]
+    if len(last):
+        draw.text((rsi[2] - 90, rsi[1] + 4), f"{last[-1]:.1f}", font=font, fill=RSI_COLOR)
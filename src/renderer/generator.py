@@ -1,257 +1,533 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+import functools
+from collections import OrderedDict
+import io
 import os
 import logging
+import textwrap
+import threading
 from datetime import datetime
 
+from src.renderer import chart as price_chart
+from src.renderer.svg import SvgDraw
+
 logger = logging.getLogger(__name__)
 
+# Bump when the drawing changes, so cached report images (src/renderer/cache.py) are not reused
+LAYOUT_VERSION = 3
+
+# Result fields render() reads besides 'details', 'news_items', 'scenarios' and 'chart'
+RENDER_FIELDS = (
+    'cmp', 'total_score', 'fundamental_score', 'technical_score', 'health_label',
+    'fundamental_summary', 'technical_summary', 'news_summary', 'swing_verdict', 'swing_action',
+    'swing_reason', 'long_term_verdict', 'long_term_reason', 'retail_conclusion', 'final_action',
+)
+NEWS_SHOWN = 4
+
+# Parameter rows per grid section, in drawing order
+FUND_KEYS_1 = [
+    'Market Cap', 'CMP vs 52W', 'P/E Ratio', 'PEG Ratio', 'EPS Trend',
+    'EBITDA Trend', 'Debt / Equity', 'Dividend Yield', 'Intrinsic Value',
+    'Current Ratio', 'Promoter Holding', 'FII/DII Trend', 'Operating Cash Flow'
+]
+FUND_KEYS_2 = [
+    'ROCE', 'ROE', 'Revenue CAGR', 'Profit CAGR', 'Interest Coverage',
+    'Free Cash Flow', 'Equity Dilution', 'Pledged Shares', 'Contingent Liab',
+    'Piotroski Score', 'Working Cap Cycle', 'CFO / PAT', 'Book Value Analysis'
+]
+TECH_KEYS = ['Trend (DMA)', 'RSI', 'MACD', 'Pivot Support', 'Volume Trend']
+NEWS_KEYS = [
+    'Orders / Business', 'Dividend / Buyback', 'Results Performance',
+    'Regulatory / Credit', 'Sector vs Nifty', 'Peer Comparison',
+    'Promoter Pledge', 'Management'
+]
+SECTION_TITLES = ["FUNDAMENTALS (1/2)", "FUNDAMENTALS (2/2)", "TECHNICALS", "NEWS & OTHERS"]
+
+# Key metric pie charts: (x, label)
+PIE_CHARTS = [(80, "Promoter"), (400, "Fundamental"), (720, "Debt Level"), (1040, "Technical")]
+PIE_RADIUS = 70
+
+# Every flat colour the report draws, and the backgrounds text is anti-aliased onto.
+# The fixed encoding palette is built from these (see report_palette).
+REPORT_COLORS = (
+    "#0F172A", "#1E293B", "#22C55E", "#334155", "#3B82F6", "#64748B", "#94A3B8", "#B45309",
+    "#CBD5E1", "#E2E8F0", "#EF4444", "#F59E0B", "#F8FAFC", "#FACC15", "#FFFFFF",
+)
+PALETTE_BACKGROUNDS = ("#0F172A", "#1E293B", "#F8FAFC")
+PALETTE_STEPS = 5  # blend steps per (colour, background) pair, keeps the palette <= 256
+
+# Encoder settings by use. 'palette' quantizes to 256 colours first:
+#   fixed     the precomputed report palette, fast and deterministic
+#   adaptive  a per-image octree palette, slower, a little smaller
+ENCODE_PROFILES = {
+    'default': {'format': 'PNG'},
+    'fast': {'format': 'PNG', 'palette': 'fixed', 'compress_level': 1},      # interactive requests
+    'small': {'format': 'PNG', 'palette': 'adaptive', 'optimize': True},     # channel broadcasts
+    'webp': {'format': 'WEBP', 'lossless': True, 'quality': 100, 'method': 4},  # smallest, web delivery
+    'svg': {'format': 'SVG'},                                                 # vector, served inline by the web app
+}
+MIMETYPES = {'PNG': 'image/png', 'WEBP': 'image/webp', 'SVG': 'image/svg+xml'}
+RASTER_PROFILES = tuple(p for p, s in ENCODE_PROFILES.items() if s['format'] != 'SVG')
+
+# Font pixel sizes by role (the SVG backend writes them as font-size)
+FONT_SIZES = {'title': 70, 'header': 45, 'subheader': 35, 'body': 26, 'small': 20}
+
+# --- Process-wide caches ---
+# Fonts are loaded once per process and the static background (titles, labels,
+# boxes, footer) is drawn once per layout; a report only draws its values on a copy.
+# Layouts follow measured text heights and each template is a full ~10 MB canvas,
+# so only the TEMPLATE_CACHE_SIZE most recently used ones are kept.
+TEMPLATE_CACHE_SIZE = 8
+
+_fonts = None
+_templates = OrderedDict()
+_palette = None
+_cache_lock = threading.Lock()
+
+
+def load_fonts():
+    global _fonts
+    if _fonts is None:
+        try:
+            fonts = {name: ImageFont.truetype("arial.ttf", size) for name, size in FONT_SIZES.items()}
+        except:
+            # One object per role, so the SVG backend can still tell them apart
+            fonts = {name: ImageFont.load_default() for name in FONT_SIZES}
+        _fonts = fonts
+    return _fonts
+
+
+def clear_caches():
+    """Drops the cached fonts, text measurements and templates (benchmarks, font changes)."""
+    global _fonts
+    with _cache_lock:
+        _fonts = None
+        _templates.clear()
+        text_height.cache_clear()
+
+
+_measure = ImageDraw.Draw(Image.new('RGB', (1, 1)))
+
+
+@functools.lru_cache(maxsize=4096)
+def text_height(text, font):
+    """Height of (multi-line) text as drawn from its top-left anchor; cached per text and font."""
+    if not text:
+        return 0
+    return _measure.multiline_textbbox((0, 0), text, font=font)[3]
+
+
+def report_palette():
+    """
+    'P' image holding the fixed encoding palette: the report colours plus
+    PALETTE_STEPS blends of each onto every background (anti-aliased text).
+    """
+    global _palette
+    if _palette is None:
+        entries = [ImageColor.getrgb(c) for c in REPORT_COLORS]
+        for bg in PALETTE_BACKGROUNDS:
+            b = ImageColor.getrgb(bg)
+            for color in REPORT_COLORS:
+                if color == bg:
+                    continue
+                c = ImageColor.getrgb(color)
+                for k in range(1, PALETTE_STEPS + 1):
+                    a = k / (PALETTE_STEPS + 1)
+                    entries.append(tuple(round(b[i] + (c[i] - b[i]) * a) for i in range(3)))
+        entries = list(dict.fromkeys(entries))
+        palette = Image.new('P', (1, 1))
+        palette.putpalette([v for e in entries for v in e])
+        _palette = palette
+    return _palette
+
+
+def encode(img, profile='default', **params):
+    """Encodes a rendered report with an ENCODE_PROFILES profile; `params` override it."""
+    settings = dict(ENCODE_PROFILES[profile], **params)
+    if settings['format'] == 'SVG':
+        raise ValueError("SVG is not a raster format, use InfographicGenerator.render_svg()")
+    palette = settings.pop('palette', None)
+    if palette == 'fixed':
+        img = img.quantize(palette=report_palette(), dither=Image.Dither.NONE)
+    elif palette == 'adaptive':
+        img = img.quantize(256, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE)
+    buf = io.BytesIO()
+    img.save(buf, **settings)
+    return buf.getvalue()
+
+
+def preload(samples=()):
+    """
+    Loads the fonts, the encoding palette and the templates for the layouts of
+    `samples` (result dicts; default: a full report) before the first report,
+    e.g. in pool workers or before a server forks.
+    """
+    load_fonts()
+    report_palette()
+    gen = InfographicGenerator()
+    full = {'details': dict.fromkeys(FUND_KEYS_1 + FUND_KEYS_2 + TECH_KEYS + NEWS_KEYS), 'news_items': [{}] * NEWS_SHOWN}
+    for data in samples or (full,):
+        gen._template(gen._layout(data))
+
+
+def _number(value):
+    """Metric value shown as text ('55.2%', '0.41', 'N/A') as a float, 0 when missing."""
+    try:
+        return float(str(value).replace('%', ''))
+    except ValueError:
+        return 0.0
+
+
+def mimetype(profile='default'):
+    return MIMETYPES[ENCODE_PROFILES[profile]['format']]
+
+
+def report_filename(symbol, profile='default'):
+    return f"{symbol}_report.{ENCODE_PROFILES[profile]['format'].lower()}"
+
+
 class InfographicGenerator:
     def __init__(self):
-        self.width = 1200 # Widened slightly
-        self.height = 2700 # Taller for all params + Summaries + News + Charts
+        self.width = 1200 # Widened slightly (height is measured per report, see _layout)
         self.bg_color = "#0F172A"
         self.text_color = "#FFFFFF"
         self.green = "#22C55E"
         self.yellow = "#FACC15"
         self.red = "#EF4444"
         self.card_bg = "#1E293B"
-        
-        # Load Fonts
-        try:
-            self.title_font = ImageFont.truetype("arial.ttf", 70)
-            self.header_font = ImageFont.truetype("arial.ttf", 45)
-            self.subheader_font = ImageFont.truetype("arial.ttf", 35) # New for section headers
-            self.body_font = ImageFont.truetype("arial.ttf", 26)
-            self.small_font = ImageFont.truetype("arial.ttf", 20)
-        except:
-            self.title_font = ImageFont.load_default()
-            self.header_font = ImageFont.load_default()
-            self.subheader_font = ImageFont.load_default()
-            self.body_font = ImageFont.load_default()
-            self.small_font = ImageFont.load_default()
 
-    def generate_report(self, stock_name, data, output_path):
-        img = Image.new('RGB', (self.width, self.height), color=self.bg_color)
-        draw = ImageDraw.Draw(img)
-        
+        # Fonts (shared, loaded once per process)
+        fonts = load_fonts()
+        self.title_font = fonts['title']
+        self.header_font = fonts['header']
+        self.subheader_font = fonts['subheader']
+        self.body_font = fonts['body']
+        self.small_font = fonts['small']
+
+    # --- Layout ---
+    def _layout(self, data):
+        """
+        Measures every section and places them top to bottom, so the canvas is
+        exactly as tall as the report. The result only depends on which rows are
+        present, how many news lines there are and the measured text heights,
+        which together are the template key.
+        """
+        details = data.get('details', {})
+        sections = tuple(tuple(k for k in keys if k in details) for keys in (FUND_KEYS_1, FUND_KEYS_2, TECH_KEYS, NEWS_KEYS))
+
+        # 1. Parameter grid: title + 40px per row, two columns
+        y_start = 200
+        next_section_y = y_start + 50 + 40 * max(len(sections[0]), len(sections[1])) + 40
+        y_cards = next_section_y + 50 + 40 * max(len(sections[2]), len(sections[3])) + 50
+
+        # 2. Summary boxes grow with the longest wrapped summary
+        summary_h = max(150, 70 + max(text_height(textwrap.fill(data.get(f, 'No summary.'), width=35), self.small_font)
+                                      for f in ('fundamental_summary', 'technical_summary', 'news_summary')))
+        y_decision = y_cards + summary_h + 30
+        y_retail = y_decision + 220
+        conclusion = textwrap.fill(f"Retail Conclusion: {data.get('retail_conclusion', '')}", width=90)
+        retail_h = max(120, 70 + text_height(conclusion, self.small_font))
+        y_final = y_retail + retail_h + 30
+
+        # 3. Footer: news (left out when there is none), key metrics, optional price chart and scenarios
+        news_lines = len(data.get('news_items', [])[:NEWS_SHOWN])
+        y_news = y_final + 180
+        y_charts = (y_news + 50 + 35 * news_lines + 40 if news_lines else y_news) + 60
+        y_end = y_charts + 200
+        has_chart = bool(data.get('chart'))
+        y_price = y_end + 20 if has_chart else None
+        if has_chart:
+            y_end = y_price + price_chart.PANEL_HEIGHT
+        scenarios = data.get('scenarios')
+        scenario_h = 100 + 25 * max(1, min(2, len(scenarios.get('breakpoints', [])))) if scenarios else 0
+        y_scen = y_end + 20 if scenario_h else None
+        if scenario_h:
+            y_end = y_scen + scenario_h
+
+        return {
+            'key': sections + (news_lines, summary_h, retail_h, has_chart, scenario_h),
+            'sections': sections,
+            'origins': [(50, y_start), (600, y_start), (50, next_section_y), (600, next_section_y)],
+            'y_cards': y_cards,
+            'summary_h': summary_h,
+            'y_decision': y_decision,
+            'y_retail': y_retail,
+            'retail_h': retail_h,
+            'y_final': y_final,
+            'y_news': y_news,
+            'news_lines': news_lines,
+            'y_charts': y_charts,
+            'y_price': y_price,
+            'y_scen': y_scen,
+            'height': y_end + 70,
+        }
+
+    def _price_box(self, layout):
+        y = layout['y_price']
+        return (50, y + 40, 1150, y + price_chart.PANEL_HEIGHT)
+
+    # --- Static layer ---
+    def _template(self, layout):
+        """Static background for a layout, drawn once and reused while it is among the recently used."""
+        key = layout['key']
+        with _cache_lock:
+            base = _templates.get(key)
+            if base is not None:
+                _templates.move_to_end(key)
+                return base
+        base = self._draw_static(layout)
+        with _cache_lock:
+            base = _templates.setdefault(key, base)
+            _templates.move_to_end(key)
+            while len(_templates) > TEMPLATE_CACHE_SIZE:
+                _templates.popitem(last=False)
+        logger.info(f"Rendered infographic template ({len(_templates)} cached)")
+        return base
+
+    def _draw_static(self, layout):
+        img = Image.new('RGB', (self.width, layout['height']), color=self.bg_color)
+        self._draw_background(ImageDraw.Draw(img), layout)
+        return img
+
+    def _draw_background(self, draw, layout):
+        """Everything that only depends on the layout (PIL ImageDraw or SvgDraw)."""
+        height = layout['height']
+        # Section titles and row labels
+        for title, keys, (x, y) in zip(SECTION_TITLES, layout['sections'], layout['origins']):
+            draw.text((x, y), title, font=self.subheader_font, fill=self.yellow)
+            y += 50
+            for k in keys:
+                draw.text((x, y), f"{k}", font=self.body_font, fill="#94A3B8") # Label
+                y += 40
+
+        # Summary boxes (Light BG)
+        y = layout['y_cards']
+        for x in (50, 430, 810):
+            draw.rounded_rectangle([x, y, x + 360, y + layout['summary_h']], radius=15, fill="#F8FAFC", outline="#CBD5E1")
+
+        # Decision cards
+        y = layout['y_decision']
+        draw.rounded_rectangle([50, y, 580, y + 200], radius=15, fill=self.card_bg, outline="#334155")
+        draw.text((80, y + 20), "Swing Trading", font=self.body_font, fill="#94A3B8")
+        draw.rounded_rectangle([620, y, 1150, y + 200], radius=15, fill=self.card_bg, outline="#334155")
+        draw.text((650, y + 20), "Long-Term Investment", font=self.body_font, fill="#94A3B8")
+
+        # Retail conclusion box
+        y = layout['y_retail']
+        draw.rounded_rectangle([50, y, 1150, y + layout['retail_h']], radius=15, fill="#F8FAFC", outline="#CBD5E1")
+        draw.text((80, y + 20), "Overall:", font=self.small_font, fill="#0F172A")
+
+        # Footer block with the verdict, news and metrics headings
+        y_final = layout['y_final']
+        draw.rectangle([0, y_final, self.width, height], fill=self.card_bg)
+        draw.text((50, y_final + 30), "FINAL VERDICT", font=self.subheader_font, fill=self.yellow)
+        if layout['news_lines']:
+            draw.text((50, layout['y_news']), "📰 LATEST NEWS", font=self.subheader_font, fill=self.yellow)
+
+        y_charts = layout['y_charts']
+        draw.text((50, y_charts - 60), "📊 KEY METRICS", font=self.subheader_font, fill=self.yellow)
+        d = PIE_RADIUS * 2
+        for x, label in PIE_CHARTS:
+            draw.ellipse([x, y_charts, x + d, y_charts + d], fill="#1E293B", outline="#334155", width=2) # Background circle
+            draw.text((x, y_charts + d + 10), label, font=self.small_font, fill="#94A3B8") # Label below
+
+        if layout['y_price'] is not None:
+            y = layout['y_price']
+            draw.text((50, y), "📈 PRICE, DMA, VOLUME & RSI (6M)", font=self.body_font, fill=self.yellow)
+            price_chart.draw_static(draw, self._price_box(layout), self.small_font)
+
+        draw.text((50, height - 50), "generated by Samvruddhi Stock Analyzer | Educational Purpose Only", font=self.small_font, fill="#64748B")
+
+    # --- Dynamic layer ---
+    def render(self, stock_name, data):
+        """Draws the report on a copy of the cached template and returns the PIL Image."""
+        layout = self._layout(data)
+        img = self._template(layout).copy()
+        self._draw_report(img, ImageDraw.Draw(img), layout, stock_name, data)
+        return img
+
+    def render_svg(self, stock_name, data):
+        """
+        Same report as an SVG document (str), drawn by the same layout and
+        drawing code through SvgDraw. Text is left to the browser's fonts.
+        """
+        layout = self._layout(data)
+        fonts = load_fonts()
+        draw = SvgDraw(self.width, layout['height'], self.bg_color, {id(fonts[k]): size for k, size in FONT_SIZES.items()})
+        self._draw_background(draw, layout)
+        self._draw_report(None, draw, layout, stock_name, data)
+        return draw.tostring(title=f"{stock_name} stock report")
+
+    def _draw_report(self, img, draw, layout, stock_name, data):
+        """The values of one report; `img` is None when drawing SVG."""
         # 1. Header (0 - 180)
         draw.text((50, 40), stock_name, font=self.title_font, fill=self.text_color)
-        
+
         cmp = data.get('cmp', 0)
         draw.text((50, 120), f"CMP: ₹{cmp:.2f}", font=self.header_font, fill=self.text_color)
-        
+
         # Score Badge
         score = data.get('total_score', 0)
         risk_label = data.get('health_label', 'Unknown')
         score_color = self.green if score > 25 else (self.yellow if score > 15 else self.red)
-        
+
         draw.rounded_rectangle([750, 40, 1150, 160], radius=20, fill=self.card_bg, outline=score_color, width=4)
         draw.text((800, 60), f"Score: {score:.1f}/37", font=self.header_font, fill=score_color)
         draw.text((800, 110), f"{risk_label}", font=self.body_font, fill=score_color)
 
-        # 2. DATA GRID (200 - 1300)
-        y_start = 200
+        # 2. DATA GRID: values and status dots next to the template's labels
         details = data.get('details', {})
-        
-        # Define Columns
-        col1_x = 50   # Fundamentals 1
-        col2_x = 600  # Fundamentals 2 / Technials
-        
-        # Helper to draw list
-        def draw_section(title, keys, start_x, start_y):
-            draw.text((start_x, start_y), title, font=self.subheader_font, fill=self.yellow)
-            y = start_y + 50
+        for keys, (x, y) in zip(layout['sections'], layout['origins']):
+            y += 50
             for k in keys:
-                if k in details:
-                    val = details[k]
-                    # Status Dot
-                    dot_color = self.green if val['score'] >= 1 else (self.yellow if val['score'] == 0.5 else self.red)
-                    
-                    # Truncate value if too long
-                    v_str = str(val['value'])
-                    if len(v_str) > 15: v_str = v_str[:12] + "..."
-                    
-                    draw.text((start_x, y), f"{k}", font=self.body_font, fill="#94A3B8") # Label
-                    draw.text((start_x + 280, y), f"{v_str}", font=self.body_font, fill=self.text_color) # Value
-                    draw.ellipse([start_x + 480, y+8, start_x + 495, y+23], fill=dot_color) # Dot
-                    y += 40
-            return y
-
-        # --- Fundamentals (Split into 2 cols to fit 26 items) --
-        fund_keys_1 = [
-            'Market Cap', 'CMP vs 52W', 'P/E Ratio', 'PEG Ratio', 'EPS Trend', 
-            'EBITDA Trend', 'Debt / Equity', 'Dividend Yield', 'Intrinsic Value',
-            'Current Ratio', 'Promoter Holding', 'FII/DII Trend', 'Operating Cash Flow'
-        ]
-        fund_keys_2 = [
-            'ROCE', 'ROE', 'Revenue CAGR', 'Profit CAGR', 'Interest Coverage',
-            'Free Cash Flow', 'Equity Dilution', 'Pledged Shares', 'Contingent Liab',
-            'Piotroski Score', 'Working Cap Cycle', 'CFO / PAT', 'Book Value Analysis'
-        ]
-        
-        y_end_1 = draw_section("FUNDAMENTALS (1/2)", fund_keys_1, col1_x, y_start)
-        y_end_2 = draw_section("FUNDAMENTALS (2/2)", fund_keys_2, col2_x, y_start)
-        
-        next_section_y = max(y_end_1, y_end_2) + 40
-        
-        # --- Technicals & News ---
-        tech_keys = ['Trend (DMA)', 'RSI', 'MACD', 'Pivot Support', 'Volume Trend']
-        news_keys = [
-            'Orders / Business', 'Dividend / Buyback', 'Results Performance',
-            'Regulatory / Credit', 'Sector vs Nifty', 'Peer Comparison', 
-            'Promoter Pledge', 'Management'
-        ]
-        
-        y_tech = draw_section("TECHNICALS", tech_keys, col1_x, next_section_y)
-        y_news = draw_section("NEWS & OTHERS", news_keys, col2_x, next_section_y)
-        
-        y_cards = max(y_tech, y_news) + 50
-        
+                val = details[k]
+                dot_color = self.green if val['score'] >= 1 else (self.yellow if val['score'] == 0.5 else self.red)
+
+                # Truncate value if too long
+                v_str = str(val['value'])
+                if len(v_str) > 15: v_str = v_str[:12] + "..."
+
+                draw.text((x + 280, y), f"{v_str}", font=self.body_font, fill=self.text_color) # Value
+                draw.ellipse([x + 480, y+8, x + 495, y+23], fill=dot_color) # Dot
+                y += 40
+
         # 3. Summary Boxes (Web Layout Match)
-        # Fund Summary
-        f_summary = data.get('fundamental_summary', 'No summary.')
-        t_summary = data.get('technical_summary', 'No summary.')
-        n_summary = data.get('news_summary', 'No summary.')
-        
-        def draw_summary_box(title, text, x, y, width, color="#FFFFFF"):
-            draw.rounded_rectangle([x, y, x + width, y + 150], radius=15, fill="#F8FAFC", outline="#CBD5E1") # Light BG
-            
-            # Determine Title Color
+        y = layout['y_cards']
+        summaries = [
+            ("Fundamental Summary", data.get('fundamental_summary', 'No summary.'), 50),
+            ("Technical Summary", data.get('technical_summary', 'No summary.'), 430),
+            ("News Summary", data.get('news_summary', 'No summary.'), 810),
+        ]
+        for title, text, x in summaries:
             if "Bullish" in text: title_color = self.green
             elif "Bearish" in text: title_color = self.red
             else: title_color = "#B45309" # Dark Amber/Yellow
-            
+
             draw.text((x + 20, y + 20), title, font=self.small_font, fill=title_color)
-            
-            # Wrap Text logic (Simple)
-            import textwrap
-            wrapped = textwrap.fill(text, width=35) 
-            draw.text((x + 20, y + 50), wrapped, font=self.small_font, fill="#0F172A") # Dark text
-
-        # Draw 3 boxes
-        box_w = 360
-        draw_summary_box("Fundamental Summary", f_summary, 50, y_cards, box_w)
-        draw_summary_box("Technical Summary", t_summary, 430, y_cards, box_w)
-        draw_summary_box("News Summary", n_summary, 810, y_cards, box_w)
-        
-        y_cards += 180 # Push down for decision cards
+            draw.text((x + 20, y + 50), textwrap.fill(text, width=35), font=self.small_font, fill="#0F172A") # Dark text
 
         # 4. Decision Cards (Swing & Long Term)
-        # Swing Card
-        draw.rounded_rectangle([50, y_cards, 580, y_cards + 200], radius=15, fill=self.card_bg, outline="#334155")
-        draw.text((80, y_cards + 20), "Swing Trading", font=self.body_font, fill="#94A3B8")
-        
+        y = layout['y_decision']
         swing_verdict = data.get('swing_verdict', 'WAIT')
         s_color = self.green if "BUY" in swing_verdict else (self.red if "AVOID" in swing_verdict else self.yellow)
-        draw.text((80, y_cards + 60), swing_verdict, font=self.header_font, fill=s_color)
-        
+        draw.text((80, y + 60), swing_verdict, font=self.header_font, fill=s_color)
+
         # Swing Action Details (Entry/SL/Tgt)
         swing_action = data.get('swing_action', '')
-        swing_reason = data.get('swing_reason', '')
-        
-        draw.text((80, y_cards + 110), swing_reason, font=self.small_font, fill="#E2E8F0")
+        draw.text((80, y + 110), data.get('swing_reason', ''), font=self.small_font, fill="#E2E8F0")
         if swing_action:
-            draw.text((80, y_cards + 140), swing_action, font=self.small_font, fill=self.yellow)
-        
-        # Long Term Card
-        draw.rounded_rectangle([620, y_cards, 1150, y_cards + 200], radius=15, fill=self.card_bg, outline="#334155")
-        draw.text((650, y_cards + 20), "Long-Term Investment", font=self.body_font, fill="#94A3B8")
-        
+            draw.text((80, y + 140), swing_action, font=self.small_font, fill=self.yellow)
+
         lt_verdict = data.get('long_term_verdict', 'AVOID')
         l_color = self.green if "BUY" in lt_verdict else (self.red if "AVOID" in lt_verdict else self.yellow)
-        draw.text((650, y_cards + 60), lt_verdict, font=self.header_font, fill=l_color)
-        
+        draw.text((650, y + 60), lt_verdict, font=self.header_font, fill=l_color)
+
         lt_reason = data.get('long_term_reason', '')
         if len(lt_reason) > 40: lt_reason = lt_reason[:37] + "..."
-        draw.text((650, y_cards + 110), lt_reason, font=self.small_font, fill="#E2E8F0")
-        
-        y_cards += 220 # Push down
+        draw.text((650, y + 110), lt_reason, font=self.small_font, fill="#E2E8F0")
 
         # Retail Conclusion (Bottom Text)
-        retail_conc = data.get('retail_conclusion', '')
-        import textwrap
-        wrapped_conc = textwrap.fill(f"Retail Conclusion: {retail_conc}", width=90)
-        
-        draw.rounded_rectangle([50, y_cards, 1150, y_cards + 120], radius=15, fill="#F8FAFC", outline="#CBD5E1")
-        draw.text((80, y_cards + 20), "Overall:", font=self.small_font, fill="#0F172A")
-        draw.text((160, y_cards + 20), data.get('health_label',''), font=self.small_font, fill=self.green if "High" in data.get('health_label','') else self.red)
-        draw.text((80, y_cards + 50), wrapped_conc, font=self.small_font, fill="#334155")
+        y = layout['y_retail']
+        health = data.get('health_label', '')
+        wrapped_conc = textwrap.fill(f"Retail Conclusion: {data.get('retail_conclusion', '')}", width=90)
+        draw.text((160, y + 20), health, font=self.small_font, fill=self.green if "High" in health else self.red)
+        draw.text((80, y + 50), wrapped_conc, font=self.small_font, fill="#334155")
 
         # 5. Footer (Final Action)
-        y_final = y_cards + 150
-        draw.rectangle([0, y_final, self.width, self.height], fill=self.card_bg)
-        
         final_action = data.get('final_action', 'Analyze more data.')
-        draw.text((50, y_final + 30), "FINAL VERDICT", font=self.subheader_font, fill=self.yellow)
-        draw.text((50, y_final + 80), final_action, font=self.header_font, fill="#FFFFFF")
-        
+        draw.text((50, layout['y_final'] + 80), final_action, font=self.header_font, fill="#FFFFFF")
+
         # 6. News Section
-        y_news = y_final + 180
-        draw.text((50, y_news), "📰 LATEST NEWS", font=self.subheader_font, fill=self.yellow)
-        
-        news_items = data.get('news_items', [])
-        y_news += 50
-        for i, news in enumerate(news_items[:4]):
-            if y_news > self.height - 400:  # Leave space for charts
-                break
+        y_news = layout['y_news'] + 50
+        for news in data.get('news_items', [])[:layout['news_lines']]:
             source = news.get('source', 'News')
             title = news.get('title', '')
             if len(title) > 80:
                 title = title[:77] + "..."
-            
+
             draw.text((50, y_news), f"• [{source}]", font=self.small_font, fill=self.green)
             draw.text((200, y_news), title, font=self.small_font, fill="#E2E8F0")
             y_news += 35
-        
-        # 7. Pie Charts Section
-        y_charts = y_news + 40
-        draw.text((50, y_charts), "📊 KEY METRICS", font=self.subheader_font, fill=self.yellow)
-        y_charts += 60
-        
-        # Helper function to draw pie chart
-        def draw_pie_chart(x, y, radius, percentage, color1, color2, label, value_text):
-            # Background circle
-            draw.ellipse([x, y, x + radius*2, y + radius*2], fill="#1E293B", outline="#334155", width=2)
-            
+
+        # 7. Pie Charts (rings and labels come from the template)
+        y_charts = layout['y_charts']
+
+        def draw_pie_chart(x, y, radius, percentage, color1, value_text):
             # Pie slice (percentage)
             if percentage > 0:
                 angle = int(360 * (percentage / 100))
                 draw.pieslice([x, y, x + radius*2, y + radius*2], start=-90, end=-90 + angle, fill=color1)
-            
+
             # Center circle (donut effect)
             inner_r = radius * 0.6
             offset = (radius - inner_r)
             draw.ellipse([x + offset, y + offset, x + radius*2 - offset, y + radius*2 - offset], fill=self.bg_color)
-            
-            # Center text
-            center_x = x + radius
-            center_y = y + radius
-            draw.text((center_x - 20, center_y - 15), f"{percentage:.0f}%", font=self.body_font, fill="#FFFFFF")
-            
-            # Label below
-            draw.text((x, y + radius*2 + 10), label, font=self.small_font, fill="#94A3B8")
+
+            # Center text, value below the label
+            draw.text((x + radius - 20, y + radius - 15), f"{percentage:.0f}%", font=self.body_font, fill="#FFFFFF")
             draw.text((x, y + radius*2 + 35), value_text, font=self.small_font, fill="#FFFFFF")
-        
+
         # Chart 1: Promoter Holding
-        promoter = float(data.get('details', {}).get('Promoter Holding', {}).get('value', '0').replace('%', '') or 0)
-        draw_pie_chart(80, y_charts, 70, promoter, self.green, "#334155", "Promoter", f"{promoter:.1f}%")
-        
+        promoter = _number(details.get('Promoter Holding', {}).get('value'))
+        draw_pie_chart(80, y_charts, PIE_RADIUS, promoter, self.green, f"{promoter:.1f}%")
+
         # Chart 2: Score Breakdown
         total = data.get('total_score', 1)
         fund_pct = (data.get('fundamental_score', 0) / max(total, 1)) * 100
-        draw_pie_chart(400, y_charts, 70, fund_pct, "#3B82F6", "#334155", "Fundamental", f"{fund_pct:.0f}%")
-        
+        draw_pie_chart(400, y_charts, PIE_RADIUS, fund_pct, "#3B82F6", f"{fund_pct:.0f}%")
+
         # Chart 3: Debt Level
-        debt = float(data.get('details', {}).get('Debt / Equity', {}).get('value', '0') or 0)
+        debt = _number(details.get('Debt / Equity', {}).get('value'))
         debt_pct = min((debt / 2) * 100, 100) if debt > 0 else 0
         debt_color = self.red if debt > 1 else self.green
-        draw_pie_chart(720, y_charts, 70, debt_pct, debt_color, "#334155", "Debt Level", f"{debt:.2f}")
-        
+        draw_pie_chart(720, y_charts, PIE_RADIUS, debt_pct, debt_color, f"{debt:.2f}")
+
         # Chart 4: Technical Score
         tech_pct = (data.get('technical_score', 0) / 5) * 100
-        draw_pie_chart(1040, y_charts, 70, tech_pct, "#F59E0B", "#334155", "Technical", f"{tech_pct:.0f}%")
-        
-        draw.text((50, self.height - 50), "generated by Samvruddhi Stock Analyzer | Educational Purpose Only", font=self.small_font, fill="#64748B")
-        
-        img.save(output_path)
+        draw_pie_chart(1040, y_charts, PIE_RADIUS, tech_pct, "#F59E0B", f"{tech_pct:.0f}%")
+
+        # 8. Price Chart (optional, see src/renderer/chart.py)
+        if layout['y_price'] is not None:
+            price_chart.draw_chart(img, draw, self._price_box(layout), data['chart'], self.small_font)
+
+        # 9. Price Scenarios (optional, see src/analysis/scenarios.py)
+        scenarios = data.get('scenarios')
+        if scenarios:
+            y_scen = layout['y_scen']
+            span_pct = scenarios.get('span', 0.3) * 100
+            draw.text((50, y_scen), f"🎯 PRICE SCENARIOS (±{span_pct:.0f}%)", font=self.body_font, fill=self.yellow)
+
+            # Total score sparkline across the price grid, CMP marked
+            scores = scenarios['total_score']
+            lo, hi = min(scores), max(scores)
+            x0, x1, y0, h = 50, 1150, y_scen + 40, 50
+            step_x = (x1 - x0) / max(len(scores) - 1, 1)
+            points = [(x0 + i * step_x, y0 + h - (s - lo) / ((hi - lo) or 1) * h) for i, s in enumerate(scores)]
+            draw.rectangle([x0, y0, x1, y0 + h], outline="#334155")
+            draw.line([((x0 + x1) / 2, y0), ((x0 + x1) / 2, y0 + h)], fill="#64748B", width=1)
+            draw.line(points, fill=self.green, width=3)
+            draw.text((x0 + 5, y0 + 2), f"{lo:.1f}-{hi:.1f}", font=self.small_font, fill="#94A3B8")
+
+            y_bp = y0 + h + 10
+            breakpoints = scenarios.get('breakpoints', [])
+            if not breakpoints:
+                draw.text((50, y_bp), "No verdict change within the range.", font=self.small_font, fill="#E2E8F0")
+            for bp in breakpoints[:2]:
+                line = f"{bp['horizon']}: {bp['below']} below ₹{bp['price']:.1f} ({bp['change_pct']:+.1f}%), {bp['above']} above"
+                draw.text((50, y_bp), line, font=self.small_font, fill="#E2E8F0")
+                y_bp += 25
+
+    def render_bytes(self, stock_name, data, profile='default', **params):
+        """
+        Renders the report into memory and returns the encoded bytes, ready to
+        upload or serve. `profile` picks the ENCODE_PROFILES settings, `params`
+        override them (passed to PIL's Image.save). No file touches disk.
+        The 'svg' profile returns the UTF-8 SVG document instead.
+        """
+        if ENCODE_PROFILES[profile]['format'] == 'SVG':
+            return self.render_svg(stock_name, data).encode('utf-8')
+        return encode(self.render(stock_name, data), profile, **params)
+
+    def generate_report(self, stock_name, data, output_path):
+        self.render(stock_name, data).save(output_path)
         return output_path
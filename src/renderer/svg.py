@@ -0,0 +1,102 @@
+"""
+SVG backend for the infographic.
+
+SvgDraw implements the part of PIL's ImageDraw API the generator uses (text,
+rectangle, rounded_rectangle, ellipse, pieslice, line) and records SVG
+elements instead of pixels, so InfographicGenerator.render_svg() runs the
+same layout and drawing code as the PNG path. Shapes are written with short,
+repetitive markup and 1-decimal coordinates, which keeps the document small
+and compresses well.
+"""
+import math
+from xml.sax.saxutils import escape
+
+LINE_SPACING = 1.2  # em per line of multi-line text (PIL: font size + 4px)
+
+
+def _n(v):
+    """Compact number: integers without decimals, others with one."""
+    v = round(float(v), 1)
+    return str(int(v)) if v.is_integer() else str(v)
+
+
+def _points(xy):
+    """PIL accepts [(x, y), ...] or a flat [x0, y0, x1, ...]; returns [(x, y), ...]."""
+    xy = list(xy)
+    if xy and not isinstance(xy[0], (tuple, list)):
+        xy = list(zip(xy[0::2], xy[1::2]))
+    return xy
+
+
+def _paint(fill=None, outline=None, width=1):
+    attrs = f' fill="{fill}"' if fill else ' fill="none"'
+    if outline:
+        attrs += f' stroke="{outline}"' + (f' stroke-width="{_n(width)}"' if width != 1 else '')
+    return attrs
+
+
+class SvgDraw:
+    """Collects SVG elements through an ImageDraw-like interface."""
+
+    def __init__(self, width, height, background, font_sizes):
+        self.width = width
+        self.height = height
+        self.font_sizes = font_sizes  # id(font) -> px
+        self.parts = [f'<rect width="{width}" height="{height}" fill="{background}"/>']
+
+    def text(self, xy, text, font=None, fill=None):
+        x, y = xy
+        size = self.font_sizes.get(id(font), 20)
+        lines = str(text).split('\n')
+        if len(lines) == 1:
+            body = escape(lines[0])
+        else:
+            body = ''.join(f'<tspan x="{_n(x)}" dy="{0 if i == 0 else LINE_SPACING}em">{escape(line)}</tspan>'
+                           for i, line in enumerate(lines))
+        self.parts.append(f'<text x="{_n(x)}" y="{_n(y)}" font-size="{size}" fill="{fill}">{body}</text>')
+
+    def rectangle(self, xy, fill=None, outline=None, width=1):
+        x0, y0, x1, y1 = xy
+        self.parts.append(f'<rect x="{_n(x0)}" y="{_n(y0)}" width="{_n(x1 - x0)}" height="{_n(y1 - y0)}"'
+                          f'{_paint(fill, outline, width)}/>')
+
+    def rounded_rectangle(self, xy, radius=0, fill=None, outline=None, width=1):
+        x0, y0, x1, y1 = xy
+        self.parts.append(f'<rect x="{_n(x0)}" y="{_n(y0)}" width="{_n(x1 - x0)}" height="{_n(y1 - y0)}" rx="{_n(radius)}"'
+                          f'{_paint(fill, outline, width)}/>')
+
+    def rectangles(self, boxes, fill):
+        """Many filled rectangles as one path (volume bars)."""
+        d = ''.join(f'M{_n(x0)} {_n(y0)}H{_n(x1)}V{_n(y1)}H{_n(x0)}Z' for x0, y0, x1, y1 in boxes)
+        if d:
+            self.parts.append(f'<path d="{d}" fill="{fill}"/>')
+
+    def ellipse(self, xy, fill=None, outline=None, width=1):
+        x0, y0, x1, y1 = xy
+        self.parts.append(f'<ellipse cx="{_n((x0 + x1) / 2)}" cy="{_n((y0 + y1) / 2)}" rx="{_n((x1 - x0) / 2)}" ry="{_n((y1 - y0) / 2)}"'
+                          f'{_paint(fill, outline, width)}/>')
+
+    def pieslice(self, xy, start, end, fill=None, outline=None, width=1):
+        x0, y0, x1, y1 = xy
+        cx, cy, rx, ry = (x0 + x1) / 2, (y0 + y1) / 2, (x1 - x0) / 2, (y1 - y0) / 2
+        if end - start >= 360:
+            self.ellipse(xy, fill, outline, width)
+            return
+        a0, a1 = math.radians(start), math.radians(end)
+        sx, sy = cx + rx * math.cos(a0), cy + ry * math.sin(a0)
+        ex, ey = cx + rx * math.cos(a1), cy + ry * math.sin(a1)
+        large = 1 if (end - start) % 360 > 180 else 0
+        d = f'M{_n(cx)} {_n(cy)}L{_n(sx)} {_n(sy)}A{_n(rx)} {_n(ry)} 0 {large} 1 {_n(ex)} {_n(ey)}Z'
+        self.parts.append(f'<path d="{d}"{_paint(fill, outline, width)}/>')
+
+    def line(self, xy, fill=None, width=0):
+        pts = ' '.join(f'{_n(x)},{_n(y)}' for x, y in _points(xy))
+        self.parts.append(f'<polyline points="{pts}" fill="none" stroke="{fill}" stroke-width="{_n(max(width, 1))}"/>')
+
+    def tostring(self, title=None):
+        head = (f'<svg xmlns="http://www.w3.org/2000/svg" width="{self.width}" height="{self.height}" '
+                f'viewBox="0 0 {self.width} {self.height}">'
+                '<style>text{font-family:Arial,Helvetica,sans-serif;dominant-baseline:text-before-edge;white-space:pre}</style>')
+        if title:
+            head += f'<title>{escape(title)}</title>'
+        return head + ''.join(self.parts) + '</svg>'
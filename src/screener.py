@@ -0,0 +1,189 @@
+"""
+Universe screener: scores every stock of an index in one batch from the local cache.
+
+    python -m src.screener --universe nifty500.csv --min-score 25 --output screen.csv
+
+The universe file is either one symbol per line or an NSE index CSV with a
+'Symbol' column. Fundamentals and OHLC history come from DataCache; use
+--fetch-missing to scrape and cache symbols that aren't stored yet, and
+--refresh-days N to re-fetch cached data whose newest fundamentals snapshot or
+last OHLC bar is more than N days old (each refresh saves a new dated
+snapshot). News is not fetched in this mode, so every stock gets the neutral
+news score.
+"""
+import argparse
+import csv
+import logging
+import time
+from contextlib import contextmanager
+from datetime import date
+
+import pandas as pd
+from src.analysis.engine import AnalysisEngine
+from src.fetchers.cache import DataCache
+from src.fetchers.fundamentals import FundamentalFetcher
+from src.fetchers.technicals import TechnicalFetcher
+
+logger = logging.getLogger(__name__)
+
+SORT_COLUMNS = {
+    'total': 'total_score',
+    'fundamental': 'fundamental_score',
+    'technical': 'technical_score',
+}
+
+OUTPUT_COLUMNS = [
+    'symbol', 'cmp', 'total_score', 'fundamental_score', 'technical_score', 'news_score',
+    'swing_verdict', 'long_term_verdict', 'health_label', 'risk_triggered',
+]
+
+
+class StageTimer:
+    """Collects wall-clock time per pipeline stage."""
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = time.perf_counter() - start
+
+    def report(self):
+        total = sum(self.timings.values())
+        parts = " | ".join(f"{name}: {secs * 1000:.0f}ms" for name, secs in self.timings.items())
+        return f"{parts} | total: {total:.2f}s"
+
+
+def load_universe(path):
+    with open(path, encoding='utf-8-sig') as f:
+        lines = [line.strip() for line in f if line.strip()]
+    if lines and ',' in lines[0]:
+        reader = csv.DictReader(lines)
+        key = next((k for k in reader.fieldnames if k.strip().lower() == 'symbol'), None)
+        if key is None:
+            raise ValueError(f"{path}: CSV universe needs a 'Symbol' column")
+        symbols = [row[key].strip().upper() for row in reader if row.get(key)]
+    else:
+        symbols = [line.upper() for line in lines if not line.startswith('#')]
+    return list(dict.fromkeys(symbols))
+
+
+def _last_bar_date(df):
+    """Date of the last OHLC bar (cached CSVs have string timestamps), None if unreadable."""
+    try:
+        return pd.Timestamp(str(df.index[-1])[:10]).date()
+    except (IndexError, ValueError):
+        return None
+
+
+def _stale(day, refresh_days):
+    return refresh_days is not None and (day is None or (date.today() - day).days > refresh_days)
+
+
+def load_inputs(symbols, cache, fetch_missing=False, refresh_days=None):
+    """
+    Reads fundamentals and technicals for every symbol from the cache.
+    With fetch_missing, symbols without cached data are scraped and cached;
+    with refresh_days, cached data older than that is fetched and saved again
+    (the cached copy is kept if the fetch fails).
+    Returns (symbols, fundamentals, technicals) for the symbols with any data.
+    """
+    tf = TechnicalFetcher()
+    ff = FundamentalFetcher(cache) if fetch_missing or refresh_days is not None else None
+    kept, funds, techs = [], [], []
+    for symbol in symbols:
+        fund = cache.load_fundamentals(symbol)
+        df = cache.load_ohlc(symbol)
+        dates = cache.snapshot_dates(symbol) if fund is not None else []
+        if (fund is None and fetch_missing) or (fund is not None and _stale(dates[-1] if dates else None, refresh_days)):
+            fresh = ff.get_data(symbol)  # also saved as today's snapshot
+            if fresh:
+                fund = fresh
+        if (df is None and fetch_missing) or (df is not None and _stale(_last_bar_date(df), refresh_days)):
+            fresh = tf.fetch_ohlc_history(symbol)
+            if fresh is not None:
+                cache.save_ohlc(symbol, fresh)
+                df = fresh
+        if not fund and df is None:
+            continue
+        kept.append(symbol)
+        funds.append(fund)
+        techs.append(df)
+    return kept, funds, techs
+
+
+def screen(symbols, fundamentals, histories, sort_by='total', min_score=None, top=None, timer=None):
+    """Scores the universe and returns a ranked DataFrame."""
+    timer = timer or StageTimer()
+    tf = TechnicalFetcher()
+    engine = AnalysisEngine()
+
+    with timer.stage('indicators'):
+        technicals = [tf.build_data(df) for df in histories]
+
+    with timer.stage('scoring'):
+        result = engine.evaluate_batch(fundamentals, technicals)
+
+    with timer.stage('rank'):
+        table = pd.DataFrame({col: result[col] for col in OUTPUT_COLUMNS[1:]})
+        table.insert(0, 'symbol', symbols)
+        sort_col = SORT_COLUMNS[sort_by]
+        if min_score is not None:
+            table = table[table[sort_col] >= min_score]
+        table = table.sort_values([sort_col, 'total_score'], ascending=False, kind='stable')
+        if top:
+            table = table.head(top)
+        table.insert(0, 'rank', range(1, len(table) + 1))
+    return table.reset_index(drop=True)
+
+
+def write_table(table, path):
+    if path.lower().endswith('.parquet'):
+        table.to_parquet(path, index=False)  # needs pyarrow or fastparquet
+    else:
+        table.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score and rank a universe of stocks")
+    parser.add_argument("--universe", type=str, required=True, help="Symbols file (one per line, or CSV with a Symbol column)")
+    parser.add_argument("--sort-by", choices=sorted(SORT_COLUMNS), default='total', help="Score used to rank and filter")
+    parser.add_argument("--min-score", type=float, default=None, help="Keep stocks scoring at least this much")
+    parser.add_argument("--top", type=int, default=None, help="Keep only the N best")
+    parser.add_argument("--output", type=str, default="screen.csv", help="Output table (.csv or .parquet)")
+    parser.add_argument("--fetch-missing", action="store_true", help="Scrape and cache symbols missing from the cache")
+    parser.add_argument("--refresh-days", type=int, default=None,
+                        help="Re-fetch cached fundamentals / OHLC older than this many days")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    timer = StageTimer()
+    cache = DataCache()
+
+    with timer.stage('universe'):
+        symbols = load_universe(args.universe)
+    with timer.stage('load cache'):
+        kept, funds, histories = load_inputs(symbols, cache, args.fetch_missing, args.refresh_days)
+
+    skipped = len(symbols) - len(kept)
+    if skipped:
+        logger.warning(f"{skipped}/{len(symbols)} symbols have no cached data (use --fetch-missing)")
+    if not kept:
+        logger.error("Nothing to screen.")
+        return
+
+    table = screen(kept, funds, histories, args.sort_by, args.min_score, args.top, timer)
+
+    with timer.stage('write'):
+        write_table(table, args.output)
+
+    logger.info(f"Screened {len(kept)} stocks, {len(table)} passed. Saved to {args.output}")
+    print(table.head(20).to_string(index=False))
+    print(f"Timings: {timer.report()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,26 @@
-from flask import Flask, render_template, request
+from flask import Flask, Response, make_response, render_template, request, stream_with_context, url_for
 import logging
 import sys
 import os
+import time
 
 # Ensure src is in path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from src.fetchers.fundamentals import FundamentalFetcher
-from src.fetchers.technicals import TechnicalFetcher
-from src.fetchers.news import NewsFetcher
-from src.analysis.engine import AnalysisEngine
+from src.web.pipeline import analyze as analyze_symbol, analyze_many, api_payload, server_timing
+from src.web.store import report_store, valid_symbol
+from src.analysis.cache import result_cache, result_key
+from src.fetchers.singleflight import fetch_flight
+from src.web.jobs import MAX_WAIT, QueueFull, job_queue
 
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-from src.renderer.generator import InfographicGenerator
-from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHANNEL_ID
+from src.renderer.generator import ENCODE_PROFILES, mimetype, report_filename
+from src.renderer.cache import image_cache, image_key
+from src.config import TELEGRAM_BOT_TOKEN, TELEGRAM_CHANNEL_ID, BROADCAST_IMAGE_PROFILE, API_MAX_SYMBOLS
 import requests
 import json
 
@@ -25,38 +28,208 @@ import json
 def index():
     return render_template('index.html')
 
+def _report_page(result, timings=None):
+    """report.html for a finished result, with the infographic inline as SVG."""
+    symbol = result['symbol']
+    # Infographic as inline SVG (same renderer and image cache as the Telegram PNG)
+    start = time.perf_counter()
+    try:
+        svg = image_cache.render(symbol, result, 'svg').decode('utf-8')
+    except Exception as e:
+        logger.error(f"SVG render error for {symbol}: {e}")
+        svg = None
+    
+    response = make_response(render_template('report.html', data=result, details=result.get('details', {}), svg=svg,
+                                              missing=result.get('missing', [])))
+    if timings is not None:
+        timings['render'] = {'ms': (time.perf_counter() - start) * 1000, 'status': 'ok' if svg else 'error'}
+        response.headers['Server-Timing'] = server_timing(timings)
+    return response
+
 @app.route('/analyze', methods=['POST'])
 def analyze():
     symbol = request.form.get('stock_name', '').upper().strip()
     if not symbol:
         return render_template('index.html', error="Please enter a stock name")
+    if not valid_symbol(symbol):
+        return render_template('index.html', error=f"{symbol} is not a valid stock symbol"), 400
     
-    logger.info(f"Analyzing {symbol} via Web App...")
-    
-    # 1. Fetch
-    ff = FundamentalFetcher()
-    fund_data = ff.get_data(symbol)
-    
-    tf = TechnicalFetcher()
-    tech_data = tf.get_data(symbol)
-    
-    nf = NewsFetcher()
-    news_data = nf.fetch_latest_news(symbol)
+    # Background job: answer with its id at once, the page polls /jobs/<id>
+    if request.form.get('async'):
+        try:
+            job = job_queue.submit(symbol)
+        except QueueFull as e:
+            logger.warning(f"Rejected analysis of {symbol}: {e}")
+            return {"status": "error", "message": "Server busy, try again shortly."}, 503, {'Retry-After': '5'}
+        logger.info(f"Queued {symbol} as job {job.id} ({job_queue.stats()['depth']} waiting)")
+        return {"job_id": job.id, "status_url": url_for('job_status', job_id=job.id)}, 202
     
-    if not fund_data and not tech_data:
-        return render_template('index.html', error=f"Could not fetch data for {symbol}. Try another.")
-    
-    # 2. Analyze
-    engine = AnalysisEngine()
-    result = engine.evaluate_stock(fund_data, tech_data, news_data)
-    result['cmp'] = fund_data.get('Current Price') if fund_data else tech_data.get('Close', 0)
-    result['symbol'] = symbol
+    logger.info(f"Analyzing {symbol} via Web App...")
     
-    # Map for Template
-    # We need to construct the 'sections' and 'summary' objects the template expects
-    # For now, pass 'result' and 'details' and handle logic in Jinja or pre-process here.
+    # 1. Fetch (concurrently, under one deadline; late stages are left out), analyze and store
+    result, timings = analyze_symbol(symbol)
     
-    return render_template('report.html', data=result, details=result.get('details', {}))
+    if result is None:
+        response = make_response(render_template('index.html', error=f"Could not fetch data for {symbol}. Try another."))
+        response.headers['Server-Timing'] = server_timing(timings)
+        return response
+
+    return _report_page(result, timings)
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Job state as JSON; with ?wait=N (seconds) it long-polls until the job finished."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return {"status": "error", "message": "Unknown or expired job"}, 404
+    wait = min(request.args.get('wait', 0, type=float), MAX_WAIT)
+    if wait > 0:
+        job.wait(wait)
+    return job.to_dict()
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """
+    Server-Sent Events of a job's progress: queued, running, fundamentals,
+    technicals, news, scoring (with the report_url) and done / failed /
+    timeout. Each event's data is JSON with the stage timing. Reconnecting
+    clients resume after their Last-Event-ID.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return {"status": "error", "message": "Unknown or expired job"}, 404
+    start = request.headers.get('Last-Event-ID', -1, type=int) + 1
+
+    def stream():
+        index = start
+        while True:
+            events, finished = job.events_since(index, timeout=15)
+            if not events:
+                if finished:
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            for name, data in events:
+                yield f"id: {index}\nevent: {name}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+                index += 1
+            if finished and index == len(job.events):
+                return
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-store'})
+
+@app.route('/jobs/metrics')
+def job_metrics():
+    return job_queue.stats()
+
+@app.route('/metrics')
+def metrics():
+    """Counters of this server process: job queue, coalesced fetches and the caches."""
+    return {
+        'jobs': job_queue.stats(),
+        'fetches': fetch_flight.stats(),
+        'report_store': report_store.stats(),
+        'result_cache': result_cache.stats(),
+        'image_cache': image_cache.stats(),
+    }
+
+def _cacheable(response, etag, analyzed_at, pinned):
+    """
+    Validators and freshness of a stored report's page or image. A `pinned`
+    URL (with its analyzed_at) never changes, so browsers and the proxy may
+    keep it until the report expires from the store; the latest-report URL
+    changes with every analysis and must be revalidated each time.
+    """
+    response.set_etag(etag)
+    response.last_modified = analyzed_at
+    response.cache_control.public = True
+    if pinned:
+        response.cache_control.max_age = max(0, int(analyzed_at + report_store.ttl - time.time()))
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+def _conditional(render, etag, analyzed_at, pinned):
+    """304 when the client's If-None-Match has `etag` (nothing is rendered), else render()."""
+    if request.if_none_match.contains_weak(etag):  # proxies that compress turn our ETags weak
+        return _cacheable(Response(status=304), etag, analyzed_at, pinned)
+    return _cacheable(render(), etag, analyzed_at, pinned)
+
+@app.route('/report/<symbol>')
+@app.route('/report/<symbol>/<int:analyzed_at>')
+def report(symbol, analyzed_at=None):
+    """
+    A stored report (see src/web/store.py), e.g. the result of a background
+    job, or the symbol's latest one. Its ETag is the result hash.
+    """
+    result = report_store.get(symbol, analyzed_at)
+    if result is None:
+        return render_template('index.html', error=f"The {symbol.upper()} report expired, please analyze it again."), 404
+    etag = result.get('result_hash') or result_key(result)  # reports stored before result_hash existed
+    return _conditional(lambda: _report_page(result), etag, result['analyzed_at'],
+                        pinned=analyzed_at is not None)
+
+@app.route('/report/<symbol>/<int:analyzed_at>/image')
+def report_image(symbol, analyzed_at):
+    """
+    The infographic of a stored report, ?profile= any ENCODE_PROFILES entry
+    (default svg). Its ETag is the image cache key, a hash of everything drawn
+    and of the encoding, so unchanged reports answer 304 without a render.
+    """
+    profile = request.args.get('profile', 'svg')
+    if profile not in ENCODE_PROFILES:
+        return {"status": "error", "message": f"Unknown profile {profile!r}"}, 400
+    result = report_store.get(symbol, analyzed_at)
+    if result is None:
+        return {"status": "error", "message": f"The {symbol.upper()} report expired"}, 404
+    symbol = result['symbol']
+
+    def render():
+        image = image_cache.render(symbol, result, profile)
+        return Response(image, mimetype=mimetype(profile),
+                        headers={'Content-Disposition': f'inline; filename="{report_filename(symbol, profile)}"'})
+
+    return _conditional(render, image_key(symbol, result, profile), analyzed_at, pinned=True)
+
+@app.route('/api/analyze', methods=['GET', 'POST'])
+def api_analyze():
+    """
+    Machine-readable batch analysis. Symbols come as JSON {"symbols": [...]}
+    or ?symbols=A,B,C. Streams one NDJSON line per symbol as soon as it is
+    done (fastest first), reusing stored reports while they are fresh:
+        {"symbol", "status": "ok", "cached", "analyzed_at", "ms", "timings", "result"}
+        {"symbol", "status": "error", "message", "ms"}
+    """
+    body = request.get_json(silent=True) or {}
+    symbols = body.get('symbols') or request.values.get('symbols', '').split(',')
+    if isinstance(symbols, str):
+        symbols = symbols.split(',')
+    symbols = list(dict.fromkeys(str(s).upper().strip() for s in symbols if str(s).strip()))
+    if not symbols:
+        return {"status": "error", "message": "No symbols provided"}, 400
+    if len(symbols) > API_MAX_SYMBOLS:
+        return {"status": "error", "message": f"At most {API_MAX_SYMBOLS} symbols per request"}, 400
+    invalid = [s for s in symbols if not valid_symbol(s)]
+    if invalid:
+        return {"status": "error", "message": f"Invalid symbols: {', '.join(invalid)}"}, 400
+
+    logger.info(f"API batch of {len(symbols)} symbols")
+
+    def lines():
+        start = time.perf_counter()
+        for symbol, result, timings, cached, error in analyze_many(symbols):
+            ms = round((time.perf_counter() - start) * 1000, 1)
+            if result is None:
+                line = {"symbol": symbol, "status": "error", "ms": ms,
+                        "message": error or f"Could not fetch data for {symbol}"}
+            else:
+                line = {"symbol": symbol, "status": "ok", "cached": cached, "analyzed_at": result.get('analyzed_at'),
+                        "ms": ms, "timings": {k: round(t['ms'], 1) for k, t in timings.items()},
+                        "result": api_payload(result)}
+            yield json.dumps(line, separators=(',', ':')) + "\n"
+
+    return Response(stream_with_context(lines()), mimetype='application/x-ndjson',
+                    headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-store'})
 
 @app.route('/share_telegram', methods=['POST'])
 def share_telegram():
@@ -65,36 +238,27 @@ def share_telegram():
     
     if not symbol:
         return {"status": "error", "message": "No symbol provided"}
+    if not valid_symbol(symbol):
+        return {"status": "error", "message": f"Invalid symbol: {symbol}"}
     
-    # Re-run analysis to get fresh data for the image
-    # (In a prod app, we might cache this)
     try:
-        ff = FundamentalFetcher()
-        fund_data = ff.get_data(symbol)
-        tf = TechnicalFetcher()
-        tech_data = tf.get_data(symbol)
-        nf = NewsFetcher()
-        news_data = nf.fetch_latest_news(symbol)
-        
-        engine = AnalysisEngine()
-        result = engine.evaluate_stock(fund_data, tech_data, news_data)
-        result['cmp'] = fund_data.get('Current Price') if fund_data else tech_data.get('Close', 0)
+        # The report the user is looking at (or the latest fresh one); analyze again only if it expired
+        result = report_store.get(symbol, data.get('analyzed_at'))
+        if result is None:
+            logger.info(f"No stored report for {symbol}, analyzing again")
+            result, _ = analyze_symbol(symbol)
+            if result is None:
+                return {"status": "error", "message": f"Could not fetch data for {symbol}"}
         
-        # Generate Image
-        gen = InfographicGenerator()
-        filename = f"{symbol}_telegram.png"
-        gen.generate_report(symbol, result, filename)
+        # Generate Image (in memory, reused when an identical report was rendered)
+        image = image_cache.render(symbol, result, BROADCAST_IMAGE_PROFILE)
         
         # Send via Telegram API (Sync)
         caption = f"📊 *Stock Analysis: {symbol}*\nscore: {result['total_score']:.1f}/37\nVerdict: {result.get('health_label')}"
         
         url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendPhoto"
-        with open(filename, 'rb') as f:
-            resp = requests.post(url, data={'chat_id': TELEGRAM_CHANNEL_ID, 'caption': caption, 'parse_mode': 'Markdown'}, files={'photo': f})
-        
-        # Cleanup
-        if os.path.exists(filename):
-            os.remove(filename)
+        resp = requests.post(url, data={'chat_id': TELEGRAM_CHANNEL_ID, 'caption': caption, 'parse_mode': 'Markdown'},
+                             files={'photo': (report_filename(symbol, BROADCAST_IMAGE_PROFILE), image, mimetype(BROADCAST_IMAGE_PROFILE))})
             
         if resp.status_code == 200:
             return {"status": "success", "message": "Sent to Telegram!"}
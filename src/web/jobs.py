@@ -0,0 +1,344 @@
+"""
+Background analysis jobs for the web app.
+
+POST /analyze with async=1 puts a job on a bounded queue and returns its id
+straight away; a small pool of worker threads runs the pipeline (fetch, score,
+store, render) and the page polls or long-polls GET /jobs/<id> until the
+report is ready, or follows GET /jobs/<id>/events, a Server-Sent Events
+stream of the job's progress (queued, running, each fetch stage, scoring and
+the final state). Request threads are never held for the whole analysis.
+
+Each job has a deadline counted from submission: time spent waiting in the
+queue comes out of its fetch budget, and a job still queued at its deadline
+is dropped without running. Workers are started lazily in the process that
+uses them, so a server can fork after importing this module.
+
+A job runs in the server process that accepted it, but its state and events
+are also written to a JSON file under JOB_STORE_DIR on every change, so the
+follow-up requests (status, long-poll, events) work on whichever worker
+process they reach: there the job is a StoredJob that polls its file.
+"""
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from src.config import CACHE_DIR, JOB_QUEUE_SIZE, JOB_TIMEOUT, JOB_WORKERS, REPORT_TTL
+from src.renderer.cache import image_cache
+from src.web.pipeline import analyze
+
+logger = logging.getLogger(__name__)
+
+JOB_STORE_DIR = os.path.join(CACHE_DIR, 'jobs')
+
+FINISHED = ('done', 'failed', 'timeout')
+MAX_WAIT = 30  # longest long-poll, seconds
+# Saved to the job's file besides its events
+RECORD_FIELDS = ('id', 'symbol', 'state', 'created', 'deadline', 'started', 'finished',
+                 'analyzed_at', 'missing', 'error')
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')  # uuid4().hex; no path tricks
+
+
+def _read(path):
+    """A job file's record, or None if it is missing or unreadable."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class QueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, symbol, timeout, disk_dir=None):
+        self.id = uuid.uuid4().hex
+        self.path = os.path.join(disk_dir, f"{self.id}.json") if disk_dir else None
+        self.symbol = symbol
+        self.state = 'queued'
+        self.created = time.time()
+        self.deadline = self.created + timeout
+        self.started = None
+        self.finished = None
+        self.analyzed_at = None
+        self.missing = []
+        self.timings = {}
+        self.error = None
+        self.events = []  # (name, data), in order
+        self._changed = threading.Condition()
+
+    def add_event(self, name, data):
+        with self._changed:
+            self.events.append((name, data))
+            self._save()
+            self._changed.notify_all()
+
+    def _save(self):
+        """Writes the job's state and events to its file, for the other server processes."""
+        if not self.path:
+            return
+        record = {field: getattr(self, field) for field in RECORD_FIELDS}
+        record['events'] = self.events
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(record, f, separators=(',', ':'))
+            os.replace(tmp, self.path)  # atomic, readers never see half a file
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Could not save job {self.id}: {e}")
+
+    def stage_done(self, stage, timing):
+        """pipeline.analyze progress callback; 'scoring' comes with the stored report's analyzed_at."""
+        data = {'stage': stage, 'ms': round(timing['ms'], 1), 'status': timing['status']}
+        if 'analyzed_at' in timing:
+            self.analyzed_at = timing['analyzed_at']
+            data['report_url'] = self.report_url()
+        self.add_event(stage, data)
+
+    def report_url(self):
+        return f"/report/{self.symbol}/{self.analyzed_at}"
+
+    def events_since(self, index, timeout):
+        """
+        Events after the first `index`, waiting up to `timeout` seconds for one.
+        Returns (events, finished).
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: len(self.events) > index, timeout)
+            return self.events[index:], self.state in FINISHED
+
+    def wait(self, timeout):
+        """Blocks until the job finished or `timeout` seconds passed; returns whether it finished."""
+        with self._changed:
+            return self._changed.wait_for(lambda: self.state in FINISHED, timeout)
+
+    def to_dict(self):
+        now = time.time()
+        started = self.started or now
+        return {
+            'id': self.id,
+            'symbol': self.symbol,
+            'state': self.state,
+            'queued_ms': round((started - self.created) * 1000),
+            'run_ms': round(((self.finished or now) - started) * 1000) if self.started else 0,
+            'analyzed_at': self.analyzed_at,
+            'report_url': self.report_url() if self.state == 'done' else None,
+            'missing': self.missing,
+            'error': self.error,
+        }
+
+
+class StoredJob(Job):
+    """
+    A job run by another server process, read from its file. Read-only:
+    wait() and events_since() poll the file until it changes as asked.
+    """
+    POLL = 0.2  # seconds between file reads
+
+    def __init__(self, path, record):
+        self.path = path
+        self._load(record)
+
+    def _load(self, record):
+        for field in RECORD_FIELDS:
+            setattr(self, field, record.get(field))
+        self.events = [tuple(event) for event in record.get('events', [])]
+
+    def _poll(self, done, timeout):
+        end = time.time() + timeout
+        while not done():
+            left = end - time.time()
+            if left <= 0:
+                return False
+            time.sleep(min(self.POLL, left))
+            record = _read(self.path)
+            if record:
+                self._load(record)
+        return True
+
+    def add_event(self, name, data):
+        raise TypeError(f"Job {self.id} runs in another process")
+
+    def events_since(self, index, timeout):
+        self._poll(lambda: len(self.events) > index, timeout)
+        return self.events[index:], self.state in FINISHED
+
+    def wait(self, timeout):
+        return self._poll(lambda: self.state in FINISHED, timeout)
+
+
+class JobQueue:
+    """
+    Bounded queue of analysis jobs and the worker threads that run them.
+    Finished jobs are kept (the latest `keep`) for status lookups, and their
+    files under `disk_dir` (shared by all server processes) for `ttl`
+    seconds, pruned every `prune_every` submissions.
+    """
+    def __init__(self, workers=JOB_WORKERS, maxsize=JOB_QUEUE_SIZE, timeout=JOB_TIMEOUT, keep=1024,
+                 disk_dir=JOB_STORE_DIR, ttl=REPORT_TTL, prune_every=256):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.keep = keep
+        self.disk_dir = disk_dir
+        self.ttl = ttl  # a job is readable as long as the report it links to
+        self.prune_every = prune_every
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self.counts = dict.fromkeys(('submitted', 'rejected', 'started', 'done', 'failed', 'timeout'), 0)
+        self._wait_total = 0.0
+        self._run_total = 0.0
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            # First use in this process (or after a fork): fresh queue and workers
+            self._pid = os.getpid()
+            self._queue = queue.Queue(self.maxsize)
+            for i in range(self.workers):
+                threading.Thread(target=self._work, name=f"analysis-{i}", daemon=True).start()
+            logger.info(f"Started {self.workers} analysis workers (queue size {self.maxsize}, timeout {self.timeout}s)")
+
+    def submit(self, symbol, timeout=None):
+        """
+        Queues an analysis of `symbol` (deadline: `timeout` or the queue's)
+        and returns the Job; raises QueueFull when the queue is full.
+        """
+        self._ensure_started()
+        job = Job(symbol, timeout or self.timeout, self.disk_dir)
+        # Registered and 'queued' before a worker can see it, so 'running' always comes second
+        job.add_event('queued', {'depth': self._queue.qsize() + 1})
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+                self.counts['rejected'] += 1
+            if job.path:
+                try:
+                    os.remove(job.path)
+                except OSError:
+                    pass
+            raise QueueFull(f"{self.maxsize} analyses already queued")
+        with self._lock:
+            self.counts['submitted'] += 1
+            while len(self._jobs) > self.keep:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.state not in FINISHED:
+                    break
+                self._jobs.popitem(last=False)
+            due = self.counts['submitted'] % self.prune_every == 0
+        if due:
+            self.prune()
+        return job
+
+    def get(self, job_id):
+        """
+        The job with this id: this process's own, or a StoredJob read from
+        disk when another server process runs it. None if unknown or expired.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or not self.disk_dir or not JOB_ID_PATTERN.match(job_id):
+            return job
+        path = os.path.join(self.disk_dir, f"{job_id}.json")
+        record = _read(path)
+        return StoredJob(path, record) if record else None
+
+    def prune(self):
+        """Deletes job files older than the ttl; returns how many."""
+        if not self.disk_dir:
+            return 0
+        try:
+            names = os.listdir(self.disk_dir)
+        except OSError:
+            return 0
+        removed = 0
+        cutoff = time.time() - self.ttl
+        for name in names:
+            path = os.path.join(self.disk_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            logger.info(f"Pruned {removed} expired job files")
+        return removed
+
+    def _finish(self, job, state, error=None):
+        with self._lock:
+            self.counts[state] += 1
+            if job.started:
+                self._run_total += time.time() - job.started
+        with job._changed:
+            job.state = state
+            job.error = error
+            job.finished = time.time()
+            job.add_event(state, job.to_dict())  # re-entrant: Condition wraps an RLock
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            now = time.time()
+            with self._lock:
+                self._wait_total += now - job.created
+            if now >= job.deadline:
+                logger.warning(f"Analysis job {job.id} for {job.symbol} expired in the queue")
+                self._finish(job, 'timeout', f"Waited {now - job.created:.0f}s in the queue")
+                continue
+
+            job.started = now
+            job.state = 'running'
+            with self._lock:
+                self.counts['started'] += 1
+            job.add_event('running', {'queued_ms': round((now - job.created) * 1000)})
+            try:
+                result, job.timings = analyze(job.symbol, deadline=job.deadline - now, progress=job.stage_done)
+                if result is None:
+                    self._finish(job, 'failed', f"Could not fetch data for {job.symbol}. Try another.")
+                    continue
+                job.analyzed_at = result['analyzed_at']
+                job.missing = result['missing']
+                try:
+                    image_cache.render(job.symbol, result, 'svg')  # the report page then renders from cache
+                except Exception as e:
+                    logger.error(f"SVG render error for {job.symbol}: {e}")
+                self._finish(job, 'done')
+            except Exception as e:
+                logger.error(f"Analysis job {job.id} for {job.symbol} failed: {e}")
+                self._finish(job, 'failed', str(e))
+
+    def stats(self):
+        """Queue depth, jobs in flight and totals by state, for monitoring."""
+        with self._lock:
+            c = self.counts
+            dequeued = c['started'] + c['timeout']  # jobs only time out in the queue
+            ran = c['done'] + c['failed']
+            return {
+                'depth': self._queue.qsize() if self._queue else 0,
+                'max_depth': self.maxsize,
+                'running': c['started'] - ran,
+                'workers': self.workers,
+                **c,
+                'avg_wait_ms': round(self._wait_total / dequeued * 1000) if dequeued else 0,
+                'avg_run_ms': round(self._run_total / ran * 1000) if ran else 0,
+            }
+
+
+# Shared per-process instance used by the web app
+job_queue = JobQueue()
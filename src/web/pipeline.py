@@ -0,0 +1,95 @@
+"""
+The web analysis pipeline: fetch, score, store.
+
+The fetch stages run concurrently under one shared deadline (see
+src/fetchers/stages.py, shared with the Telegram bot); a stage that misses
+the deadline or fails is replaced by its empty value and the report is
+scored on what arrived.
+
+Finished results go to the report store (src/web/store.py), keyed by symbol
+and analysis time, so follow-up requests reuse them.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.analysis.cache import _normalize, result_cache
+from src.analysis.peers import sector_index
+from src.analysis.scenarios import run_scenarios
+from src.config import API_PARALLEL, FETCH_DEADLINE
+from src.fetchers.stages import EMPTY, FETCHERS, STAGES, fetch_stages, missing_stages
+from src.web.store import report_store
+
+logger = logging.getLogger(__name__)
+
+def analyze(symbol, deadline=FETCH_DEADLINE, progress=None):
+    """
+    Fetches, scores and stores a report for `symbol`.
+    Returns (result, timings); result is None when neither fundamentals nor
+    technicals arrived. Stored results carry 'analyzed_at' (see ReportStore).
+    `progress(stage, timing)` is called per fetch stage and for 'scoring'.
+    """
+    fetched, timings = fetch_stages(symbol, deadline, progress)
+    fund_data, tech_data, news_data = fetched['fundamentals'], fetched['technicals'], fetched['news']
+    if not fund_data and not tech_data:
+        return None, timings
+
+    start = time.perf_counter()
+    peers = sector_index.compare(symbol, fund_data) if fund_data else None
+    result = result_cache.evaluate(fund_data, tech_data, news_data, peers)
+    result['symbol'] = symbol
+    result['scenarios'] = run_scenarios(result)
+    result['news_items'] = news_data
+    result['chart'] = tech_data.get('Chart')  # price panel on the images
+    result['missing'] = missing_stages(timings)
+    report_store.put(symbol, result)
+    timings['analyze'] = {'ms': (time.perf_counter() - start) * 1000, 'status': 'ok'}
+    if progress:
+        progress('scoring', dict(timings['analyze'], analyzed_at=result['analyzed_at']))
+    return result, timings
+
+
+def cached_or_analyze(symbol, deadline=FETCH_DEADLINE):
+    """
+    The latest stored report of `symbol` while it is fresh (REPORT_TTL), else
+    a new analysis. Returns (result, timings, cached); timings is {} when cached.
+    """
+    result = report_store.get(symbol)
+    if result is not None:
+        return result, {}, True
+    result, timings = analyze(symbol, deadline)
+    return result, timings, False
+
+
+def analyze_many(symbols, parallel=API_PARALLEL, deadline=FETCH_DEADLINE):
+    """
+    Runs cached_or_analyze for every symbol, at most `parallel` at a time, and
+    yields (symbol, result, timings, cached, error) as each one completes.
+    Closing the generator early cancels the symbols that haven't started.
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, min(parallel, len(symbols))), thread_name_prefix='batch')
+    try:
+        futures = {executor.submit(cached_or_analyze, symbol, deadline): symbol for symbol in symbols}
+        for future in as_completed(futures):
+            symbol = futures[future]
+            try:
+                result, timings, cached = future.result()
+                yield symbol, result, timings, cached, None
+            except Exception as e:
+                logger.error(f"Batch analysis error for {symbol}: {e}")
+                yield symbol, None, {}, False, str(e)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def api_payload(result):
+    """
+    JSON-safe copy of a result for the API: without the raw 'inputs' and the
+    'chart' series, numpy scalars as Python numbers and NaN/inf as strings.
+    """
+    return _normalize({k: v for k, v in result.items() if k not in ('inputs', 'chart')})
+
+
+def server_timing(timings):
+    """Server-Timing header value, e.g. 'fundamentals;dur=812.4;desc="ok", news;dur=12000.0;desc="timeout"'."""
+    return ", ".join(f'{name};dur={t["ms"]:.1f};desc="{t["status"]}"' for name, t in timings.items())
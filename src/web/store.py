@@ -0,0 +1,211 @@
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from src.analysis.cache import result_key
+from src.config import CACHE_DIR, REPORT_TTL
+
+logger = logging.getLogger(__name__)
+
+REPORT_STORE_DIR = os.path.join(CACHE_DIR, 'reports')
+
+# Exchange symbols (M&M, BAJAJ-AUTO, 500325.BO); no path tricks like "." or ".."
+SYMBOL_PATTERN = re.compile(r'^[A-Z0-9&][A-Z0-9&._-]*$')
+
+
+def valid_symbol(symbol):
+    return bool(SYMBOL_PATTERN.match(str(symbol).upper()))
+
+
+class ReportStore:
+    """
+    Finished web analyses by (symbol, analyzed_at), so a follow-up request
+    (share to Telegram, image download) reuses the report the user is looking
+    at instead of fetching and scoring it again.
+
+    Two tiers like ResultCache: an in-process LRU and pickled files under
+    `disk_dir`, shared by all server processes. `analyzed_at` is the Unix
+    time (seconds) of the analysis; entries older than `ttl` are not served
+    and are deleted when the symbol is stored again, and for all symbols
+    every `prune_every` lookups or stores. Stored results also get
+    'result_hash' (see result_key), the ETag of their report page.
+    Symbols must match SYMBOL_PATTERN: put() raises ValueError, get() misses.
+    """
+    def __init__(self, maxsize=256, disk_dir=REPORT_STORE_DIR, ttl=REPORT_TTL, prune_every=256):
+        self.maxsize = maxsize
+        self.disk_dir = disk_dir
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._memory = OrderedDict()
+        self._operations = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _dir(self, symbol):
+        symbol = symbol.upper()
+        if not SYMBOL_PATTERN.match(symbol):
+            raise ValueError(f"Invalid symbol: {symbol!r}")
+        return os.path.join(self.disk_dir, symbol)
+
+    def _path(self, symbol, analyzed_at):
+        return os.path.join(self._dir(symbol), f"{int(analyzed_at)}.pkl")
+
+    def _remember(self, key, blob):
+        with self._lock:
+            self._memory[key] = blob
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.maxsize:
+                self._memory.popitem(last=False)
+
+    def _fresh(self, analyzed_at):
+        return time.time() - analyzed_at <= self.ttl
+
+    def _tick(self):
+        """Counts a lookup or store; every prune_every-th one prunes the whole store."""
+        with self._lock:
+            self._operations += 1
+            due = self._operations % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def put(self, symbol, result, analyzed_at=None):
+        """Stores `result` (sets result['analyzed_at'] and ['result_hash']) and returns its analyzed_at."""
+        symbol = symbol.upper()
+        if not valid_symbol(symbol):
+            raise ValueError(f"Invalid symbol: {symbol!r}")
+        analyzed_at = int(analyzed_at if analyzed_at is not None else time.time())
+        result['analyzed_at'] = analyzed_at
+        result['result_hash'] = result_key(result)
+        blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        self._remember((symbol, analyzed_at), blob)
+        if self.disk_dir:
+            path = self._path(symbol, analyzed_at)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, 'wb') as f:
+                    f.write(blob)
+                os.replace(tmp, path)  # atomic, concurrent writers can't leave half files
+            except OSError as e:
+                logger.warning(f"Could not store report {symbol}@{analyzed_at}: {e}")
+            self._prune(symbol)
+        self._tick()
+        return analyzed_at
+
+    def _prune(self, symbol):
+        """Deletes the symbol's expired files; returns how many."""
+        removed = 0
+        for name in self._stamps_on_disk(symbol):
+            if not self._fresh(name):
+                try:
+                    os.remove(self._path(symbol, name))
+                    removed += 1
+                except OSError:
+                    continue
+        return removed
+
+    def prune(self):
+        """Drops expired reports of every symbol, from memory and disk. Returns how many files were deleted."""
+        with self._lock:
+            for key in [k for k in self._memory if not self._fresh(k[1])]:
+                del self._memory[key]
+        if not self.disk_dir:
+            return 0
+        try:
+            symbols = [s for s in os.listdir(self.disk_dir) if valid_symbol(s)]
+        except OSError:
+            return 0
+        removed = 0
+        for symbol in symbols:
+            removed += self._prune(symbol)
+        if removed:
+            logger.info(f"Pruned {removed} expired reports")
+        return removed
+
+    def _stamps_on_disk(self, symbol):
+        try:
+            names = os.listdir(self._dir(symbol))
+        except OSError:
+            return []
+        return sorted(int(n[:-4]) for n in names if n.endswith('.pkl') and n[:-4].isdigit())
+
+    def get(self, symbol, analyzed_at=None):
+        """
+        The stored result of `symbol` analyzed at `analyzed_at`, or its most
+        recent one when analyzed_at is None. None when missing or expired.
+        """
+        symbol = symbol.upper()
+        if not valid_symbol(symbol):
+            with self._lock:
+                self.misses += 1
+            return None
+        self._tick()
+        if analyzed_at is None:
+            with self._lock:
+                stamps = [ts for s, ts in self._memory if s == symbol]
+            if self.disk_dir:
+                stamps += self._stamps_on_disk(symbol)
+            if not stamps:
+                with self._lock:
+                    self.misses += 1
+                return None
+            analyzed_at = max(stamps)
+        analyzed_at = int(analyzed_at)
+        if not self._fresh(analyzed_at):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        key = (symbol, analyzed_at)
+        with self._lock:
+            blob = self._memory.get(key)
+            if blob is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(blob)
+
+        if self.disk_dir:
+            try:
+                with open(self._path(symbol, analyzed_at), 'rb') as f:
+                    blob = f.read()
+                result = pickle.loads(blob)
+            except FileNotFoundError:
+                result = None
+            except Exception as e:
+                logger.warning(f"Dropping unreadable stored report {symbol}@{analyzed_at}: {e}")
+                result = None
+            if result is not None:
+                self._remember(key, blob)
+                with self._lock:
+                    self.disk_hits += 1
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                'entries': len(self._memory),
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+
+# Shared per-process instance used by the web app
+report_store = ReportStore()
@@ -0,0 +1,98 @@
+"""
+Production entry point of the web app.
+
+    python -m src.web.wsgi [--bind 0.0.0.0:5000] [--workers 4] [--threads 8]
+
+or, with gunicorn's own command line (this module doubles as its config):
+
+    gunicorn -c python:src.web.wsgi src.web.wsgi:app
+
+Runs gunicorn with WEB_WORKERS preforked processes of WEB_THREADS threads
+each (gthread workers, so the SSE and long-poll routes don't hold a whole
+process). The app is loaded once in the master and everything slow on a
+first request is done there before forking: the heavy imports (pandas,
+yfinance, PIL, bs4 come in with the app), fonts, palette and infographic
+templates, the Jinja templates, the sector index and the fetchers' HTTP
+session. Workers start with all of it in copy-on-write memory, so the first
+request is as fast as the hundredth. Thread pools and job workers are started
+lazily, in each worker; background jobs are saved under JOB_STORE_DIR, so a
+job's status and events can be read from any worker (see src/web/jobs.py).
+
+`python -m src.web.app` is still the single-process debug server.
+"""
+import argparse
+import logging
+import time
+
+from src.analysis.peers import sector_index
+from src.config import JOB_TIMEOUT, WEB_BIND, WEB_THREADS, WEB_WORKERS
+from src.fetchers import http
+from src.renderer import generator
+from src.web.app import app
+
+logger = logging.getLogger(__name__)
+
+
+def preload():
+    """Warms this process before it forks (or serves). Makes no network calls."""
+    start = time.perf_counter()
+    generator.preload()
+    generator.InfographicGenerator().render_svg("PRELOAD", {'details': {}})  # text measuring, SVG path
+    for name in ('index.html', 'report.html'):
+        app.jinja_env.get_template(name)
+    sector_index.refresh()
+    http.session()
+    logger.info(f"Preloaded web app in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+preload()
+
+# --- gunicorn settings (read by `gunicorn -c python:src.web.wsgi` and main()) ---
+bind = WEB_BIND
+workers = WEB_WORKERS
+threads = WEB_THREADS
+worker_class = 'gthread'
+preload_app = True
+timeout = int(JOB_TIMEOUT) + 30   # worker heartbeat; long-polls wait at most 30s
+graceful_timeout = 30
+keepalive = 5
+
+
+def options(**overrides):
+    settings = {
+        'bind': bind, 'workers': workers, 'threads': threads, 'worker_class': worker_class,
+        'preload_app': preload_app, 'timeout': timeout, 'graceful_timeout': graceful_timeout,
+        'keepalive': keepalive,
+    }
+    settings.update({k: v for k, v in overrides.items() if v is not None})
+    return settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the web app with preforked gunicorn workers")
+    parser.add_argument("--bind", type=str, default=None, help=f"Address (default {bind})")
+    parser.add_argument("--workers", type=int, default=None, help=f"Worker processes (default {workers})")
+    parser.add_argument("--threads", type=int, default=None, help=f"Request threads per worker (default {threads})")
+    args = parser.parse_args()
+
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def __init__(self, settings):
+            self.settings = settings
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.settings.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    settings = options(bind=args.bind, workers=args.workers, threads=args.threads)
+    logger.info(f"Serving on {settings['bind']} with {settings['workers']} workers x {settings['threads']} threads")
+    Server(settings).run()
+
+
+if __name__ == "__main__":
+    main()
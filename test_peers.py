@@ -0,0 +1,98 @@
+"""
+Checks SectorIndex percentiles against a brute-force count and the engine wiring.
+Run with `python -m pytest -q test_peers.py` or directly.
+"""
+import math
+import random
+
+from src.analysis.engine import AnalysisEngine
+from src.analysis.peers import PEER_METRICS, SectorIndex
+
+
+def make_universe(rnd, n=200):
+    sectors = ['IT', 'Banks', 'Pharma', 'Auto']
+    return {
+        f"S{i}": {
+            'Sector': rnd.choice(sectors),
+            'Stock P/E': rnd.choice([rnd.uniform(-5, 60), 0]),
+            'ROCE': rnd.uniform(-10, 40),
+            'ROE': rnd.uniform(-10, 35),
+            'Debt / Equity': rnd.uniform(0, 3),
+            'Revenue CAGR': rnd.uniform(-5, 30),
+            'Profit CAGR': rnd.choice([rnd.uniform(-20, 40), None]),
+        }
+        for i in range(n)
+    }
+
+
+def brute_percentile(values, v):
+    values = [x for x in values if not math.isnan(x)]
+    below = sum(x < v for x in values)
+    equal = sum(x == v for x in values)
+    return (below + equal / 2) / len(values) * 100
+
+
+def _metric(f, name):
+    v = f.get(name)
+    v = math.nan if v is None else float(v)
+    return math.nan if name == 'Stock P/E' and not v > 0 else v
+
+
+def test_percentiles_match_brute_force():
+    universe = make_universe(random.Random(32))
+    index = SectorIndex()
+    for symbol, f in universe.items():
+        index.update(symbol, f)
+
+    for symbol in ('S0', 'S17', 'S99'):
+        res = index.compare(symbol)
+        peers = [f for f in universe.values() if f['Sector'] == res['sector']]
+        assert res['peers'] == len(peers) - 1
+        for name in PEER_METRICS:
+            v = _metric(universe[symbol], name)
+            got = res['metrics'][name]['percentile']
+            if math.isnan(v):
+                assert math.isnan(got)
+            else:
+                assert abs(got - brute_percentile([_metric(f, name) for f in peers], v)) < 1e-9, (symbol, name)
+
+
+def test_incremental_update():
+    universe = make_universe(random.Random(33))
+    index = SectorIndex()
+    for symbol, f in universe.items():
+        index.update(symbol, f)
+    before = index.compare('S5')
+
+    # A better ROCE moves the stock up; an unchanged update does nothing
+    assert not index.update('S5', universe['S5'])
+    improved = dict(universe['S5'], ROCE=1000)
+    assert index.update('S5', improved)
+    after = index.compare('S5')
+    assert after['metrics']['ROCE']['percentile'] > before['metrics']['ROCE']['percentile']
+    assert after['peers'] == before['peers']
+
+    # Moving a peer to another sector shrinks the old sector
+    other = next(s for s, f in universe.items() if f['Sector'] == before['sector'] and s != 'S5')
+    index.update(other, dict(universe[other], Sector='Elsewhere'))
+    assert index.compare('S5')['peers'] == before['peers'] - 1
+
+
+def test_engine_uses_peer_scores():
+    engine = AnalysisEngine()
+    mock_score, mock = engine._analyze_news([])
+    assert mock['Peer Comparison']['status'] == 'Neutral'
+
+    peers = {'sector': 'IT', 'peers': 12, 'peer_score': 75.0, 'sector_score': 20.0}
+    score, details = engine._analyze_news([], peers)
+    assert details['Peer Comparison']['score'] == 1
+    assert details['Peer Comparison']['status'] == 'Beats Peers'
+    assert details['Sector vs Nifty']['status'] == 'Underperforming'
+    assert score == mock_score + 0.5 - 0.5
+
+
+if __name__ == "__main__":
+    test_percentiles_match_brute_force()
+    test_incremental_update()
+    test_engine_uses_peer_scores()
+    print("SUCCESS: peer index checks passed.")
@@ -0,0 +1,460 @@
+"""
+Checks the concurrent fetch stage of the web analysis: stages overlap, a late
+or failing stage is left out under the shared deadline, and /analyze reports
+the stage timings in its Server-Timing header. Also the report store that
+/share_telegram reads finished analyses from, the bounded result cache, the background job queue with
+its progress events and job files shared between server processes, the NDJSON batch API, the coalescing of concurrent
+fetches and the preloading production entry point.
+Run with `python -m pytest -q test_pipeline.py` or directly.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from src.fetchers.singleflight import SingleFlight, fetch_flight
+from src.web import pipeline
+from src.web.jobs import JobQueue, QueueFull, job_queue
+from src.web.store import ReportStore, report_store
+
+FUND = {'Market Cap': 9000, 'Current Price': 100, 'Stock P/E': 14, 'ROCE': 20, 'ROE': 18, 'Debt / Equity': 0.4}
+TECH = {'Close': 100, 'Live Price': 100, '50DMA': 95, '200DMA': 90, 'RSI': 45, 'indicators_available': True}
+NEWS = [{'source': 'NSE India', 'title': 'Board meeting on results', 'sentiment': 'Neutral'}]
+
+
+def _fake(value, delay=0.0, error=None):
+    def fetch(symbol):
+        time.sleep(delay)
+        if error:
+            raise error
+        return value
+    return fetch
+
+
+def _with_fetchers(fetchers, fn):
+    saved = dict(pipeline.FETCHERS)
+    pipeline.FETCHERS.update(fetchers)
+    try:
+        return fn()
+    finally:
+        pipeline.FETCHERS.update(saved)
+
+
+def test_stages_run_concurrently():
+    fetchers = {'fundamentals': _fake(FUND, 0.3), 'technicals': _fake(TECH, 0.3), 'news': _fake(NEWS, 0.3)}
+    start = time.perf_counter()
+    data, timings = _with_fetchers(fetchers, lambda: pipeline.fetch_stages('TEST', deadline=5))
+    assert time.perf_counter() - start < 0.6  # not 0.9
+    assert data == {'fundamentals': FUND, 'technicals': TECH, 'news': NEWS}
+    assert all(t['status'] == 'ok' and t['ms'] >= 300 for t in timings.values())
+
+
+def test_late_and_failing_stages_are_left_out():
+    fetchers = {
+        'fundamentals': _fake(FUND),
+        'technicals': _fake(None, error=RuntimeError("upstream down")),
+        'news': _fake(NEWS, 1.0),
+    }
+    start = time.perf_counter()
+    data, timings = _with_fetchers(fetchers, lambda: pipeline.fetch_stages('TEST', deadline=0.2))
+    assert time.perf_counter() - start < 0.5  # the deadline, not the slow stage
+    assert data == {'fundamentals': FUND, 'technicals': {}, 'news': []}
+    assert [timings[s]['status'] for s in pipeline.STAGES] == ['ok', 'error', 'timeout']
+    assert pipeline.missing_stages(timings) == ['technicals', 'news']
+    header = pipeline.server_timing(timings)
+    assert header.startswith('fundamentals;dur=') and 'news;dur=' in header and 'desc="timeout"' in header
+
+
+def _without_disk_caches(fn):
+    from src.analysis.cache import result_cache
+    from src.renderer.cache import image_cache
+
+    disks = result_cache.disk_dir, image_cache.disk_dir, report_store.disk_dir, job_queue.disk_dir
+    result_cache.disk_dir = image_cache.disk_dir = report_store.disk_dir = job_queue.disk_dir = None
+    try:
+        return fn()
+    finally:
+        result_cache.disk_dir, image_cache.disk_dir, report_store.disk_dir, job_queue.disk_dir = disks
+
+
+def test_analyze_renders_partial_report_with_timings():
+    from src.web.app import app
+
+    fetchers = {'fundamentals': _fake(None), 'technicals': _fake(TECH), 'news': _fake(NEWS)}
+    response = _without_disk_caches(lambda: _with_fetchers(
+        fetchers, lambda: app.test_client().post('/analyze', data={'stock_name': 'test'})))
+    assert response.status_code == 200
+    timing = response.headers['Server-Timing']
+    for stage in pipeline.STAGES + ('analyze', 'render'):
+        assert f"{stage};dur=" in timing
+    assert b'TEST' in response.data
+
+    # Stored for /share_telegram, with the time the page passes back
+    stored = report_store.get('TEST')
+    assert stored['symbol'] == 'TEST' and stored['missing'] == []
+    assert f"shareTelegram('TEST', {stored['analyzed_at']})".encode() in response.data
+
+
+def test_report_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ReportStore(disk_dir=tmp, ttl=60)
+        now = int(time.time())
+        store.put('abc', {'total_score': 1.0}, analyzed_at=now - 10)
+        store.put('ABC', {'total_score': 2.0}, analyzed_at=now)
+        assert store.get('ABC')['total_score'] == 2.0  # latest
+        assert store.get('ABC', now - 10)['total_score'] == 1.0
+        assert store.get('ABC', now - 10)['analyzed_at'] == now - 10
+        assert store.get('XYZ') is None
+
+        # Another process sees it through the disk tier
+        other = ReportStore(disk_dir=tmp, ttl=60)
+        assert other.get('ABC')['total_score'] == 2.0
+        assert other.stats()['disk_hits'] == 1
+
+        # Expired entries are neither served nor kept
+        store.put('ABC', {'total_score': 3.0}, analyzed_at=now - 120)
+        assert store.get('ABC', now - 120) is None
+        store.put('ABC', {'total_score': 4.0})
+        assert ReportStore(disk_dir=tmp, ttl=60)._stamps_on_disk('ABC')[0] == now - 10
+
+        # Symbols can't name a path outside the store
+        for bad in ('..', '.', '../ABC', '.HIDDEN', 'A/B', ''):
+            assert store.get(bad) is None and store.get(bad, now) is None
+            try:
+                store.put(bad, {'total_score': 5.0})
+                assert False, bad
+            except ValueError:
+                pass
+        assert sorted(os.listdir(tmp)) == ['ABC']
+
+        # Expired reports of any symbol are pruned on reads too, not only when that symbol is stored
+        pruning = ReportStore(disk_dir=tmp, ttl=60, prune_every=2)
+        pruning.put('OLD', {'total_score': 6.0}, analyzed_at=now - 30)
+        pruning.ttl = 20  # as if time had passed
+        assert pruning.get('ABC')['total_score'] == 4.0
+        assert pruning._stamps_on_disk('OLD') == [] and len(pruning._stamps_on_disk('ABC')) == 2
+        assert ('OLD', now - 30) not in pruning._memory
+
+
+def test_result_cache_keys_and_bounds():
+    from src.analysis.cache import ResultCache, input_key
+
+    # The chart series isn't scored: not hashed, not kept in the cached inputs
+    chart = {'close': [float('nan')] * 120, 'rsi': [50.0] * 120}
+    key = input_key(FUND, TECH, NEWS)
+    assert input_key(FUND, dict(TECH, Chart=chart), NEWS) == key
+    assert input_key(FUND, dict(TECH, RSI=60), NEWS) != key
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ResultCache(disk_dir=tmp, max_disk_bytes=1, prune_every=1)
+        first = cache.evaluate(dict(FUND), dict(TECH, Chart=chart), NEWS)
+        assert 'Chart' not in first['inputs']['technicals']
+        assert ResultCache(disk_dir=tmp).evaluate(FUND, TECH, NEWS)['total_score'] == first['total_score']  # from disk
+        for price in (101, 102, 103):  # live price ticks, one key each
+            cache.evaluate(FUND, dict(TECH, **{'Live Price': price}), NEWS)
+        # Pruned down to the newest file (the bound is below one result)
+        assert sum(len(files) for _, _, files in os.walk(tmp)) <= 1
+
+        aged = ResultCache(disk_dir=tmp, max_disk_age=60, prune_every=1)
+        aged.evaluate(FUND, dict(TECH, **{'Live Price': 104}), NEWS)
+        for root, _, files in os.walk(tmp):
+            for name in files:
+                os.utime(os.path.join(root, name), (time.time() - 120,) * 2)
+        aged.evaluate(FUND, dict(TECH, **{'Live Price': 105}), NEWS)
+        assert sum(len(files) for _, _, files in os.walk(tmp)) == 1
+
+
+def test_background_job_and_polling():
+    from src.web.app import app
+
+    client = app.test_client()
+    fetchers = {'fundamentals': _fake(FUND, 0.2), 'technicals': _fake(TECH), 'news': _fake(NEWS)}
+
+    def run():
+        resp = client.post('/analyze', data={'stock_name': 'jobtest', 'async': '1'})
+        assert resp.status_code == 202
+        status = client.get(resp.json['status_url'] + '?wait=5').json  # long-poll
+        assert status['state'] == 'done' and status['symbol'] == 'JOBTEST'
+        page = client.get(status['report_url'])
+        assert page.status_code == 200 and b'JOBTEST' in page.data and b'<svg' in page.data
+        return status
+
+    status = _without_disk_caches(lambda: _with_fetchers(fetchers, run))
+    assert status['run_ms'] >= 200
+    assert client.get('/jobs/nope').status_code == 404
+    assert client.get('/report/JOBTEST/1').status_code == 404  # expired
+    metrics = client.get('/jobs/metrics').json
+    assert metrics['done'] >= 1 and metrics['depth'] == 0
+
+
+def test_job_queue_bounds_and_timeouts():
+    fetchers = {'fundamentals': _fake(FUND, 0.5), 'technicals': _fake(TECH), 'news': _fake(NEWS)}
+
+    def run():
+        jobs = JobQueue(workers=1, maxsize=2, timeout=0.2, disk_dir=None)
+        first = jobs.submit('A', timeout=0.4)
+        time.sleep(0.05)  # A is running, the queue is empty again
+        second, third = jobs.submit('B'), jobs.submit('C')
+        try:
+            jobs.submit('D')
+            assert False, "queue should be full"
+        except QueueFull:
+            pass
+        assert jobs.stats()['depth'] == 2
+        for job in (first, second, third):
+            assert job.wait(5)
+        return jobs, first, second, third
+
+    jobs, first, second, third = _without_disk_caches(lambda: _with_fetchers(fetchers, run))
+    # A's fetch budget was its 0.4s deadline: fundamentals missed it, technicals scored
+    assert first.state == 'done' and first.missing == ['fundamentals']
+    # B and C were still queued at their deadline and never ran
+    assert second.state == third.state == 'timeout' and second.started is None
+    stats = jobs.stats()
+    assert (stats['submitted'], stats['rejected'], stats['done'], stats['timeout']) == (3, 1, 1, 2)
+    assert stats['running'] == 0 and stats['avg_wait_ms'] > 0
+
+
+def test_jobs_are_shared_between_server_processes():
+    # Each server worker process has its own JobQueue; a job's follow-up
+    # requests may reach any of them, which read it from the shared files
+    fetchers = {'fundamentals': _fake(FUND, 0.3), 'technicals': _fake(TECH), 'news': _fake(NEWS)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def run():
+            here, there = JobQueue(workers=1, disk_dir=tmp), JobQueue(workers=1, disk_dir=tmp)
+            job = here.submit('SHARED')
+            other = there.get(job.id)
+            assert other is not None and other.state in ('queued', 'running')
+            assert other.wait(5)  # long-polls the file
+            events, finished = other.events_since(2, timeout=1)
+            assert there.get('0' * 32) is None and there.get('../' + job.id) is None
+            assert there.prune() == 0 and JobQueue(ttl=-1, disk_dir=tmp).prune() == 1
+            return job, other, events, finished
+
+        job, other, events, finished = _without_disk_caches(lambda: _with_fetchers(fetchers, run))
+    assert finished and other.to_dict() == job.to_dict() and other.state == 'done'
+    assert events == job.events[2:] and [name for name, _ in events][-2:] == ['scoring', 'done']
+
+
+def test_api_streams_each_symbol_as_it_completes():
+    from src.web.app import app
+
+    delays = {'SLOW': 0.4, 'FAST': 0.0}
+
+    def fundamentals(symbol):
+        time.sleep(delays.get(symbol, 0))
+        return None if symbol == 'NONE' else dict(FUND, ROCE=np.float64(20.5))  # numpy, like yfinance data
+
+    fetchers = {'fundamentals': fundamentals, 'technicals': _fake({}), 'news': _fake(NEWS)}
+
+    def run():
+        report_store.clear()
+        client = app.test_client()
+        resp = client.post('/api/analyze', json={'symbols': ['slow', 'fast', 'none', 'fast']})
+        assert resp.mimetype == 'application/x-ndjson'
+        first = [json.loads(line) for line in resp.data.decode().splitlines()]
+        second = [json.loads(line) for line in client.get('/api/analyze?symbols=FAST').data.decode().splitlines()]
+        return first, second
+
+    first, second = _without_disk_caches(lambda: _with_fetchers(fetchers, run))
+    assert [line['symbol'] for line in first][-1] == 'SLOW'  # completion order
+    fast, none, slow = sorted(first, key=lambda line: line['symbol'])  # deduplicated
+    assert fast['status'] == 'ok' and not fast['cached'] and fast['result']['symbol'] == 'FAST'
+    assert 'inputs' not in fast['result'] and set(fast['timings']) >= {'fundamentals', 'analyze'}
+    assert none['status'] == 'error'
+    assert slow['ms'] >= 400
+    # Fresh stored reports are served as they are
+    assert second[0]['cached'] and second[0]['analyzed_at'] == fast['analyzed_at']
+
+
+def _sse(text):
+    """[(id, event, data)] of a Server-Sent Events body."""
+    events = []
+    for block in text.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if fields:
+            events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_progress_events():
+    from src.web.app import app
+
+    fetchers = {'fundamentals': _fake(FUND, 0.3), 'technicals': _fake(TECH, 0.1), 'news': _fake(NEWS)}
+
+    def run():
+        client = app.test_client()
+        job = client.post('/analyze', data={'stock_name': 'events', 'async': '1'}).json
+        resp = client.get(job['status_url'] + '/events')
+        assert resp.mimetype == 'text/event-stream'
+        events = _sse(resp.data.decode())
+        # Reconnecting after the third event replays the rest only
+        resumed = _sse(client.get(job['status_url'] + '/events', headers={'Last-Event-ID': '2'}).data.decode())
+        return events, resumed
+
+    events, resumed = _without_disk_caches(lambda: _with_fetchers(fetchers, run))
+    names = [name for _, name, _ in events]
+    assert names == ['queued', 'running', 'news', 'technicals', 'fundamentals', 'scoring', 'done']  # as they finish
+    assert [i for i, _, _ in events] == list(range(7))
+    stages = {name: data for _, name, data in events}
+    assert stages['fundamentals']['ms'] >= 300 and stages['fundamentals']['status'] == 'ok'
+    assert stages['scoring']['report_url'] == stages['done']['report_url'] is not None
+    assert resumed == events[3:]
+
+
+def test_single_flight():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow(x):
+        calls.append(x)
+        release.wait(5)
+        if x == 'bad':
+            raise ValueError(x)
+        return {'x': x}
+
+    with ThreadPoolExecutor(8) as pool:
+        same = [pool.submit(flight.do, ('fundamentals', 'A'), slow, 'a') for _ in range(5)]
+        other = pool.submit(flight.do, ('news', 'A'), slow, 'a')
+        bad = [pool.submit(flight.do, ('news', 'B'), slow, 'bad') for _ in range(2)]
+        time.sleep(0.2)
+        assert flight.stats()['in_flight'] == 3
+        release.set()
+        results = [f.result() for f in same]
+        assert other.result() == {'x': 'a'}
+        for f in bad:
+            try:
+                f.result()
+                assert False, "the error reaches every caller"
+            except ValueError:
+                pass
+
+    assert all(r is results[0] for r in results)
+    assert sorted(calls) == ['a', 'a', 'bad']
+    stats = flight.stats()
+    assert (stats['executed'], stats['shared'], stats['in_flight']) == (3, 5, 0)
+    assert stats['stages'] == {'fundamentals': {'executed': 1, 'shared': 4}, 'news': {'executed': 2, 'shared': 1}}
+    # Nothing is kept afterwards: the next call runs again
+    flight.do(('fundamentals', 'A'), slow, 'a')
+    assert len(calls) == 4
+
+
+def test_concurrent_analyses_share_fetches():
+    counts = {stage: 0 for stage in pipeline.STAGES}
+
+    def counting(stage, value):
+        def fetch(symbol):
+            counts[stage] += 1
+            time.sleep(0.2)
+            return value
+        return fetch
+
+    fetchers = {'fundamentals': counting('fundamentals', FUND), 'technicals': counting('technicals', TECH),
+                'news': counting('news', NEWS)}
+
+    def run():
+        fetch_flight.clear()
+        with ThreadPoolExecutor(4) as pool:
+            return list(pool.map(lambda s: pipeline.fetch_stages(s, deadline=5), ['hot', 'HOT', 'hot', 'cold']))
+
+    results = _with_fetchers(fetchers, run)
+    assert all(data == {'fundamentals': FUND, 'technicals': TECH, 'news': NEWS} for data, _ in results)
+    assert counts == {'fundamentals': 2, 'technicals': 2, 'news': 2}  # HOT once, COLD once
+    stats = fetch_flight.stats()
+    assert stats['shared'] == 6 and stats['saved_rate'] == 0.5
+
+
+def test_production_entry_point_preloads():
+    from src.fetchers import http
+    from src.renderer import generator
+    from src.web import wsgi
+
+    # Everything a first request would load is there before any worker forks
+    assert generator._fonts and generator._palette and generator._templates
+    assert {'index.html', 'report.html'} <= {name for _, name in wsgi.app.jinja_env.cache.keys()}
+    settings = wsgi.options(workers=3, threads=None)
+    assert settings['workers'] == 3 and settings['threads'] == wsgi.WEB_THREADS
+    assert settings['preload_app'] and settings['worker_class'] == 'gthread'
+
+    # One HTTP session per process; a forked child gets its own
+    assert http.session() is http.session()
+    parent = http.session()
+    http._pid = -1  # as seen from a child after fork
+    assert http.session() is not parent
+
+
+def test_reports_answer_conditional_gets():
+    from src.renderer.cache import image_cache
+    from src.web.app import app
+
+    client = app.test_client()
+    fetchers = {'fundamentals': _fake(FUND), 'technicals': _fake(TECH), 'news': _fake(NEWS)}
+    renders = []
+    render = image_cache.render
+
+    def counting(*args, **kwargs):
+        renders.append(args[2] if len(args) > 2 else kwargs.get('profile'))
+        return render(*args, **kwargs)
+
+    def run():
+        result, _ = pipeline.analyze('ETAGTEST')
+        url = f"/report/ETAGTEST/{result['analyzed_at']}"
+        image_cache.render = counting
+        try:
+            page = client.get(url)
+            assert page.status_code == 200 and page.headers['ETag'] == f'"{result["result_hash"]}"'
+            assert page.cache_control.public and 0 < page.cache_control.max_age <= report_store.ttl
+            # Revalidation (also with the weak tag a compressing proxy sends) renders nothing
+            renders.clear()
+            for tag in (page.headers['ETag'], 'W/' + page.headers['ETag']):
+                again = client.get(url, headers={'If-None-Match': tag})
+                assert again.status_code == 304 and not again.data and again.headers['ETag'] == page.headers['ETag']
+            assert client.get(url, headers={'If-None-Match': '"stale"'}).status_code == 200
+            assert renders == ['svg']
+
+            # The latest-report URL is revalidated every time
+            latest = client.get('/report/etagtest')
+            assert latest.headers['ETag'] == page.headers['ETag'] and latest.cache_control.no_cache
+            # An identical re-analysis keeps the ETag, so the latest URL still answers 304
+            again = dict(result)
+            report_store.put('ETAGTEST', again, analyzed_at=result['analyzed_at'] + 1)
+            assert again['result_hash'] == result['result_hash']
+            assert client.get('/report/etagtest', headers={'If-None-Match': page.headers['ETag']}).status_code == 304
+
+            svg = client.get(url + '/image')
+            png = client.get(url + '/image?profile=default')
+            assert svg.mimetype == 'image/svg+xml' and svg.data.startswith(b'<svg')
+            assert png.mimetype == 'image/png' and png.headers['ETag'] != svg.headers['ETag']
+            renders.clear()
+            assert client.get(url + '/image?profile=default', headers={'If-None-Match': png.headers['ETag']}).status_code == 304
+            assert renders == []
+            assert client.get(url + '/image?profile=nope').status_code == 400
+            assert client.get('/report/ETAGTEST/1/image').status_code == 404
+        finally:
+            image_cache.render = render
+
+    _without_disk_caches(lambda: _with_fetchers(fetchers, run))
+
+
+if __name__ == "__main__":
+    test_stages_run_concurrently()
+    test_late_and_failing_stages_are_left_out()
+    test_analyze_renders_partial_report_with_timings()
+    test_report_store()
+    test_result_cache_keys_and_bounds()
+    test_background_job_and_polling()
+    test_job_queue_bounds_and_timeouts()
+    test_jobs_are_shared_between_server_processes()
+    test_api_streams_each_symbol_as_it_completes()
+    test_progress_events()
+    test_single_flight()
+    test_concurrent_analyses_share_fetches()
+    test_production_entry_point_preloads()
+    test_reports_answer_conditional_gets()
+    print("SUCCESS: pipeline checks passed.")
@@ -0,0 +1,196 @@
+"""
+Checks the cached template layer draws the same image as a cold render,
+the in-memory encoding profiles, the report image cache, the batch renderer, the price chart
+and the SVG backend.
+Run with `python -m pytest -q test_renderer.py` or directly.
+"""
+import gzip
+import io
+import os
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+from PIL import Image, ImageChops, ImageDraw
+
+from bench_renderer import sample_report
+from src.fetchers.technicals import TechnicalFetcher
+from src.renderer import chart, generator
+from src.renderer.batch import BatchRenderer
+from src.renderer.cache import ImageCache, image_key
+from src.renderer.generator import RASTER_PROFILES, InfographicGenerator, clear_caches, encode
+
+
+def _layouts():
+    full = sample_report()
+    no_tech = dict(full, details={k: v for k, v in full['details'].items() if k not in generator.TECH_KEYS})
+    more_news = dict(full, news_items=full['news_items'] * 3)
+    return [full, no_tech, more_news]
+
+
+def test_cached_render_matches_cold_render():
+    for data in _layouts():
+        clear_caches()
+        cold = InfographicGenerator().render("TEST", data)
+        warm = InfographicGenerator().render("TEST", data)
+        assert ImageChops.difference(cold, warm).getbbox() is None
+
+
+def test_template_reused_per_layout():
+    clear_caches()
+    for data in _layouts() + _layouts():
+        InfographicGenerator().render("TEST", data)
+    assert len(generator._templates) == 3
+    # Different values, same layout -> no new template
+    data = dict(_layouts()[0], total_score=3.0, swing_verdict='AVOID')
+    InfographicGenerator().render("OTHER", data)
+    assert len(generator._templates) == 3
+
+
+def test_template_cache_is_bounded():
+    clear_caches()
+    full = sample_report()
+    gen = InfographicGenerator()
+    news = (full['news_items'] * generator.NEWS_SHOWN)[:generator.NEWS_SHOWN]
+    layouts = [dict(full, news_items=news[:n], chart=chart)
+               for n in range(generator.NEWS_SHOWN + 1) for chart in (None, full.get('chart') or {'close': [1, 2]})]
+    keys = {gen._layout(d)['key'] for d in layouts}
+    assert len(keys) > generator.TEMPLATE_CACHE_SIZE
+    for data in layouts:
+        gen._template(gen._layout(data))
+        assert len(generator._templates) <= generator.TEMPLATE_CACHE_SIZE
+    # The most recently used layout is still cached and reused
+    last = gen._layout(layouts[-1])
+    assert gen._template(last) is generator._templates[last['key']]
+    clear_caches()
+
+
+def test_render_bytes_round_trips():
+    data = sample_report()
+    image = InfographicGenerator().render("TEST", data)
+    encoded = InfographicGenerator().render_bytes("TEST", data)
+    assert encoded[:4] == b'\x89PNG'
+    assert ImageChops.difference(Image.open(io.BytesIO(encoded)).convert('RGB'), image).getbbox() is None
+
+
+def test_encode_profiles_decode_close_to_render():
+    image = InfographicGenerator().render("TEST", sample_report())
+    original = np.asarray(image, dtype=int)
+    for profile in RASTER_PROFILES:
+        encoded = encode(image, profile)
+        assert encoded == encode(image, profile)  # deterministic, cache friendly
+        decoded = np.asarray(Image.open(io.BytesIO(encoded)).convert('RGB'), dtype=int)
+        # Palette profiles only shift anti-aliased edges a little
+        assert np.abs(decoded - original).mean() < 2, profile
+
+
+def test_image_cache_keys_and_bounds():
+    data = sample_report()
+    key = image_key("TEST", data, 'fast')
+    # Statuses and inputs aren't drawn; values and the encoder are
+    unseen = dict(data, details={k: dict(v, status='x') for k, v in data['details'].items()}, inputs={'a': 1})
+    assert image_key("TEST", unseen, 'fast') == key
+    assert image_key("TEST", dict(data, final_action='SELL'), 'fast') != key
+    assert image_key("TEST", data, 'small') != key
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ImageCache(maxsize=2, disk_dir=tmp, max_disk_bytes=1, prune_every=1)
+        first = cache.render("TEST", data, 'fast')
+        assert cache.render("TEST", data, 'fast') is first
+        assert ImageCache(disk_dir=tmp).render("TEST", data, 'fast') == first  # from disk
+        for name in ("A", "B", "C"):
+            cache.render(name, data, 'fast')
+        assert len(cache._memory) == 2
+        assert cache.stats()['hit_rate'] == round(1 / 5, 3)
+        # Pruned down to the newest file (the bound is below one image)
+        assert sum(len(files) for _, _, files in os.walk(tmp)) <= 1
+
+
+def test_batch_renderer_matches_single_renders():
+    data = sample_report()
+    reports = [(f"S{i}", dict(data, cmp=100 + i)) for i in range(4)]
+    expected = {name: InfographicGenerator().render_bytes(name, d, 'fast') for name, d in reports}
+    cache = ImageCache(disk_dir=None)
+    with BatchRenderer(2, 'fast', image_cache=cache) as renderer:
+        assert list(renderer.render(reports)) == list(expected.items())
+        # Second run: all cache hits, any order
+        assert dict(renderer.render(reports, ordered=False)) == expected
+    assert cache.stats()['memory_hits'] == 4
+
+
+def test_canvas_fits_content():
+    data = sample_report()
+    gen = InfographicGenerator()
+    full = gen.render("TEST", data).height
+    assert gen.render("TEST", dict(data, news_items=[])).height < full
+    # Every news item up to NEWS_SHOWN is drawn, the canvas grows instead
+    assert gen._layout(dict(data, news_items=data['news_items'] * 5))['news_lines'] == generator.NEWS_SHOWN
+    long_text = dict(data, news_summary='Bearish ' * 60)
+    layout = gen._layout(long_text)
+    assert layout['summary_h'] > 150
+    assert gen.render("TEST", long_text).height == full + layout['summary_h'] - 150
+
+
+def _ohlc(n=300):
+    rng = np.random.default_rng(41)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, n)))
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Volume': rng.integers(100_000, 1_000_000, n)}, index=pd.date_range('2025-01-01', periods=n))
+
+
+def test_price_chart_panel():
+    df = _ohlc()
+    series = TechnicalFetcher().chart_series(df)
+    assert len(series['close']) == len(series['volume']) == len(series['up']) == 120
+    assert series['close'][-1] == round(df['Close'].iloc[-1], 2)
+
+    data = sample_report()
+    gen = InfographicGenerator()
+    plain = gen.render("TEST", data)
+    with_chart = gen.render("TEST", dict(data, chart=series))
+    assert with_chart.height == plain.height + 20 + chart.PANEL_HEIGHT
+
+    # Panel alone stays in the low milliseconds
+    img = Image.new('RGB', (1200, 400))
+    draw = ImageDraw.Draw(img)
+    start = time.perf_counter()
+    for _ in range(10):
+        chart.draw_chart(img, draw, (50, 40, 1150, 360), series, gen.small_font)
+    assert (time.perf_counter() - start) / 10 < 0.02
+    assert img.getbbox() is not None
+
+
+def test_svg_backend():
+    data = dict(sample_report(), chart=TechnicalFetcher().chart_series(_ohlc()))
+    gen = InfographicGenerator()
+    svg = gen.render_svg("TEST", data)
+    root = ET.fromstring(svg)  # well-formed
+    assert root.get('height') == str(gen.render("TEST", data).height)  # same layout as the PNG
+    assert "TEST" in svg and data['final_action'] in svg
+
+    # Deterministic, a fraction of the PNG and compresses well
+    assert gen.render_bytes("TEST", data, 'svg') == svg.encode('utf-8')
+    png = gen.render_bytes("TEST", data, 'fast')
+    assert len(svg) < len(png) / 2
+    assert len(gzip.compress(svg.encode('utf-8'))) < len(svg) / 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ImageCache(disk_dir=tmp)
+        assert cache.render("TEST", data, 'svg') == cache.render("TEST", data, 'svg')
+        assert cache.stats()['memory_hits'] == 1
+
+
+if __name__ == "__main__":
+    test_cached_render_matches_cold_render()
+    test_template_reused_per_layout()
+    test_template_cache_is_bounded()
+    test_render_bytes_round_trips()
+    test_encode_profiles_decode_close_to_render()
+    test_image_cache_keys_and_bounds()
+    test_batch_renderer_matches_single_renders()
+    test_canvas_fits_content()
+    test_price_chart_panel()
+    test_svg_backend()
+    print("SUCCESS: renderer checks passed.")
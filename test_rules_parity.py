@@ -0,0 +1,305 @@
+"""
+Parity check between the per-stock and vectorized rule evaluators.
+Run with `python -m pytest -q test_rules_parity.py` or directly.
+"""
+import random
+import tempfile
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from src.analysis.engine import AnalysisEngine, FUNDAMENTAL_FIELDS, PRICED_EXTRAS, TECHNICAL_FIELDS
+from src.analysis.history import score_history
+from src.analysis.peers import SectorIndex
+from src.analysis.result import STATUS_LABELS
+from src.analysis.rules import build_table
+from src.fetchers.cache import DataCache
+from src.fetchers.fundamentals import FundamentalFetcher
+from src.fetchers.technicals import TechnicalFetcher
+
+# Values sitting exactly on rule thresholds, to catch > vs >= slips
+EDGES = [0.0, 0.5, 1.0, 1.5, 3.0, 5.0, 7.0, 10.0, 12.0, 15.0, 20.0, 25.0, 40.0, 70.0, 500.0, 5000.0, 20000.0]
+
+
+def _value(rnd, scale):
+    r = rnd.random()
+    if r < 0.25: return rnd.choice(EDGES)
+    if r < 0.3: return None
+    return rnd.uniform(-scale * 0.1, scale)
+
+
+def make_fundamentals(rnd, n):
+    records = []
+    for _ in range(n):
+        rec = {}
+        for field in FUNDAMENTAL_FIELDS:
+            if rnd.random() < 0.1: continue  # missing -> rule default
+            rec[field] = _value(rnd, 30000 if field == 'Market Cap' else 60)
+        records.append(rec)
+    return records
+
+
+def make_technicals(rnd, n):
+    records = []
+    for _ in range(n):
+        rec = {f: rnd.choice([_value(rnd, 100), float('nan')]) for f in ('Close', '50DMA', '200DMA', 'RSI', 'MACD', 'MACD_SIGNAL', 'Pivot')}
+        rec['VWAP_Trend'] = rnd.choice(['Bullish', 'Bearish', 'Neutral'])
+        rec['Volume_Trend'] = rnd.choice(['Increasing', 'Decreasing', 'N/A'])
+        rec['indicators_available'] = rnd.random() > 0.2
+        rec['data_note'] = rnd.choice([None, 'Historical data unavailable for technical analysis'])
+        rec['data_source'] = rnd.choice(['NSE India', 'Yahoo Finance'])
+        records.append(rec)
+    return records
+
+
+def _assert_parity(scalar_fn, table_result, records):
+    totals, details = table_result
+    for i, rec in enumerate(records):
+        score, scalar_details = scalar_fn(dict(rec))
+        assert score == totals[i], (i, score, totals[i])
+        for name, d in scalar_details.items():
+            scores, statuses = details[name]
+            assert d['score'] == scores[i], (i, name, d['score'], scores[i])
+            assert d['status'] == statuses[i], (i, name, d['status'], statuses[i])
+
+
+def test_fundamentals_parity():
+    engine = AnalysisEngine()
+    records = make_fundamentals(random.Random(26), 2000)
+    table = build_table(records, FUNDAMENTAL_FIELDS)
+    _assert_parity(engine._analyze_fundamentals, engine.score_fundamentals_table(table), records)
+
+
+def test_technicals_parity():
+    engine = AnalysisEngine()
+    records = make_technicals(random.Random(27), 2000)
+    table = build_table(records, TECHNICAL_FIELDS)
+    _assert_parity(engine._analyze_technicals, engine.score_technicals_table(table), records)
+
+
+def test_batch_matches_evaluate_stock():
+    engine = AnalysisEngine()
+    rnd = random.Random(28)
+    funds = make_fundamentals(rnd, 500)
+    techs = make_technicals(rnd, 500)
+    for f, t in zip(funds, techs):
+        # evaluate_stock expects numeric price fields
+        f.update({k: 0.0 for k, v in f.items() if v is None})
+        t['Close'] = rnd.uniform(1, 60)
+        t['Live Price'] = rnd.choice([0, f.get('Current Price') or 0, rnd.uniform(1, 60)])
+    batch = engine.evaluate_batch(funds, techs)
+    for i, (f, t) in enumerate(zip(funds, techs)):
+        res = engine.evaluate_stock(dict(f), dict(t), [])
+        for key in ('cmp', 'fundamental_score', 'technical_score', 'news_score', 'total_score'):
+            assert res[key] == batch[key][i], (i, key, res[key], batch[key][i])
+        for key in ('swing_verdict', 'long_term_verdict', 'health_label', 'risk_triggered'):
+            assert res[key] == batch[key][i], (i, key, res[key], batch[key][i])
+
+
+def test_reprice_matches_full_evaluation():
+    engine = AnalysisEngine()
+    rnd = random.Random(29)
+    funds = make_fundamentals(rnd, 300)
+    techs = make_technicals(rnd, 300)
+    for f, t in zip(funds, techs):
+        f.update({k: 0.0 for k, v in f.items() if v is None})
+        f['Current Price'] = rnd.uniform(10, 60)
+        t['Close'] = t['Live Price'] = rnd.uniform(10, 60)
+        new_price = t['Close'] * rnd.uniform(0.7, 1.3)
+
+        previous = engine.evaluate_stock(dict(f), dict(t), [])
+        repriced = engine.reprice(previous, new_price)
+        full = engine.evaluate_stock(dict(f), dict(t, **{'Live Price': new_price}), [])
+
+        for key in ('cmp', 'fundamental_score', 'technical_score', 'total_score',
+                    'swing_verdict', 'swing_action', 'long_term_verdict', 'health_label'):
+            assert repriced[key] == full[key], (key, repriced[key], full[key])
+        for name, d in full['details'].items():
+            assert (repriced['details'][name]['score'], repriced['details'][name]['status']) == (d['score'], d['status']), name
+        assert previous['cmp'] == t['Live Price']
+        assert repriced['inputs']['technicals']['Live Price'] == new_price
+
+
+def test_repriced_result_drops_stale_extras():
+    from src.analysis.scenarios import run_scenarios
+
+    engine = AnalysisEngine()
+    rnd = random.Random(32)
+    f = make_fundamentals(rnd, 1)[0]
+    f.update({k: 0.0 for k, v in f.items() if v is None})
+    f['Current Price'] = 40.0
+    t = dict(make_technicals(rnd, 1)[0], Close=40.0, **{'Live Price': 40.0})
+    previous = engine.evaluate_stock(dict(f), dict(t), [])
+    previous.update(scenarios=run_scenarios(previous), chart={'close': [40.0]}, analyzed_at=1, result_hash='x')
+
+    repriced = engine.reprice(previous, 52.0)
+    assert not set(PRICED_EXTRAS) & set(repriced)
+    assert 'scenarios' in previous  # left untouched
+    # Fed back in, the repriced inputs evaluate at the new price
+    again = engine.evaluate_stock(dict(repriced['inputs']['fundamentals']), dict(repriced['inputs']['technicals']), [])
+    assert again['cmp'] == 52.0 and again['total_score'] == repriced['total_score']
+    assert run_scenarios(repriced)['prices'] == run_scenarios(again)['prices']
+
+
+def test_reprice_with_peers_matches_full_evaluation():
+    # Peer percentiles and 'IV Probability' are held at the snapshot by both paths
+    engine = AnalysisEngine()
+    rnd = random.Random(30)
+    index = SectorIndex()
+    for i in range(8):
+        index.update(f"PEER{i}", {'Sector': 'Tech', 'Stock P/E': rnd.uniform(5, 60), 'ROCE': rnd.uniform(0, 40),
+                                  'ROE': rnd.uniform(0, 40), 'Debt / Equity': rnd.uniform(0, 2)})
+    funds = make_fundamentals(rnd, 100)
+    techs = make_technicals(rnd, 100)
+    for f, t in zip(funds, techs):
+        f.update({k: 0.0 for k, v in f.items() if v is None})
+        f.update({'Sector': 'Tech', 'Current Price': rnd.uniform(10, 60), 'Stock P/E': rnd.uniform(5, 60), 'IV Probability': 0.5})
+        t['Close'] = t['Live Price'] = rnd.uniform(10, 60)
+        new_price = t['Close'] * rnd.choice([0.5, 0.9, 1.1, 2.0])
+        peers = index.compare('STOCK', f)
+        assert peers is not None
+
+        repriced = engine.reprice(engine.evaluate_stock(dict(f), dict(t), [], peers), new_price)
+        full = engine.evaluate_stock(dict(f), dict(t, **{'Live Price': new_price}), [], peers)
+        for key in ('fundamental_score', 'technical_score', 'news_score', 'total_score', 'long_term_verdict'):
+            assert repriced[key] == full[key], (key, repriced[key], full[key])
+        for name in ('Peer Comparison', 'Sector vs Nifty', 'P/E Ratio', 'Intrinsic Value'):
+            assert repriced['details'][name] == full['details'][name], name
+        assert repriced['inputs']['fundamentals']['IV Probability'] == full['inputs']['fundamentals']['IV Probability']
+
+
+def test_compact_round_trip():
+    engine = AnalysisEngine()
+    rnd = random.Random(34)
+    funds = make_fundamentals(rnd, 300)
+    techs = make_technicals(rnd, 300)
+    for f, t in zip(funds, techs):
+        f.update({k: 0.0 for k, v in f.items() if v is None})
+        f['Current Price'] = rnd.uniform(10, 60)
+        t['Close'] = t['Live Price'] = rnd.uniform(10, 60)
+    funds[3], techs[4] = None, None
+    symbols = [f"S{i}" for i in range(len(funds))]
+
+    table = engine.evaluate_compact(symbols, funds, techs)
+    for i, (f, t) in enumerate(zip(funds, techs)):
+        full = engine.evaluate_stock(dict(f) if f else f, dict(t) if t else {}, [])
+        full.pop('inputs')
+        compact = table.row(symbols[i]).to_dict()
+        assert compact.pop('symbol') == symbols[i]
+        assert compact == full, i
+        assert table['total_score'][i] == full['total_score']
+
+
+def test_status_vocabulary_is_per_table():
+    # Free-text statuses ("BV: <value>") stay in their table's vocabulary
+    engine = AnalysisEngine()
+    fund = {'Current Price': 50.0, 'Price to Book': 1.0, 'Industry PB': 2.0}
+    tech = {'Close': 50.0, 'Live Price': 50.0}
+    sizes = []
+    for batch in range(20):
+        funds = [dict(fund, **{'Book Value': 1000 * batch + i + 0.5}) for i in range(500)]
+        table = engine.evaluate_compact([f"S{i}" for i in range(500)], funds, [dict(tech) for _ in funds])
+        assert table.row(7).status('Book Value Analysis') == f"Undervalued (vs Ind) | BV: {1000 * batch + 7.5}"
+        sizes.append(len(table.labels.labels))
+    assert max(sizes) < len(STATUS_LABELS) + 600  # 500 Book Values plus a few shared labels
+    assert len(set(sizes)) == 1  # nothing carried over from the earlier tables
+    assert table.status.dtype == np.uint16
+
+
+def test_history_matches_evaluate_stock():
+    engine = AnalysisEngine()
+    rnd = random.Random(31)
+    days = pd.bdate_range('2023-01-02', periods=400)
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(31).normal(0, 0.015, len(days))))
+    ohlc = pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Volume': np.random.default_rng(32).integers(1000, 5000, len(days))}, index=days)
+    snap_dates = [date(2023, 3, 1), date(2023, 9, 1), date(2024, 2, 1)]
+    snaps = make_fundamentals(rnd, len(snap_dates))
+    for f in snaps:
+        f.update({k: 0.0 for k, v in f.items() if v is None})
+        f['Current Price'] = rnd.uniform(50, 150)
+
+    history = score_history(snap_dates, snaps, ohlc)
+    assert history.index[0] == pd.Timestamp('2023-03-01')
+    bars = TechnicalFetcher().indicator_series(ohlc)
+    for day in history.index[::7]:
+        snap = snaps[sum(d <= day.date() for d in snap_dates) - 1]
+        tech = bars.loc[day].to_dict()
+        tech['Live Price'] = tech['Close']
+        full = engine.evaluate_stock(dict(snap), tech, [])
+        row = history.loc[day]
+        for key in ('fundamental_score', 'technical_score', 'swing_verdict', 'long_term_verdict'):
+            assert row[key] == full[key], (day, key, row[key], full[key])
+        assert abs(row['total_score'] - full['total_score']) < 1e-9
+
+
+def test_live_indicators_are_the_last_bar():
+    # One formula path (talib or pandas) for the live score, history and chart
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(33).normal(0, 0.02, 260)))
+    ohlc = pd.DataFrame({'High': close * 1.01, 'Low': close * 0.99, 'Close': close,
+                         'Volume': np.random.default_rng(34).integers(1000, 5000, len(close))})
+    fetcher = TechnicalFetcher()
+    live = fetcher.calculate_indicators(ohlc)
+    last = fetcher.indicator_series(ohlc).iloc[-1]
+    assert live.keys() <= set(last.index)
+    for key, value in live.items():
+        assert value == last[key] or (value != value and last[key] != last[key]), key
+    assert fetcher.chart_series(ohlc)['rsi'][-1] == round(live['RSI'], 1)
+
+
+def test_known_stock():
+    engine = AnalysisEngine()
+    score, details = engine._analyze_fundamentals({
+        'Market Cap': 25000, 'Current Price': 120, 'Low_52': 100, 'Stock P/E': 14, 'Industry PE': 20,
+        'Operating Cash Flow': -5, 'Contingent Liabilities': 10, 'Net Worth': 100, 'Piotroski Score': 7,
+    })
+    assert details['Market Cap']['status'] == 'Large Cap'
+    assert details['CMP vs 52W']['score'] == 1
+    assert details['P/E Ratio']['status'] == 'Very Attractive (Vs Ind: Attractive)'
+    assert details['Operating Cash Flow']['status'] == 'Negative OCF (CRITICAL)'
+    assert details['Contingent Liab'] == {'value': '10.0%', 'score': 0.5, 'status': 'Safe'}
+    assert details['Piotroski Score']['status'] == 'Average'
+    assert len(details) == 26
+
+
+def test_book_value_shown_as_given():
+    # The baseline printed the raw value: an integer Book Value stays "120"
+    engine = AnalysisEngine()
+    records = [{'Book Value': 120, 'Price to Book': 1.0, 'Industry PB': 2.0}, {'Book Value': 120.5}, {'Book Value': -3}]
+    _, details = engine._analyze_fundamentals(dict(records[0]))
+    assert details['Book Value Analysis']['status'] == 'Undervalued (vs Ind) | BV: 120'
+    table = build_table(records, FUNDAMENTAL_FIELDS)
+    _assert_parity(engine._analyze_fundamentals, engine.score_fundamentals_table(table), records)
+    assert list(engine.score_fundamentals_table(table)[1]['Book Value Analysis'][1]) == [
+        'Undervalued (vs Ind) | BV: 120', 'Valuation N/A | BV: 120.5', 'Valuation N/A | Negative BV (Bad)']
+
+
+def test_fetch_saves_dated_snapshot():
+    # Score history needs one snapshot per fetch day, not just the screener's first fetch
+    with tempfile.TemporaryDirectory() as root:
+        cache = DataCache(root)
+        ff = FundamentalFetcher(cache)
+        ff.fetch_screener_data = lambda symbol: {'Stock P/E': 12.5, 'ROE': 18.0}
+        assert ff.get_data('TCS') == {'Stock P/E': 12.5, 'ROE': 18.0}
+        assert cache.snapshot_dates('TCS') == [date.today()]
+        assert cache.load_fundamentals('TCS') == {'Stock P/E': 12.5, 'ROE': 18.0}
+        ff.fetch_screener_data = lambda symbol: None
+        assert ff.get_data('INFY') is None
+        assert cache.snapshot_dates('INFY') == []
+
+
+if __name__ == "__main__":
+    test_fundamentals_parity()
+    test_technicals_parity()
+    test_batch_matches_evaluate_stock()
+    test_reprice_matches_full_evaluation()
+    test_reprice_with_peers_matches_full_evaluation()
+    test_repriced_result_drops_stale_extras()
+    test_compact_round_trip()
+    test_status_vocabulary_is_per_table()
+    test_history_matches_evaluate_stock()
+    test_live_indicators_are_the_last_bar()
+    test_known_stock()
+    test_book_value_shown_as_given()
+    test_fetch_saves_dated_snapshot()
+    print("SUCCESS: scalar and vector evaluators agree.")
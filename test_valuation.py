@@ -0,0 +1,50 @@
+"""
+Checks the Monte Carlo intrinsic value and the Intrinsic Value rule bands.
+Run with `python -m pytest -q test_valuation.py` or directly.
+"""
+import time
+
+from src.analysis.engine import AnalysisEngine
+from src.analysis.valuation import intrinsic_value_fields, simulate, summarize
+
+PROFITS = [100, 120, 90, 150, 170, 200, 210, 260, 240, 300]
+
+
+def test_summary_is_consistent_and_deterministic():
+    iv = simulate(25, PROFITS)
+    s = summarize(iv, 500)
+    assert s['draws'] == 100_000
+    assert s['p10'] < s['p30'] < s['median'] < s['p60'] < s['p90']
+    assert abs(s['prob_undervalued'] - float((iv > 500).mean())) < 1e-4  # rounded to 4 places
+    # CMP at a quantile -> probability matches it
+    assert abs(summarize(iv, s['p30'])['prob_undervalued'] - 0.70) < 0.01
+    assert summarize(simulate(25, PROFITS), 500) == s
+    assert intrinsic_value_fields(-3, PROFITS, 500) == {}
+
+
+def test_fast_enough_for_request_path():
+    simulate(25, PROFITS)  # first call draws the shared shocks
+    start = time.perf_counter()
+    for _ in range(10):
+        summarize(simulate(25, PROFITS), 500)
+    assert (time.perf_counter() - start) / 10 < 0.05
+
+
+def test_rule_scores_probability():
+    engine = AnalysisEngine()
+    fields = intrinsic_value_fields(25, PROFITS, 500)
+    for price, status in ((fields['IV P10'], 'Undervalued'), (fields['IV P50'], 'Fairly Valued'),
+                          (fields['IV P90'], 'Overvalued')):
+        _, details = engine._analyze_fundamentals(dict(fields, **{'Current Price': price}))
+        assert details['Intrinsic Value']['status'] == status, (price, details['Intrinsic Value'])
+
+    # No simulation -> the point estimate decides
+    _, details = engine._analyze_fundamentals({'Current Price': 90, 'Intrinsic Value': 100})
+    assert details['Intrinsic Value']['status'] == 'Undervalued'
+
+
+if __name__ == "__main__":
+    test_summary_is_consistent_and_deterministic()
+    test_fast_enough_for_request_path()
+    test_rule_scores_probability()
+    print("SUCCESS: valuation checks passed.")